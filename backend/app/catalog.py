@@ -0,0 +1,97 @@
+import json, logging, sqlite3, threading, time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meetings (
+    meeting_id TEXT PRIMARY KEY,
+    title      TEXT NOT NULL DEFAULT '',
+    n_chunks   INTEGER NOT NULL DEFAULT 0,
+    raw_bytes  INTEGER NOT NULL DEFAULT 0,
+    created    REAL NOT NULL,
+    updated    REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS extractions (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    meeting_id TEXT NOT NULL REFERENCES meetings(meeting_id) ON DELETE CASCADE,
+    q          TEXT,
+    k          INTEGER,
+    mode       TEXT NOT NULL,
+    tasks      TEXT NOT NULL,     -- json list
+    created    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS extractions_meeting ON extractions(meeting_id, created);
+"""
+
+
+class Catalog:
+    """
+    Embedded SQLite (WAL) index of what is stored: meetings (title, chunk
+    count, size) and extraction results. Chunk offsets live in chunks.dat
+    itself. Every per-meeting question is an indexed lookup on meeting_id.
+    """
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def _query(self, sql: str, args: Tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    def put_meeting(self, meeting_id: str, title: str, n_chunks: int, raw_bytes: int = 0) -> None:
+        """Insert or replace a meeting (keeping its creation time)."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT INTO meetings (meeting_id, title, n_chunks, raw_bytes, created, updated) "
+                             "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(meeting_id) DO UPDATE SET "
+                             "title=excluded.title, n_chunks=excluded.n_chunks, "
+                             "raw_bytes=excluded.raw_bytes, updated=excluded.updated",
+                             (meeting_id, title, n_chunks, raw_bytes, now, now))
+
+    def delete_meeting(self, meeting_id: str) -> bool:
+        """Drop a meeting with its extractions."""
+        with self._lock:
+            cur = self._db.execute("DELETE FROM meetings WHERE meeting_id=?", (meeting_id,))
+            return cur.rowcount > 0
+
+    def meetings(self) -> List[Dict[str, Any]]:
+        rows = self._query("SELECT meeting_id, title, n_chunks, raw_bytes, created, updated "
+                           "FROM meetings ORDER BY updated DESC")
+        return [dict(zip(("meeting_id", "title", "n_chunks", "raw_bytes", "created", "updated"), r)) for r in rows]
+
+    def meeting(self, meeting_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT meeting_id, title, n_chunks, raw_bytes, created, updated "
+                           "FROM meetings WHERE meeting_id=?", (meeting_id,))
+        if not rows:
+            return None
+        return dict(zip(("meeting_id", "title", "n_chunks", "raw_bytes", "created", "updated"), rows[0]))
+
+    def add_extraction(self, meeting_id: str, mode: str, tasks: List[Dict[str, Any]],
+                       q: Optional[str] = None, k: Optional[int] = None) -> Optional[int]:
+        """Record an extraction result; ignored for meetings the catalog doesn't know."""
+        with self._lock:
+            try:
+                cur = self._db.execute("INSERT INTO extractions (meeting_id, q, k, mode, tasks, created) "
+                                       "VALUES (?, ?, ?, ?, ?, ?)",
+                                       (meeting_id, q, k, mode, json.dumps(tasks), time.time()))
+            except sqlite3.IntegrityError:
+                return None
+            return cur.lastrowid
+
+    def extractions(self, meeting_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        rows = self._query("SELECT id, q, k, mode, tasks, created FROM extractions "
+                           "WHERE meeting_id=? ORDER BY created DESC LIMIT ?", (meeting_id, limit))
+        return [{"id": r[0], "q": r[1], "k": r[2], "mode": r[3], "tasks": json.loads(r[4]), "created": r[5]}
+                for r in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
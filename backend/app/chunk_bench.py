@@ -0,0 +1,81 @@
+"""
+Compare the token-aware chunker against the old ~400-word joiner on real
+transcripts: chunk counts, chunks over the model's token limit, embedding
+time, and how often retrieving an action item's title returns a chunk that
+contains the whole item.
+
+    python -m app.chunk_bench ../data/meetings/*/raw.txt --k 3
+"""
+import argparse, time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List
+
+import numpy as np
+
+from .chunking import iter_chunks, iter_word_chunks, token_counter
+from .config import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, EMBED_MODEL, EMBED_BACKEND, EMBED_ONNX_FILE
+from .tasks import extract_tasks_rules
+from .vectorstore.base import top_k
+
+Chunker = Callable[[Iterable[str]], Iterable[str]]
+
+
+def action_lines(lines: List[str]) -> List[Dict[str, str]]:
+    """(query, line) pairs: rule-extracted task titles and the line they came from."""
+    tasks = extract_tasks_rules([{"text": l, "i": n} for n, l in enumerate(lines)])
+    return [{"q": t["title"], "line": lines[t["source_i"]].strip()} for t in tasks]
+
+
+def bench(docs: List[List[str]], chunkers: Dict[str, Chunker], k: int, limit: int, embed) -> list:
+    count = token_counter()
+    rows = []
+    for name, chunker in chunkers.items():
+        n = over = hit = total = 0
+        embed_s = 0.0
+        for lines in docs:
+            chunks = list(chunker(lines))
+            if not chunks:
+                continue
+            n += len(chunks)
+            over += sum(count(c) > limit for c in chunks)
+            t0 = time.perf_counter()
+            X = np.asarray(embed(chunks), dtype="float32")
+            embed_s += time.perf_counter() - t0
+            items = action_lines(lines)
+            if not items:
+                continue
+            Q = np.asarray(embed([it["q"] for it in items]), dtype="float32")
+            for it, q in zip(items, Q):
+                total += 1
+                hit += any(it["line"] in chunks[r] for r in top_k(X @ q, k))
+        rows.append({"chunker": name, "chunks": n, "over_limit": over, "embed_s": embed_s,
+                     "hit_rate": hit / total if total else float("nan"), "queries": total})
+    return rows
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("files", nargs="+", help="transcript text files")
+    ap.add_argument("--k", type=int, default=3)
+    ap.add_argument("--max-tokens", type=int, default=CHUNK_MAX_TOKENS)
+    ap.add_argument("--overlap", type=int, default=CHUNK_OVERLAP_TOKENS)
+    args = ap.parse_args(argv)
+
+    from .embeddings import embed_texts, get_embedder
+    limit = get_embedder(EMBED_MODEL, EMBED_BACKEND, EMBED_ONNX_FILE).max_seq_length - 2
+    embed = lambda texts: embed_texts(texts, EMBED_MODEL, EMBED_BACKEND, EMBED_ONNX_FILE)
+
+    docs = [Path(f).read_text(encoding="utf-8", errors="ignore").splitlines() for f in args.files]
+    chunkers = {
+        "words-400": iter_word_chunks,
+        f"tokens-{args.max_tokens}/{args.overlap}": lambda lines: iter_chunks(lines, args.max_tokens, args.overlap),
+    }
+    print(f"{len(docs)} transcripts, model limit {limit} tokens, k={args.k}")
+    print(f"{'chunker':<18} {'chunks':>7} {'>limit':>7} {'embed s':>8} {'hit@k':>7}")
+    for r in bench(docs, chunkers, args.k, limit, embed):
+        print(f"{r['chunker']:<18} {r['chunks']:>7} {r['over_limit']:>7} {r['embed_s']:>8.2f} "
+              f"{r['hit_rate']:>7.3f}  ({r['queries']} queries)")
+
+
+if __name__ == "__main__":
+    main()
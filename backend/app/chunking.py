@@ -1,16 +1,119 @@
-def to_chunks(text: str, approx_tokens: int = 400):
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+import logging, re
+
+from .config import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, EMBED_MODEL
+
+log = logging.getLogger(__name__)
+
+TokenCounter = Callable[[str], int]
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+_SPEAKER  = re.compile(r"^\s*(?:\[[^\]]{1,12}\]\s*)?[A-Z][\w .'-]{0,40}:\s")  # "Sara: ...", "[00:12] Sara: ..."
+_PRETOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """BERT-style pre-tokens (words + punctuation) plus ~20% for word-piece splits."""
+    n = len(_PRETOKEN.findall(text))
+    return n + (n + 4) // 5
+
+
+@lru_cache(maxsize=None)
+def token_counter(model: str = EMBED_MODEL) -> TokenCounter:
+    """The embedding model's own tokenizer if transformers is installed, else `estimate_tokens`."""
+    try:
+        from transformers import AutoTokenizer
+        tok = AutoTokenizer.from_pretrained(model)
+    except Exception as e:  # not installed / offline
+        log.info("tokenizer for %s unavailable (%s); estimating token counts", model, e)
+        return estimate_tokens
+    return lambda text: len(tok.encode(text, add_special_tokens=False))
+
+
+def _split_long(text: str, max_tokens: int, count: TokenCounter) -> List[str]:
+    """Word-window split for a single sentence that is over budget on its own."""
+    if count(text) <= max_tokens:
+        return [text]
+    words = text.split()
+    if len(words) < 2:
+        return [text]  # one giant "word"; let the model truncate it
+    mid = len(words) // 2
+    return (_split_long(" ".join(words[:mid]), max_tokens, count)
+            + _split_long(" ".join(words[mid:]), max_tokens, count))
+
+
+# unit = (text, tokens, starts_line, starts_turn)
+Unit = Tuple[str, int, bool, bool]
+
+def _units(lines: Iterable[str], max_tokens: int, count: TokenCounter) -> Iterator[Unit]:
+    for line in lines:
+        p = line.strip()
+        if not p:
+            continue
+        turn = bool(_SPEAKER.match(p))
+        first = True
+        for sent in _SENTENCE.split(p):
+            for piece in _split_long(sent, max_tokens, count):
+                yield piece, count(piece), first, turn and first
+                first = False
+
+
+def _join(units: List[Unit]) -> str:
+    out = [units[0][0]]
+    for text, _, starts_line, _ in units[1:]:
+        out.append(("\n" if starts_line else " ") + text)
+    return "".join(out)
+
+
+def iter_chunks(lines: Iterable[str], max_tokens: int = CHUNK_MAX_TOKENS,
+                overlap: int = CHUNK_OVERLAP_TOKENS, count: Optional[TokenCounter] = None) -> Iterator[str]:
     """
-    Naive paragraph joiner: builds ~400-word chunks.
-    Good enough for MVP; replace with token-aware later.
+    Token-aware streaming chunker: packs whole sentences into chunks of at most
+    `max_tokens` (embedding-model tokens), preferring to break at a speaker turn
+    once a chunk is 3/4 full, and starts each chunk with up to `overlap` tokens
+    of trailing sentences from the previous one so items on a boundary survive.
+    Yields each chunk as soon as it is complete.
     """
-    paras = [p.strip() for p in text.splitlines() if p.strip()]
-    chunks, buf, wc = [], [], 0
-    for p in paras:
+    count = count or token_counter()
+    overlap = min(overlap, max_tokens // 2)
+    buf: List[Unit] = []
+    used = 0
+    fresh = 0  # units in buf not already emitted as overlap
+    for u in _units(lines, max_tokens, count):
+        if buf and fresh and (used + u[1] > max_tokens or (u[3] and used >= max_tokens * 3 // 4)):
+            yield _join(buf)
+            tail, t = [], 0
+            for prev in reversed(buf):
+                if t + prev[1] > overlap or len(tail) + 1 >= len(buf):
+                    break
+                tail.insert(0, prev)
+                t += prev[1]
+            while tail and t + u[1] > max_tokens:
+                t -= tail.pop(0)[1]
+            buf, used, fresh = tail, t, 0
+        buf.append(u)
+        used += u[1]
+        fresh += 1
+    if fresh:
+        yield _join(buf)
+
+
+def iter_word_chunks(lines: Iterable[str], approx_words: int = 400) -> Iterator[str]:
+    """Previous paragraph joiner (~400 words, no overlap); kept for `app.chunk_bench`."""
+    buf, wc = [], 0
+    for line in lines:
+        p = line.strip()
+        if not p:
+            continue
         buf.append(p)
         wc += len(p.split())
-        if wc >= approx_tokens:
-            chunks.append("\n".join(buf))
+        if wc >= approx_words:
+            yield "\n".join(buf)
             buf, wc = [], 0
     if buf:
-        chunks.append("\n".join(buf))
-    return chunks
+        yield "\n".join(buf)
+
+
+def to_chunks(text: str, max_tokens: int = CHUNK_MAX_TOKENS, overlap: int = CHUNK_OVERLAP_TOKENS):
+    return list(iter_chunks(text.splitlines(), max_tokens, overlap))
@@ -9,9 +9,96 @@ ALLOWED_ORIGINS = [
 # vector store choice: 'faiss' (if installed) or 'memory'
 RAG_STORE = os.getenv("RAG_STORE", "faiss")
 
+# index used for unfiltered FAISS queries: flat | hnsw | ivfflat | ivfpq
+# (train/save it with `python -m app.reindex`; meeting-filtered queries are always exact)
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+FAISS_INDEX_PARAMS = {
+  "hnsw_m":    int(os.getenv("FAISS_HNSW_M", "32")),
+  "ef_search": int(os.getenv("FAISS_EF_SEARCH", "64")),
+  "nlist":     int(os.getenv("FAISS_NLIST", "1024")),
+  "nprobe":    int(os.getenv("FAISS_NPROBE", "16")),
+  "pq_m":      int(os.getenv("FAISS_PQ_M", "48")),  # must divide the embedding dim
+}
+
 # sentence-transformers model (free & solid)
 EMBED_MODEL = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBED_DIM = int(os.getenv("EMBED_DIM", "384"))  # MiniLM-L6-v2 output size
+# torch | int8 | onnx | onnx-int8 (check with `python -m app.embeddings --backend onnx`)
+EMBED_BACKEND   = os.getenv("EMBED_BACKEND", "torch")
+EMBED_ONNX_FILE = os.getenv("EMBED_ONNX_FILE", "onnx/model_quint8_avx2.onnx")
+# load the model and run one encode at startup instead of on the first request
+EMBED_WARMUP = os.getenv("EMBED_WARMUP", "1") == "1"
+
+# embedding worker: concurrent requests arriving within the window are encoded as one batch
+EMBED_MAX_BATCH   = int(os.getenv("EMBED_MAX_BATCH", "64"))
+EMBED_WINDOW_MS   = float(os.getenv("EMBED_WINDOW_MS", "5"))
+EMBED_QUEUE_DEPTH = int(os.getenv("EMBED_QUEUE_DEPTH", "256"))
+EMBED_WORKERS     = int(os.getenv("EMBED_WORKERS", "1"))
+
+# embedding caches: LRU of query vectors + on-disk chunk vectors keyed by content hash
+EMBED_QUERY_CACHE = int(os.getenv("EMBED_QUERY_CACHE", "1024"))
+EMBED_CACHE_DIR   = os.getenv("EMBED_CACHE_DIR", "../data/embed_cache")
+EMBED_CACHE_MB    = int(os.getenv("EMBED_CACHE_MB", "256"))
+
+# Ollama, one pooled client for every extraction path (app.llm): generations in
+# flight (match OLLAMA_NUM_PARALLEL; the rest wait in a FIFO queue here), how long
+# Ollama keeps the model loaded after a request, and whether to load it at startup
+OLLAMA_URL      = os.getenv("OLLAMA_URL", "http://127.0.0.1:11434")
+OLLAMA_MODEL    = os.getenv("OLLAMA_MODEL", "")
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "2"))
+LLM_KEEP_ALIVE  = os.getenv("LLM_KEEP_ALIVE", "30m")
+LLM_PRELOAD     = os.getenv("LLM_PRELOAD", "1") == "1"
+
+# raw LLM replies keyed by (model, prompt, snippets, options); LLM_CACHE_MB=0 disables
+LLM_CACHE_DIR   = os.getenv("LLM_CACHE_DIR", "../data/llm_cache")
+LLM_CACHE_MB    = int(os.getenv("LLM_CACHE_MB", "64"))
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", str(7 * 24 * 3600)))
+
+# chunking: token budget per chunk (MiniLM-L6-v2 truncates at 256 incl. [CLS]/[SEP])
+# and tokens of trailing sentences repeated at the start of the next chunk
+CHUNK_MAX_TOKENS     = int(os.getenv("CHUNK_MAX_TOKENS", "250"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "40"))
+
+# parsed chunks kept in memory by storage.ChunkRepo (files themselves are mmapped)
+CHUNK_CACHE_MB = int(os.getenv("CHUNK_CACHE_MB", "32"))
+
+# retrieval for /tasks (app.retrieval): LRU of results keyed by (meeting, query, k,
+# chunk-file version); RETRIEVAL_HYBRID=1 fuses a BM25 ranking of the meeting's chunks
+# with the vector ranking, each contributing k * RETRIEVAL_CANDIDATES candidates
+RETRIEVAL_CACHE      = int(os.getenv("RETRIEVAL_CACHE", "1024"))
+RETRIEVAL_HYBRID     = os.getenv("RETRIEVAL_HYBRID", "0") == "1"
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "4"))
+
+# map-reduce extraction ("mode": "map_reduce"): chunks per LLM call, calls in flight
+# (match OLLAMA_NUM_PARALLEL), and title cosine above which two tasks are merged
+EXTRACT_WINDOW_CHUNKS = int(os.getenv("EXTRACT_WINDOW_CHUNKS", "1"))
+EXTRACT_CONCURRENCY   = int(os.getenv("EXTRACT_CONCURRENCY", "2"))
+EXTRACT_DEDUPE_SIM    = float(os.getenv("EXTRACT_DEDUPE_SIM", "0.9"))
+
+# streaming upload: chunks read, embedded and indexed per step (bounds peak memory)
+INGEST_BATCH = int(os.getenv("INGEST_BATCH", "32"))
+
+# background jobs (?background=1 on /upload, /tasks, /issues): SQLite state + spooled uploads,
+# and how many jobs of each kind may run at once (inline requests share the same slots)
+JOBS_DIR = os.getenv("JOBS_DIR", "../data/jobs")
+JOBS_CONCURRENCY = os.getenv("JOBS_CONCURRENCY", "ingest=1,tasks=1,issues=2")
+
+# GitHub API: one pooled client; client-side budgets per rate-limit resource
+# (the server's X-RateLimit-* headers tighten them further) and the longest
+# Retry-After/reset we'll sleep through before giving the error back
+GITHUB_API            = os.getenv("GITHUB_API", "https://api.github.com")
+GITHUB_CORE_PER_HOUR  = float(os.getenv("GITHUB_CORE_PER_HOUR", "5000"))
+GITHUB_SEARCH_PER_MIN = float(os.getenv("GITHUB_SEARCH_PER_MIN", "30"))
+GITHUB_MAX_WAIT_S     = float(os.getenv("GITHUB_MAX_WAIT_S", "60"))
+# open-issue fingerprint map used to skip duplicates: refreshed (conditionally) after this many seconds
+GITHUB_FP_TTL_S       = float(os.getenv("GITHUB_FP_TTL_S", "60"))
+# repo label list cache used by ensure_labels (revalidated with ETags after this many seconds)
+GITHUB_LABEL_TTL_S    = float(os.getenv("GITHUB_LABEL_TTL_S", "300"))
+# issues created in parallel per /issues batch
+GITHUB_ISSUE_CONCURRENCY = int(os.getenv("GITHUB_ISSUE_CONCURRENCY", "4"))
 
 # FAISS file locations (only used if RAG_STORE=faiss and faiss is installed)
 FAISS_INDEX = os.getenv("FAISS_INDEX", "../data/faiss.index")
 FAISS_META  = os.getenv("FAISS_META",  "../data/faiss_meta.json")
+# append-only segment directory (FAISS_INDEX/FAISS_META are migrated into it once)
+FAISS_SEGMENTS = os.getenv("FAISS_SEGMENTS", "../data/faiss_segments")
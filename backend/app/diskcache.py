@@ -0,0 +1,96 @@
+import os, time, hashlib, threading, logging
+from pathlib import Path
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+
+def cache_key(*parts: str) -> str:
+    """Stable content hash of the given parts."""
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class DiskCache:
+    """
+    Small content-addressed byte store: one file per key under <root>/<key[:2]>/.
+    Reads bump the file mtime, so eviction (oldest mtime first, once the total
+    exceeds `max_bytes`) is approximately LRU. Entries older than `ttl` seconds
+    count as misses.
+    """
+    def __init__(self, root: str, max_bytes: int, ttl: Optional[float] = None):
+        self.root = Path(root)
+        self.max_bytes, self.ttl = max_bytes, ttl
+        self._size: Optional[int] = None  # computed on first write
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str) -> Optional[bytes]:
+        p = self._path(key)
+        try:
+            if self.ttl is not None and time.time() - p.stat().st_mtime > self.ttl:
+                self.stats["misses"] += 1
+                return None
+            data = p.read_bytes()
+            os.utime(p)
+        except OSError:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        p = self._path(key)
+        try:
+            p.parent.mkdir(parents=True, exist_ok=True)
+            tmp = p.with_name(p.name + f".{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, p)
+        except OSError as e:
+            log.warning("cache write failed for %s: %s", p, e)
+            return
+        self.stats["writes"] += 1
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _files(self):
+        if not self.root.exists():
+            return []
+        return [f for d in self.root.iterdir() if d.is_dir() for f in d.iterdir() if not f.name.endswith(".tmp")]
+
+    def _scan_size(self) -> int:
+        return sum(f.stat().st_size for f in self._files())
+
+    def _evict(self):
+        # drop oldest entries until 90% full, leaving headroom so we don't evict on every write
+        entries = []
+        for f in self._files():
+            try:
+                st = f.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, f))
+        entries.sort()
+        size = sum(e[1] for e in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, sz, f in entries:
+            if size <= target:
+                break
+            try:
+                f.unlink()
+                size -= sz
+                self.stats["evictions"] += 1
+            except OSError:
+                pass
+        self._size = size
@@ -0,0 +1,84 @@
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .diskcache import DiskCache, cache_key
+from .embed_service import EmbeddingService, Vector
+
+
+class QueryCache:
+    """In-process LRU of query vectors keyed by (model, text)."""
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._d: "OrderedDict[Tuple[str, str], Vector]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, model: str, text: str) -> Optional[Vector]:
+        v = self._d.get((model, text))
+        if v is None:
+            self.stats["misses"] += 1
+            return None
+        self._d.move_to_end((model, text))
+        self.stats["hits"] += 1
+        return v
+
+    def put(self, model: str, text: str, vec: Vector) -> None:
+        self._d[(model, text)] = vec
+        self._d.move_to_end((model, text))
+        while len(self._d) > self.max_entries:
+            self._d.popitem(last=False)
+
+
+class CachedEmbedder:
+    """
+    EmbeddingService front: queries hit an LRU, chunk texts hit an on-disk
+    cache keyed by sha256(model, text), so repeated queries and re-uploads of
+    the same transcript skip the model. Same embed/embed_one API as the service.
+    """
+    def __init__(self, service: EmbeddingService, model: str,
+                 queries: Optional[QueryCache] = None, chunks: Optional[DiskCache] = None):
+        self.service, self.model = service, model
+        self.queries, self.chunks = queries, chunks
+
+    async def embed_one(self, text: str) -> Vector:
+        if self.queries is not None:
+            v = self.queries.get(self.model, text)
+            if v is not None:
+                return v
+        v = await self.service.embed_one(text)
+        if self.queries is not None:
+            self.queries.put(self.model, text, v)
+        return v
+
+    def _load(self, keys: List[str]) -> List[Optional[Vector]]:
+        out = []
+        for k in keys:
+            data = self.chunks.get(k)
+            out.append(np.frombuffer(data, dtype="float32").tolist() if data else None)
+        return out
+
+    def _store(self, keys: List[str], vecs: List[Vector]) -> None:
+        for k, v in zip(keys, vecs):
+            self.chunks.put(k, np.asarray(v, dtype="float32").tobytes())
+
+    async def embed(self, texts: List[str]) -> List[Vector]:
+        if self.chunks is None:
+            return await self.service.embed(texts)
+        keys = [cache_key(self.model, t) for t in texts]
+        out = await asyncio.to_thread(self._load, keys)
+        miss = [i for i, v in enumerate(out) if v is None]
+        if miss:
+            vecs = await self.service.embed([texts[i] for i in miss])
+            for i, v in zip(miss, vecs):
+                out[i] = v
+            await asyncio.to_thread(self._store, [keys[i] for i in miss], vecs)
+        return out
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            "service": dict(self.service.stats),
+            "query_cache": dict(self.queries.stats) if self.queries else {},
+            "chunk_cache": dict(self.chunks.stats) if self.chunks else {},
+        }
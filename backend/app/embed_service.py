@@ -0,0 +1,91 @@
+import asyncio, logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+Vector = List[float]
+
+
+class EmbeddingService:
+    """
+    Runs a blocking `encode(texts) -> vectors` off the event loop and coalesces
+    concurrent requests: whatever arrives within `window_ms` of the first queued
+    request (up to `max_batch` texts) goes to the model as one batch. Large
+    requests are split into `max_batch` slices so queries can interleave with
+    a big upload. At most `queue_depth` slices wait; further callers block.
+    """
+    def __init__(self, encode: Callable[[List[str]], List[Vector]], max_batch: int = 64,
+                 window_ms: float = 5.0, queue_depth: int = 256, workers: int = 1):
+        self._encode = encode
+        self.max_batch = max(1, max_batch)
+        self.window = window_ms / 1000.0
+        self.queue_depth = queue_depth
+        self.workers = max(1, workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="embed")
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.stats = {"requests": 0, "texts": 0, "batches": 0}
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_depth)
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def embed(self, texts: List[str]) -> List[Vector]:
+        if not texts:
+            return []
+        self._ensure_started()
+        self.stats["requests"] += 1
+        loop = asyncio.get_running_loop()
+        futs = []
+        for s in range(0, len(texts), self.max_batch):
+            fut = loop.create_future()
+            await self._queue.put((texts[s:s + self.max_batch], fut))
+            futs.append(fut)
+        out: List[Vector] = []
+        for part in await asyncio.gather(*futs):
+            out.extend(part)
+        return out
+
+    async def embed_one(self, text: str) -> Vector:
+        return (await self.embed([text]))[0]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Tuple[List[str], asyncio.Future]] = [await self._queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.window
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+            texts = [t for item, _ in batch for t in item]
+            try:
+                vecs = await loop.run_in_executor(self._pool, self._encode, texts)
+                self.stats["batches"] += 1
+                self.stats["texts"] += len(texts)
+            except Exception as e:
+                log.warning("embedding batch of %d failed: %s", len(texts), e)
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            pos = 0
+            for item, fut in batch:
+                if not fut.done():  # caller may have been cancelled
+                    fut.set_result(vecs[pos:pos + len(item)])
+                pos += len(item)
+
+    async def close(self):
+        for t in self._tasks:
+            t.cancel()
+        self._tasks, self._queue = [], None
+        self._pool.shutdown(wait=False)
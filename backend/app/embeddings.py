@@ -1,14 +1,83 @@
+from typing import Dict, List, Optional, Tuple
+import logging, time
+
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
-_model = None
+log = logging.getLogger(__name__)
+
+# torch: float32 PyTorch (reference) | int8: dynamically quantized Linear layers
+# onnx: ONNX Runtime export | onnx-int8: pre-quantized ONNX weights (EMBED_ONNX_FILE)
+BACKENDS = ("torch", "int8", "onnx", "onnx-int8")
+
+_models: Dict[Tuple[str, str], SentenceTransformer] = {}
 
-def get_embedder(name: str):
-    global _model
-    if _model is None:
-        _model = SentenceTransformer(name)
-    return _model
+def _load(name: str, backend: str, onnx_file: Optional[str]) -> SentenceTransformer:
+    if backend == "torch":
+        return SentenceTransformer(name)
+    if backend == "int8":
+        import torch
+        m = SentenceTransformer(name, device="cpu")
+        return torch.quantization.quantize_dynamic(m, {torch.nn.Linear}, dtype=torch.qint8)
+    if backend == "onnx":
+        return SentenceTransformer(name, device="cpu", backend="onnx")
+    if backend == "onnx-int8":
+        return SentenceTransformer(name, device="cpu", backend="onnx",
+                                   model_kwargs={"file_name": onnx_file or "onnx/model_quint8_avx2.onnx"})
+    raise ValueError(f"unknown embedding backend {backend!r}; expected one of {BACKENDS}")
 
-def embed_texts(texts, name: str):
-    m = get_embedder(name)
+def get_embedder(name: str, backend: str = "torch", onnx_file: Optional[str] = None):
+    key = (name, backend)
+    if key not in _models:
+        t0 = time.perf_counter()
+        _models[key] = _load(name, backend, onnx_file)
+        log.info("loaded %s (%s) in %.1fs", name, backend, time.perf_counter() - t0)
+    return _models[key]
+
+def embed_texts(texts, name: str, backend: str = "torch", onnx_file: Optional[str] = None):
+    m = get_embedder(name, backend, onnx_file)
     # normalize=True ⇒ inner product ≈ cosine similarity
     return m.encode(texts, normalize_embeddings=True).tolist()
+
+def warmup(name: str, backend: str = "torch", onnx_file: Optional[str] = None) -> None:
+    """Load the model and run one encode so the first request doesn't pay for it."""
+    t0 = time.perf_counter()
+    embed_texts(["warm-up"], name, backend, onnx_file)
+    log.info("embedder warm in %.1fs", time.perf_counter() - t0)
+
+_CHECK_TEXTS = [
+    "Action: Hamza to wire FastAPI endpoints by Friday.",
+    "We discussed timelines for the Q3 release and agreed to revisit next week.",
+    "- [ ] update the onboarding docs",
+    "Blocker: staging database is out of disk space.",
+    "Sara will follow up with the vendor about the invoice.",
+]
+
+def check_equivalence(name: str, backend: str, texts: Optional[List[str]] = None,
+                      onnx_file: Optional[str] = None) -> Dict[str, float]:
+    """Cosine similarity and latency of `backend` vs the float32 torch reference."""
+    texts = texts or _CHECK_TEXTS
+    out = {}
+    vecs = {}
+    for b in ("torch", backend):
+        embed_texts(texts[:1], name, b, onnx_file)  # exclude load time
+        t0 = time.perf_counter()
+        vecs[b] = np.asarray(embed_texts(texts, name, b, onnx_file), dtype="float32")
+        out[f"{b}_ms"] = (time.perf_counter() - t0) * 1000
+    cos = (vecs["torch"] * vecs[backend]).sum(axis=1)
+    out.update(min_cos=float(cos.min()), mean_cos=float(cos.mean()))
+    return out
+
+
+if __name__ == "__main__":
+    import argparse
+    from .config import EMBED_MODEL, EMBED_BACKEND, EMBED_ONNX_FILE
+
+    ap = argparse.ArgumentParser(description="compare an embedding backend against float32 torch")
+    ap.add_argument("--backend", default=EMBED_BACKEND, choices=BACKENDS)
+    ap.add_argument("--min-cos", type=float, default=0.99, help="fail below this cosine similarity")
+    args = ap.parse_args()
+    res = check_equivalence(EMBED_MODEL, args.backend, onnx_file=EMBED_ONNX_FILE)
+    print({k: round(v, 4) for k, v in res.items()})
+    if res["min_cos"] < args.min_cos:
+        raise SystemExit(f"{args.backend} diverges from torch: min cosine {res['min_cos']:.4f} < {args.min_cos}")
@@ -0,0 +1,136 @@
+"""
+Map-reduce task extraction over a whole meeting: one LLM call per window of
+chunks (bounded concurrency), then a reduce step that merges duplicates by
+normalized title and, when an embedder is given, by title similarity.
+"""
+import asyncio, logging, re
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from . import tasks as llm
+from .llm import OllamaClient
+from .tasks import extract_tasks_rules
+
+log = logging.getLogger(__name__)
+
+Embed = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+def map_source(x: Any, idxs: List[int]) -> int:
+    """Map an LLM's source_i (a global chunk index, or a position in `idxs`) to a global chunk index."""
+    try:
+        v = int(x)
+    except Exception:
+        return idxs[0] if idxs else 0
+    if v in idxs:
+        return v
+    if 0 <= v < len(idxs):
+        return idxs[v]
+    return idxs[0] if idxs else 0
+
+
+def normalize_task(t: Dict[str, Any], idxs: List[int]) -> Dict[str, Any]:
+    return {
+        "title": t.get("title", ""),
+        "body": t.get("body", ""),
+        "labels": t.get("labels") or ["meeting-action"],
+        "assignee_hint": t.get("assignee_hint"),
+        "due_hint": t.get("due_hint"),
+        "source_i": map_source(t.get("source_i"), idxs),
+        "confidence": t.get("confidence", 0.7),
+    }
+
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+def title_key(title: str) -> str:
+    return _NON_WORD.sub(" ", (title or "").lower()).strip()
+
+
+class TaskMerger:
+    """
+    Reduce step. A task is a duplicate of a kept one if their normalized
+    titles match or (with `embed`) their title vectors have cosine >= `sim`;
+    duplicates keep the higher confidence and fill in missing hints.
+    """
+    def __init__(self, embed: Optional[Embed] = None, sim: float = 0.9):
+        self.embed, self.sim = embed, sim
+        self.tasks: List[Dict[str, Any]] = []
+        self._keys: Dict[str, int] = {}
+        self._vecs: Optional[np.ndarray] = None
+
+    async def add(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Merge `batch`; returns the tasks that were new."""
+        vecs = None
+        if self.embed is not None and batch:
+            vecs = np.asarray(await self.embed([t["title"] or t["body"] for t in batch]), dtype="float32")
+        new = []
+        for j, t in enumerate(batch):
+            k = title_key(t["title"] or t["body"])
+            dup = self._keys.get(k)
+            if dup is None and vecs is not None and self._vecs is not None and len(self._vecs):
+                scores = self._vecs @ vecs[j]
+                best = int(np.argmax(scores))
+                if scores[best] >= self.sim:
+                    dup = best
+            if dup is not None:
+                self._merge(self.tasks[dup], t)
+                continue
+            self._keys[k] = len(self.tasks)
+            self.tasks.append(t)
+            if vecs is not None:
+                v = vecs[j:j + 1]
+                self._vecs = v if self._vecs is None else np.vstack([self._vecs, v])
+            new.append(t)
+        return new
+
+    @staticmethod
+    def _merge(kept: Dict[str, Any], t: Dict[str, Any]) -> None:
+        for f in ("assignee_hint", "due_hint"):
+            if not kept.get(f) and t.get(f):
+                kept[f] = t[f]
+        if (t.get("confidence") or 0) > (kept.get("confidence") or 0):
+            kept["confidence"] = t["confidence"]
+
+
+async def extract_map_reduce(chunks: List[Dict[str, Any]], concurrency: int = 2, window: int = 1,
+                             embed: Optional[Embed] = None, sim: float = 0.9,
+                             client: Optional[OllamaClient] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yields {"stage": "map", "done", "total", "tasks": [new tasks], "cached"} as
+    each window's call finishes, then {"stage": "done", "mode", "tasks", "cached"}
+    ("cached": every window's reply came from the LLM cache). Falls back
+    to the rules over the whole meeting if the LLM is off or finds nothing.
+    `concurrency` bounds this meeting's calls; `client` (default: the shared
+    one) bounds generations across everything using it.
+    """
+    wins = [chunks[s:s + window] for s in range(0, len(chunks), max(1, window))]
+    merger = TaskMerger(embed, sim)
+    if llm.OLLAMA_MODEL and wins:
+        sem = asyncio.Semaphore(max(1, concurrency))
+
+        async def one(win):
+            async with sem:
+                found, cached = await llm.extract_tasks_ollama_cached([c["text"] for c in win], client=client)
+            idxs = [c["i"] for c in win]
+            return [normalize_task(t, idxs) for t in found], cached
+
+        done, all_cached = 0, True
+        pending = [asyncio.create_task(one(w)) for w in wins]
+        try:
+            for fut in asyncio.as_completed(pending):
+                found, cached = await fut
+                done += 1
+                all_cached = all_cached and cached
+                yield {"stage": "map", "done": done, "total": len(wins),
+                       "tasks": await merger.add(found), "cached": cached}
+        finally:
+            # a closed generator (client gone) must not leave generations running
+            for t in pending:
+                t.cancel()
+        if merger.tasks:
+            yield {"stage": "done", "mode": "map_reduce", "tasks": merger.tasks, "cached": all_cached}
+            return
+    await merger.add(extract_tasks_rules(chunks))
+    yield {"stage": "done", "mode": "rules", "tasks": merger.tasks, "cached": False}
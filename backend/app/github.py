@@ -1,10 +1,15 @@
 # backend/app/github.py
 from typing import List, Optional, Dict, Any
-import os, httpx
-import hashlib, urllib.parse as up
+import os, re, httpx, asyncio, importlib.util, logging, time
+import hashlib
 
+from .config import GITHUB_API, GITHUB_CORE_PER_HOUR, GITHUB_SEARCH_PER_MIN, GITHUB_MAX_WAIT_S, GITHUB_FP_TTL_S
+from .config import GITHUB_LABEL_TTL_S
 
-BASE = "https://api.github.com"
+log = logging.getLogger(__name__)
+
+BASE = GITHUB_API
+_HTTP2 = importlib.util.find_spec("h2") is not None
 
 def _headers():
     token = os.getenv("GITHUB_TOKEN", "")
@@ -16,19 +21,154 @@ def _headers():
         "X-GitHub-Api-Version": "2022-11-28",
     }
 
+
+class RateLimited(RuntimeError):
+    """GitHub's rate limit is exhausted until `reset` (epoch seconds), further out than we wait."""
+    def __init__(self, reset: float):
+        self.reset = reset
+        super().__init__(f"GitHub rate limit exhausted until {time.strftime('%H:%M:%S', time.localtime(reset))} "
+                         f"(in {self.retry_after:.0f}s)")
+
+    @property
+    def retry_after(self) -> float:
+        return max(0.0, self.reset - time.time())
+
+
+class TokenBucket:
+    """
+    `rate` tokens/s up to `burst`. The server's own view (X-RateLimit-Remaining/
+    Reset) can only tighten it: at 0 remaining nothing is sent until the reset,
+    and if that is more than `max_wait` seconds away acquire() raises
+    RateLimited instead of sleeping.
+    """
+    def __init__(self, rate: float, burst: float, max_wait: float = float("inf")):
+        self.rate, self.burst, self.max_wait = rate, burst, max_wait
+        self.tokens = burst
+        self._t = time.monotonic()
+        self._blocked_until = 0.0  # wall clock, from X-RateLimit-Reset
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._t) * self.rate)
+        self._t = now
+
+    async def acquire(self) -> float:
+        """Take one token, sleeping as needed; returns the seconds waited."""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                if self._blocked_until:
+                    block = self._blocked_until - time.time()
+                    if block > self.max_wait:
+                        raise RateLimited(self._blocked_until)
+                    if block > 0:
+                        await asyncio.sleep(block)
+                        waited += block
+                        continue
+                    self._blocked_until, self.tokens = 0.0, self.burst  # new window
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                dt = (1 - self.tokens) / self.rate
+                await asyncio.sleep(dt)
+                waited += dt
+
+    def sync(self, remaining: int, reset: float) -> None:
+        if remaining <= 0:
+            self._blocked_until = max(self._blocked_until, reset)
+        else:
+            self._refill()
+            self.tokens = min(self.tokens, remaining)
+
+
+class GitHubClient:
+    """
+    One pooled (keep-alive, HTTP/2 when `h2` is installed) client for the app's
+    lifetime. Requests go through a token bucket per rate-limit resource (core,
+    search), and 403/429 rate-limit responses are retried after Retry-After /
+    X-RateLimit-Reset (or exponential backoff), as long as the wait is under
+    `max_wait` seconds.
+    """
+    def __init__(self, base: str = BASE, core_per_hour: float = GITHUB_CORE_PER_HOUR,
+                 search_per_min: float = GITHUB_SEARCH_PER_MIN, max_wait: float = GITHUB_MAX_WAIT_S,
+                 retries: int = 3, backoff: float = 1.0, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base, self.max_wait, self.retries, self.backoff = base, max_wait, retries, backoff
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self.buckets = {
+            "core": TokenBucket(core_per_hour / 3600, max(1.0, core_per_hour / 60), max_wait),
+            "search": TokenBucket(search_per_min / 60, max(1.0, search_per_min / 3), max_wait),
+        }
+        self.stats: Dict[str, Any] = {"requests": {"core": 0, "search": 0}, "status": {},
+                                      "retries": 0, "wait_s": 0.0, "http2": 0}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base, timeout=30, transport=self._transport, http2=_HTTP2 and self._transport is None,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        return self._client
+
+    def _retry_after(self, r: httpx.Response, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying a rate-limited response, or None if it isn't one."""
+        if r.status_code not in (403, 429):
+            return None
+        if "retry-after" in r.headers:
+            return float(r.headers["retry-after"])
+        if r.headers.get("x-ratelimit-remaining") == "0" and "x-ratelimit-reset" in r.headers:
+            return max(0.0, float(r.headers["x-ratelimit-reset"]) - time.time())
+        if r.status_code == 429 or "rate limit" in r.text.lower():  # secondary limit, no hint
+            return self.backoff * 2 ** attempt
+        return None  # plain permission error
+
+    async def request(self, method: str, path: str, resource: str = "core", **kw) -> httpx.Response:
+        bucket = self.buckets[resource]
+        kw.setdefault("headers", _headers())
+        for attempt in range(self.retries + 1):
+            waited = await bucket.acquire()
+            self.stats["wait_s"] += waited
+            self.stats["requests"][resource] += 1
+            r = await self.client.request(method, path, **kw)
+            self.stats["status"][r.status_code] = self.stats["status"].get(r.status_code, 0) + 1
+            if r.http_version == "HTTP/2":
+                self.stats["http2"] += 1
+            if "x-ratelimit-remaining" in r.headers and "x-ratelimit-reset" in r.headers:
+                res = self.buckets.get(r.headers.get("x-ratelimit-resource", resource), bucket)
+                res.sync(int(r.headers["x-ratelimit-remaining"]), float(r.headers["x-ratelimit-reset"]))
+            delay = self._retry_after(r, attempt)
+            if delay is None or attempt == self.retries or delay > self.max_wait:
+                return r
+            log.warning("github %s %s rate-limited (%s); retrying in %.1fs", method, path, r.status_code, delay)
+            self.stats["retries"] += 1
+            self.stats["wait_s"] += delay
+            await asyncio.sleep(delay)
+        return r
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_client: Optional[GitHubClient] = None
+
+def get_client() -> GitHubClient:
+    global _client
+    if _client is None:
+        _client = GitHubClient()
+    return _client
+
+async def close_client() -> None:
+    if _client is not None:
+        await _client.aclose()
+
+
 async def ensure_labels(repo: str, labels: List[str]) -> None:
-    if not labels:
-        return
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.get(f"{BASE}/repos/{repo}/labels", headers=_headers(), params={"per_page": 100})
-        r.raise_for_status()
-        existing = {l["name"].lower() for l in r.json()}
-        to_create = [l for l in labels if l and l.lower() not in existing]
-        for name in to_create:
-            payload = {"name": name, "color": "ededed", "description": "auto-created by meeting-to-issues"}
-            rr = await client.post(f"{BASE}/repos/{repo}/labels", headers=_headers(), json=payload)
-            if rr.status_code not in (200, 201, 422):
-                rr.raise_for_status()
+    await label_cache.ensure(repo, labels)
 
 async def create_issue(repo: str, title: str, body: str,
                        labels: Optional[List[str]] = None,
@@ -37,26 +177,23 @@ async def create_issue(repo: str, title: str, body: str,
     if labels:   payload["labels"] = labels
     if assignee: payload["assignees"] = [assignee]
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.post(f"{BASE}/repos/{repo}/issues", headers=_headers(), json=payload)
-        if r.status_code == 422 and assignee:
-            payload.pop("assignees", None)  # retry without assignee
-            r = await client.post(f"{BASE}/repos/{repo}/issues", headers=_headers(), json=payload)
-        r.raise_for_status()
-        return r.json()
+    gh = get_client()
+    r = await gh.request("POST", f"/repos/{repo}/issues", json=payload)
+    if r.status_code == 422 and assignee:
+        payload.pop("assignees", None)  # retry without assignee
+        r = await gh.request("POST", f"/repos/{repo}/issues", json=payload)
+    r.raise_for_status()
+    return r.json()
 
 
 async def find_existing_issue(repo: str, title: str):
     """Return first open issue that already has this exact title, else None."""
-    import urllib.parse as up
     q = f'repo:{repo} is:issue is:open in:title "{title}"'
-    params = {"q": q}
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.get(f"{BASE}/search/issues", headers=_headers(), params=params)
-        r.raise_for_status()
-        items = r.json().get("items", [])
-        return items[0] if items else None
-    
+    r = await get_client().request("GET", "/search/issues", resource="search", params={"q": q})
+    r.raise_for_status()
+    items = r.json().get("items", [])
+    return items[0] if items else None
+
 
 def task_fingerprint(title: str, body: str) -> str:
     s = (title or "").strip() + "\n" + (body or "").strip()
@@ -65,9 +202,144 @@ def task_fingerprint(title: str, body: str) -> str:
 async def find_issue_by_fp(repo: str, fp: str):
     # search an open issue that already has this fingerprint in body
     q = f'repo:{repo} is:issue is:open in:body "fp:{fp}"'
-    params = {"q": q}
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.get(f"{BASE}/search/issues", headers=_headers(), params=params)
-        r.raise_for_status()
-        items = r.json().get("items", [])
-        return items[0] if items else None
\ No newline at end of file
+    r = await get_client().request("GET", "/search/issues", resource="search", params={"q": q})
+    r.raise_for_status()
+    items = r.json().get("items", [])
+    return items[0] if items else None
+
+
+async def _list_pages(url: str, pages: Dict[str, Dict[str, Any]], parse, stats: Dict[str, int]) -> list:
+    """
+    Follow a listing's Link rel="next" pages from `url`, re-sending each with
+    If-None-Match from the `pages` cache (url -> {etag, next, data}, updated in
+    place). Returns each page's `parse(items)`; unchanged pages come back 304
+    and are free in GitHub's rate limit.
+    """
+    gh = get_client()
+    out, seen = [], []
+    next_url: Optional[str] = url
+    while next_url:
+        cached = pages.get(next_url)
+        headers = _headers()
+        if cached and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        r = await gh.request("GET", next_url, headers=headers)
+        stats["pages"] += 1
+        if r.status_code == 304 and cached:
+            stats["not_modified"] += 1
+            page = cached
+        else:
+            r.raise_for_status()
+            page = {"etag": r.headers.get("etag"), "next": r.links.get("next", {}).get("url"),
+                    "data": parse(r.json())}
+            pages[next_url] = page
+        seen.append(next_url)
+        out.append(page["data"])
+        next_url = page["next"]
+    for u in set(pages) - set(seen):  # pages that no longer exist
+        del pages[u]
+    return out
+
+
+_FP_MARKER = re.compile(r"<!-- mtg:\S* fp:([0-9a-f]+) -->")
+
+
+class FingerprintIndex:
+    """
+    fingerprint -> open issue, per repo, built from the marker every issue we
+    create carries. One paged listing of open issues replaces a search call per
+    task; refreshes after `ttl` seconds re-send each page with If-None-Match,
+    and GitHub doesn't count 304s against the rate limit.
+    """
+    def __init__(self, ttl: float = GITHUB_FP_TTL_S):
+        self.ttl = ttl
+        self._repos: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.stats = {"pages": 0, "not_modified": 0, "refreshes": 0, "hits": 0}
+
+    @staticmethod
+    def _parse(items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        fps = {}
+        for it in items:
+            m = _FP_MARKER.search(it.get("body") or "")
+            if m and "pull_request" not in it:
+                fps[m.group(1)] = {"number": it["number"], "html_url": it["html_url"]}
+        return fps
+
+    async def _refresh(self, repo: str, entry: Dict[str, Any]) -> None:
+        fps: Dict[str, Dict[str, Any]] = {}
+        for page in await _list_pages(f"/repos/{repo}/issues?state=open&per_page=100",
+                                      entry.setdefault("pages", {}), self._parse, self.stats):
+            fps.update(page)
+        entry["fps"], entry["at"] = fps, time.monotonic()
+        self.stats["refreshes"] += 1
+
+    async def get(self, repo: str) -> Dict[str, Dict[str, Any]]:
+        """fingerprint -> {"number", "html_url"} of the repo's open issues, at most `ttl` old."""
+        lock = self._locks.setdefault(repo, asyncio.Lock())
+        async with lock:
+            entry = self._repos.setdefault(repo, {})
+            if "fps" not in entry or time.monotonic() - entry["at"] > self.ttl:
+                await self._refresh(repo, entry)
+            return entry["fps"]
+
+    def lookup(self, fps: Dict[str, Dict[str, Any]], fp: str) -> Optional[Dict[str, Any]]:
+        hit = fps.get(fp)
+        if hit:
+            self.stats["hits"] += 1
+        return hit
+
+    def add(self, repo: str, fp: str, issue: Dict[str, Any]) -> None:
+        """Remember an issue we just created, so later tasks in the batch see it."""
+        entry = self._repos.get(repo)
+        if entry and "fps" in entry:
+            entry["fps"][fp] = {"number": issue["number"], "html_url": issue["html_url"]}
+
+fingerprints = FingerprintIndex()
+
+
+class LabelCache:
+    """
+    Lower-cased label names per repo, from a full paged listing revalidated
+    with ETags after `ttl` seconds. `ensure` creates what's missing
+    concurrently; when every label is known it makes no request at all.
+    """
+    def __init__(self, ttl: float = GITHUB_LABEL_TTL_S, concurrency: int = 4):
+        self.ttl, self.concurrency = ttl, concurrency
+        self._repos: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.stats = {"pages": 0, "not_modified": 0, "refreshes": 0, "created": 0}
+
+    async def get(self, repo: str) -> set:
+        async with self._locks.setdefault(repo, asyncio.Lock()):
+            entry = self._repos.setdefault(repo, {})
+            if "names" not in entry or time.monotonic() - entry["at"] > self.ttl:
+                pages = await _list_pages(f"/repos/{repo}/labels?per_page=100", entry.setdefault("pages", {}),
+                                          lambda items: [l["name"].lower() for l in items], self.stats)
+                entry["names"] = {n for page in pages for n in page}
+                entry["at"] = time.monotonic()
+                self.stats["refreshes"] += 1
+            return entry["names"]
+
+    async def ensure(self, repo: str, labels: List[str]) -> None:
+        if not labels:
+            return
+        names = await self.get(repo)
+        missing = {l.lower(): l for l in labels if l and l.lower() not in names}
+        if not missing:
+            return
+        gh, sem = get_client(), asyncio.Semaphore(self.concurrency)
+
+        async def create(name: str) -> None:
+            payload = {"name": name, "color": "ededed", "description": "auto-created by meeting-to-issues"}
+            async with sem:
+                rr = await gh.request("POST", f"/repos/{repo}/labels", json=payload)
+            if rr.status_code not in (200, 201, 422):  # 422: it exists after all
+                rr.raise_for_status()
+            if rr.status_code != 422:
+                self.stats["created"] += 1
+            names.add(name.lower())
+
+        await asyncio.gather(*(create(n) for n in missing.values()))
+
+label_cache = LabelCache()
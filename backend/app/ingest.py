@@ -0,0 +1,79 @@
+import asyncio, hashlib, io, logging, uuid
+from contextlib import asynccontextmanager
+from itertools import islice
+from typing import Any, AsyncIterator, BinaryIO, Dict, List, Optional
+
+from .chunking import iter_chunks
+from .storage import MeetingWriter
+
+log = logging.getLogger(__name__)
+
+
+def chunk_id(text: str, meta: Dict[str, Any], salt: str = "") -> str:
+    return hashlib.sha256((salt + text + str(meta)).encode("utf-8")).hexdigest()[:16]
+
+
+@asynccontextmanager
+async def _in_thread(cm):
+    """Enter and exit a blocking context manager (file I/O, fsync) in a worker thread."""
+    value = await asyncio.to_thread(cm.__enter__)
+    try:
+        yield value
+    except BaseException as e:
+        if not await asyncio.to_thread(cm.__exit__, type(e), e, e.__traceback__):
+            raise
+    else:
+        await asyncio.to_thread(cm.__exit__, None, None, None)
+
+
+async def ingest(fileobj: BinaryIO, meeting_id: str, title: str, store, embedder,
+                 batch: int = 32, size: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream an uploaded transcript into storage and the vector store.
+
+    The file is decoded and chunked lazily in a worker thread; every `batch`
+    chunks are written, embedded and upserted before the next batch is read,
+    so peak memory is bounded by the batch, not the file. Yields progress
+    dicts ({"stage": "indexing", ...} per batch, then {"stage": "done", ...}).
+
+    A re-upload is indexed under fresh ids next to the old version, which is
+    only dropped once the new files are in place; a failed attempt removes
+    just its own vectors and leaves the old meeting whole.
+    """
+    text = io.TextIOWrapper(fileobj, encoding="utf-8", errors="ignore", newline="")
+    salt = uuid.uuid4().hex  # never collides with the ids being replaced
+    n = 0
+    new_ids: List[str] = []
+    try:
+        async with _in_thread(MeetingWriter(meeting_id, title)) as w:
+            chunks = iter_chunks(w.tee_raw(text))
+
+            def take():
+                part, metas, ids = list(islice(chunks, batch)), [], []
+                for c in part:
+                    m = {"meeting_id": meeting_id, "title": title, "i": w.n_chunks}
+                    metas.append(m)
+                    ids.append(chunk_id(c, m, salt))
+                    w.add_chunk(c)
+                return part, metas, ids
+
+            while True:
+                part, metas, ids = await asyncio.to_thread(take)
+                if not part:
+                    break
+                vecs = await embedder.embed(part)
+                new_ids.extend(ids)
+                await asyncio.to_thread(store.upsert, ids, vecs, metas)
+                n += len(part)
+                ev = {"stage": "indexing", "chunks": n, "bytes": fileobj.tell()}
+                if size:
+                    ev["progress"] = min(99, int(100 * ev["bytes"] / size))
+                yield ev
+    except BaseException:
+        await asyncio.to_thread(store.delete, new_ids)  # don't leave a half-indexed attempt behind
+        raise
+    finally:
+        text.detach()  # leave the upload's file open for its owner
+    await asyncio.to_thread(store.delete_meeting, meeting_id, keep=new_ids)  # the replaced version
+    await asyncio.to_thread(store.persist)
+    yield {"stage": "done", "chunks_indexed": n}
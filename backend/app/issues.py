@@ -0,0 +1,103 @@
+import asyncio, logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from .github import RateLimited, create_issue, fingerprints, task_fingerprint
+
+log = logging.getLogger(__name__)
+
+
+def render_issue(t: Dict[str, Any], meeting_id: Optional[str],
+                 snippet_by_i: Dict[int, str]) -> Optional[Tuple[str, str, str, List[str]]]:
+    """(title, body, fingerprint, labels) for a task, or None if it has no title."""
+    title = (t.get("title") or "").strip()
+    if not title:
+        return None
+    body  = (t.get("body")  or "").strip()
+    si    = t.get("source_i")
+    fp    = task_fingerprint(title, body)
+
+    # hidden fingerprint marker for idempotency
+    body += f"\n\n<!-- mtg:{meeting_id} fp:{fp} -->"
+
+    # add short source snippet
+    if meeting_id is not None and si is not None:
+        snippet = snippet_by_i.get(si, "")
+        if snippet:
+            if len(snippet) > 400:
+                snippet = snippet[:400] + "…"
+            body += f"\n\n_Source: meeting `{meeting_id}`, chunk #{si}_\n```\n{snippet}\n```"
+
+    labels = t.get("labels") or ["meeting-action"]
+    if isinstance(labels, str):
+        labels = [labels]
+    return title, body, fp, labels
+
+
+async def create_issues_batch(repo: str, tasks: List[Dict[str, Any]], meeting_id: Optional[str],
+                              snippet_by_i: Dict[int, str], open_fps: Dict[str, Dict[str, Any]],
+                              assignee_map: Dict[str, str], concurrency: int = 4
+                              ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Create the batch's issues with at most `concurrency` requests in flight and
+    yield (task index, result) as each one finishes. A failure only fails its
+    own task ("status": "failed" with the reason); tasks repeating an earlier
+    task's fingerprint wait for that task and report its issue as a duplicate.
+    """
+    sem = asyncio.Semaphore(max(1, concurrency))
+    rendered = [render_issue(t, meeting_id, snippet_by_i) for t in tasks]
+    owner: Dict[str, int] = {}  # fingerprint -> first task in the batch that has it
+    for i, r in enumerate(rendered):
+        if r is not None:
+            owner.setdefault(r[2], i)
+    loop = asyncio.get_running_loop()
+    outcome = {fp: loop.create_future() for fp in owner}  # owner's issue, or None if it failed
+
+    async def one(i: int, t: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        if rendered[i] is None:
+            return i, {"title": "(empty)", "status": "skipped-empty-title"}
+        title, body, fp, labels = rendered[i]
+
+        # skip duplicate if already open, or created by an earlier task in this batch
+        existing = fingerprints.lookup(open_fps, fp)
+        if existing is None and owner[fp] != i:
+            existing = await asyncio.shield(outcome[fp])
+            if existing is None:
+                return i, {"title": title, "status": "failed", "error": f"same issue as task {owner[fp]}, which failed"}
+        if existing:
+            if owner[fp] == i:
+                outcome[fp].set_result(existing)
+            return i, {"number": existing["number"], "url": existing["html_url"],
+                       "title": title, "status": "skipped-duplicate"}
+
+        # optional assignee mapping
+        gh_user = None
+        hint = t.get("assignee_hint")
+        if isinstance(hint, str):
+            gh_user = assignee_map.get(hint) or assignee_map.get(hint.lower())
+
+        try:
+            async with sem:
+                issue = await create_issue(repo, title, body, labels=labels, assignee=gh_user)
+        except Exception as e:
+            outcome[fp].set_result(None)
+            res = {"title": title, "status": "failed", "error": str(e)}
+            if isinstance(e, httpx.HTTPStatusError):
+                res["status_code"] = e.response.status_code
+            elif isinstance(e, RateLimited):
+                res.update(status_code=429, retry_after=round(e.retry_after))
+            log.warning("creating issue %r in %s failed: %s", title, repo, e)
+            return i, res
+        outcome[fp].set_result(issue)
+        fingerprints.add(repo, fp, issue)
+        return i, {"number": issue["number"], "url": issue["html_url"], "title": title, "status": "created"}
+
+    pending = [asyncio.create_task(one(i, t)) for i, t in enumerate(tasks)]
+    try:
+        for done in asyncio.as_completed(pending):
+            yield await done
+    finally:
+        # closed early (client gone): don't keep creating issues nobody will hear about
+        for p in pending:
+            p.cancel()
@@ -0,0 +1,231 @@
+import asyncio, json, logging, os, sqlite3, threading, time, uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+Work = Callable[[], AsyncIterator[Dict[str, Any]]]
+TERMINAL = ("done", "error")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id       TEXT PRIMARY KEY,
+    kind     TEXT NOT NULL,
+    key      TEXT,
+    status   TEXT NOT NULL,      -- queued | running | done | error
+    progress TEXT,               -- last progress event (json)
+    result   TEXT,               -- final event (json)
+    error    TEXT,
+    created  REAL NOT NULL,
+    updated  REAL NOT NULL,
+    owner    TEXT                -- "<boot id>:<pid>" of the process running it
+);
+CREATE INDEX IF NOT EXISTS jobs_key ON jobs(kind, key);
+"""
+
+
+def _boot_id() -> str:
+    try:
+        with open("/proc/sys/kernel/random/boot_id", encoding="ascii") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+OWNER = f"{_boot_id()}:{os.getpid()}"
+
+
+def owner_alive(owner: Optional[str]) -> bool:
+    """Whether the process that owns a job may still be running it."""
+    boot, _, pid = (owner or "").rpartition(":")
+    if not pid.isdigit() or boot != OWNER.rpartition(":")[0]:
+        return False  # no owner recorded, or the machine rebooted since
+    if int(pid) == os.getpid():
+        return True
+    if os.name != "posix":
+        return False  # can't probe pids here: treat as gone, like a restart
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def parse_limits(spec: str) -> Dict[str, int]:
+    """"ingest=1,tasks=2" -> {"ingest": 1, "tasks": 2}"""
+    out = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        kind, _, n = part.partition("=")
+        out[kind.strip()] = max(1, int(n))
+    return out
+
+
+def once(fn: Callable[[], Awaitable[Dict[str, Any]]]) -> Work:
+    """Job with no intermediate progress: one {"stage": "done", **result} event."""
+    async def work():
+        yield {"stage": "done", **(await fn())}
+    return work
+
+
+class JobQueue:
+    """
+    Background jobs for the slow endpoints. A job is an async iterator of
+    progress dicts; its last event is the result. Jobs of one kind share a
+    semaphore (`limits[kind]`, default 1) that inline requests can also take
+    via `slot()`, so uploads/LLM calls never oversubscribe the box. State lives
+    in SQLite, so job status survives a restart, and several worker processes
+    can share one database: each job records its owning process, unfinished
+    jobs are marked interrupted only once that process is gone, and events()
+    follows another worker's job by polling its row every `poll` seconds.
+    Submitting with a `key` already used by a queued, running or finished job
+    returns that job instead of doing the work twice.
+    """
+    def __init__(self, db_path: str, limits: Optional[Dict[str, int]] = None, ttl: float = 7 * 86400,
+                 poll: float = 0.5):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self.limits, self.poll = limits or {}, poll
+        self._sems: Dict[str, asyncio.Semaphore] = {}
+        self._subs: Dict[str, List[asyncio.Queue]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute("SELECT id, owner FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+            self._db.executemany("UPDATE jobs SET status='error', error='interrupted by restart', updated=? "
+                                 "WHERE id=? AND status IN ('queued', 'running')",
+                                 [(now, jid) for jid, owner in rows if not owner_alive(owner)])
+            self._db.execute("DELETE FROM jobs WHERE updated < ?", (now - ttl,))
+
+    def _sem(self, kind: str) -> asyncio.Semaphore:
+        if kind not in self._sems:
+            self._sems[kind] = asyncio.Semaphore(self.limits.get(kind, 1))
+        return self._sems[kind]
+
+    @asynccontextmanager
+    async def slot(self, kind: str):
+        """Hold one of `kind`'s concurrency slots (for work done inline in a request)."""
+        async with self._sem(kind):
+            yield
+
+    def _exec(self, sql: str, args: Tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    def _row(self, r) -> Dict[str, Any]:
+        jid, kind, status, progress, result, error, created, updated = r
+        return {"id": jid, "kind": kind, "status": status,
+                "progress": json.loads(progress) if progress else None,
+                "result": json.loads(result) if result else None,
+                "error": error, "created": created, "updated": updated}
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._exec("SELECT id, kind, status, progress, result, error, created, updated "
+                          "FROM jobs WHERE id=?", (job_id,))
+        return self._row(rows[0]) if rows else None
+
+    def find(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        """Latest job of `kind` with `key` that hasn't failed."""
+        rows = self._exec("SELECT id FROM jobs WHERE kind=? AND key=? AND status!='error' "
+                          "ORDER BY created DESC LIMIT 1", (kind, key))
+        return self.get(rows[0][0]) if rows else None
+
+    def submit(self, kind: str, work: Work, key: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """Queue `work`; returns (job, created). Must be called from the event loop."""
+        if key:
+            existing = self.find(kind, key)
+            if existing:
+                return existing, False
+        jid, now = uuid.uuid4().hex, time.time()
+        self._exec("INSERT INTO jobs (id, kind, key, status, created, updated, owner) "
+                   "VALUES (?, ?, ?, 'queued', ?, ?, ?)", (jid, kind, key, now, now, OWNER))
+        self._tasks[jid] = asyncio.create_task(self._run(jid, kind, work))
+        return self.get(jid), True
+
+    def _publish(self, jid: str, status: str, event: Dict[str, Any]) -> None:
+        for q in self._subs.get(jid, []):
+            q.put_nowait({"status": status, **event})
+
+    async def _run(self, jid: str, kind: str, work: Work) -> None:
+        last: Dict[str, Any] = {}
+        try:
+            async with self._sem(kind):
+                self._exec("UPDATE jobs SET status='running', updated=? WHERE id=?", (time.time(), jid))
+                self._publish(jid, "running", {"stage": "running"})
+                async for ev in work():
+                    last = ev
+                    if ev.get("stage") != "done":  # the final event is stored/published once, as the result
+                        self._exec("UPDATE jobs SET progress=?, updated=? WHERE id=?",
+                                   (json.dumps(ev), time.time(), jid))
+                        self._publish(jid, "running", ev)
+            self._exec("UPDATE jobs SET status='done', result=?, updated=? WHERE id=?",
+                       (json.dumps(last), time.time(), jid))
+            self._publish(jid, "done", last)
+        except Exception as e:
+            log.exception("job %s (%s) failed", jid, kind)
+            self._exec("UPDATE jobs SET status='error', error=?, updated=? WHERE id=?", (str(e), time.time(), jid))
+            self._publish(jid, "error", {"stage": "error", "message": str(e)})
+        finally:
+            self._tasks.pop(jid, None)
+
+    @staticmethod
+    def _state(job: Dict[str, Any]) -> Dict[str, Any]:
+        if job["status"] == "error":
+            return {"status": "error", "stage": "error", "message": job["error"]}
+        return {"status": job["status"], **(job["result"] or job["progress"] or {"stage": job["status"]})}
+
+    async def _follow(self, job: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        # another process runs it: poll the row, and give up once that process is gone
+        last = self._state(job)
+        while last["status"] not in TERMINAL:
+            await asyncio.sleep(self.poll)
+            rows = self._exec("SELECT owner FROM jobs WHERE id=?", (job["id"],))
+            if rows and not owner_alive(rows[0][0]):
+                self._exec("UPDATE jobs SET status='error', error='interrupted by restart', updated=? "
+                           "WHERE id=? AND status IN ('queued', 'running')", (time.time(), job["id"]))
+            job = self.get(job["id"])
+            if job is None:
+                return
+            state = self._state(job)
+            if state != last:
+                last = state
+                yield state
+
+    async def events(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Current state, then every progress event until the job finishes."""
+        q: asyncio.Queue = asyncio.Queue()
+        self._subs.setdefault(job_id, []).append(q)
+        try:
+            job = self.get(job_id)
+            if job is None:
+                return
+            yield self._state(job)
+            if job["status"] in TERMINAL:
+                return
+            if job_id not in self._tasks:
+                async for ev in self._follow(job):
+                    yield ev
+                return
+            while True:
+                ev = await q.get()
+                yield ev
+                if ev["status"] in TERMINAL:
+                    return
+        finally:
+            subs = self._subs.get(job_id, [])
+            if q in subs:
+                subs.remove(q)
+            if not subs:
+                self._subs.pop(job_id, None)
+
+    async def close(self) -> None:
+        tasks = list(self._tasks.values())
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        with self._lock:
+            self._db.close()
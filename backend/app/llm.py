@@ -0,0 +1,163 @@
+import asyncio, json, logging, time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+import httpx
+
+from .config import OLLAMA_URL, OLLAMA_MODEL, LLM_CONCURRENCY, LLM_KEEP_ALIVE
+
+log = logging.getLogger(__name__)
+
+# Be generous on read timeout so local models have time to respond.
+TIMEOUT = httpx.Timeout(connect=5.0, read=180.0, write=120.0, pool=5.0)
+
+
+class FairLimiter:
+    """At most `n` holders; waiters are admitted strictly in arrival order."""
+    def __init__(self, n: int):
+        self.n = max(1, n)
+        self.active = self.peak_queued = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        if self.active < self.n and not self._waiters:
+            self.active += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        self.peak_queued = max(self.peak_queued, len(self._waiters))
+        try:
+            await fut  # release() hands its slot over by resolving this
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # got the slot just as we were cancelled
+            else:
+                self._waiters.remove(fut)
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.active -= 1
+
+
+class OllamaClient:
+    """
+    One pooled client to the local Ollama for the app's lifetime. At most
+    `concurrency` generations run at once and the rest queue in FIFO order, so
+    concurrent users don't thrash the model; every request asks Ollama to keep
+    the model loaded for `keep_alive`. `stats` has queue-wait and generation
+    times (totals and maxima, in seconds).
+    """
+    def __init__(self, base: str = OLLAMA_URL, concurrency: int = LLM_CONCURRENCY,
+                 keep_alive: str = LLM_KEEP_ALIVE, timeout: httpx.Timeout = TIMEOUT,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base, self.keep_alive, self.timeout = base, keep_alive, timeout
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self.limiter = FairLimiter(concurrency)
+        self.stats: Dict[str, Any] = {"requests": 0, "errors": 0,
+                                      "queue_wait_s": 0.0, "queue_wait_max_s": 0.0,
+                                      "gen_s": 0.0, "gen_max_s": 0.0}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            n = self.limiter.n
+            self._client = httpx.AsyncClient(
+                base_url=self.base, timeout=self.timeout, transport=self._transport,
+                limits=httpx.Limits(max_connections=n + 2, max_keepalive_connections=n + 2),
+            )
+        return self._client
+
+    def snapshot(self) -> Dict[str, Any]:
+        lim = self.limiter
+        return {**self.stats, "in_flight": lim.active, "queued": lim.queued, "peak_queued": lim.peak_queued}
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one generation slot; records queue wait and time held."""
+        t0 = time.perf_counter()
+        await self.limiter.acquire()
+        t1 = time.perf_counter()
+        self.stats["requests"] += 1
+        self.stats["queue_wait_s"] += t1 - t0
+        self.stats["queue_wait_max_s"] = max(self.stats["queue_wait_max_s"], t1 - t0)
+        try:
+            yield
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.limiter.release()
+            gen = time.perf_counter() - t1
+            self.stats["gen_s"] += gen
+            self.stats["gen_max_s"] = max(self.stats["gen_max_s"], gen)
+
+    def _payload(self, req: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+        return {"keep_alive": self.keep_alive, **req, "stream": stream}
+
+    async def chat(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        """Non-streaming /api/chat; returns Ollama's response object."""
+        async with self.slot():
+            r = await self.client.post("/api/chat", json=self._payload(req, False))
+            r.raise_for_status()
+            return r.json()
+
+    async def stream_chat(self, req: Dict[str, Any]) -> AsyncIterator[str]:
+        """Streaming /api/chat; yields content pieces. Close it (aclosing) to free the slot early."""
+        async with self.slot():
+            async with self.client.stream("POST", "/api/chat", json=self._payload(req, True)) as resp:
+                resp.raise_for_status()
+                async for line in resp.aiter_lines():
+                    if not line:
+                        continue
+                    try:
+                        obj = json.loads(line)
+                    except ValueError:
+                        continue
+                    if obj.get("done"):
+                        break
+                    msg = (obj.get("message") or {}).get("content")
+                    if msg:
+                        yield msg
+
+    async def preload(self, model: str = OLLAMA_MODEL) -> bool:
+        """Load `model` into memory ahead of the first request (a /api/generate with no prompt)."""
+        if not model:
+            return False
+        t0 = time.perf_counter()
+        try:
+            r = await self.client.post("/api/generate", json={"model": model, "keep_alive": self.keep_alive})
+            r.raise_for_status()
+        except Exception as e:
+            log.warning("preloading %s failed: %s", model, e)
+            return False
+        log.info("preloaded %s in %.1fs", model, time.perf_counter() - t0)
+        return True
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_client: Optional[OllamaClient] = None
+
+def get_llm() -> OllamaClient:
+    global _client
+    if _client is None:
+        _client = OllamaClient()
+    return _client
+
+async def close_llm() -> None:
+    if _client is not None:
+        await _client.aclose()
@@ -1,19 +1,37 @@
-from fastapi import FastAPI, UploadFile, Form, Body, HTTPException, Request
-from httpx import ReadTimeout
+from fastapi import FastAPI, UploadFile, Form, Body, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-import json, asyncio, httpx, logging, traceback
+import json, asyncio, httpx, logging, os, shutil, traceback, uuid
 from typing import Dict, Any, List
-import hashlib, re
-
-from .config import API_TITLE, ALLOWED_ORIGINS, RAG_STORE, EMBED_MODEL, FAISS_INDEX, FAISS_META
-from .chunking import to_chunks
-from .embeddings import embed_texts
+import re
+
+from .config import API_TITLE, ALLOWED_ORIGINS, RAG_STORE, EMBED_MODEL, FAISS_INDEX, FAISS_META, FAISS_SEGMENTS
+from .config import FAISS_INDEX_TYPE, FAISS_INDEX_PARAMS, EMBED_DIM
+from .config import EMBED_MAX_BATCH, EMBED_WINDOW_MS, EMBED_QUEUE_DEPTH, EMBED_WORKERS
+from .config import EMBED_QUERY_CACHE, EMBED_CACHE_DIR, EMBED_CACHE_MB
+from .config import EMBED_BACKEND, EMBED_ONNX_FILE, EMBED_WARMUP, INGEST_BATCH
+from .config import JOBS_DIR, JOBS_CONCURRENCY, GITHUB_ISSUE_CONCURRENCY
+from .config import EXTRACT_CONCURRENCY, EXTRACT_WINDOW_CHUNKS, EXTRACT_DEDUPE_SIM, LLM_PRELOAD
+from .config import RETRIEVAL_CACHE, RETRIEVAL_HYBRID, RETRIEVAL_CANDIDATES
+from .ingest import ingest
+from .jobs import JobQueue, once, parse_limits
+from .embeddings import embed_texts, warmup
+from .embed_service import EmbeddingService
+from .embed_cache import CachedEmbedder, QueryCache
+from .diskcache import DiskCache
 from .vectorstore.factory import get_store
-from .storage import save_meeting, load_chunks
-from .tasks import OLLAMA_URL, OLLAMA_MODEL, TIMEOUT, _parse_tasks_json, extract_tasks_rules, extract_tasks_ollama
+from .extract import extract_map_reduce, normalize_task
+from .retrieval import Retriever
+from .storage import load_chunks, chunk_repo, get_chunks, get_catalog, list_meetings, delete_meeting
+from .tasks import OLLAMA_MODEL, _parse_tasks_json, extract_tasks_rules, extract_tasks_ollama_cached
+from .tasks import TaskStreamParser
+from .tasks import cached_reply, cache_reply, llm_cache
 from fastapi.responses import StreamingResponse
-from .github import ensure_labels, create_issue, find_issue_by_fp, task_fingerprint
+from .github import RateLimited, ensure_labels, get_client, close_client, fingerprints, label_cache
+from .llm import get_llm, close_llm
+from .issues import create_issues_batch
 from typing import Optional
+from contextlib import aclosing, asynccontextmanager
+from pathlib import Path
 
 import logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
@@ -22,10 +40,40 @@ log = logging.getLogger(__name__)
 def _sse(d: dict) -> str:
     return f"data: {json.dumps(d)}\n\n"
 
-DIM = 384  # MiniLM-L6-v2 output size
-store = get_store(DIM, RAG_STORE, FAISS_INDEX, FAISS_META)
+DIM = EMBED_DIM
+store = get_store(DIM, RAG_STORE, FAISS_INDEX, FAISS_META, FAISS_SEGMENTS, FAISS_INDEX_TYPE, FAISS_INDEX_PARAMS)
+# all model calls go through here so they never block the event loop
+embedder = CachedEmbedder(
+    EmbeddingService(lambda texts: embed_texts(texts, EMBED_MODEL, EMBED_BACKEND, EMBED_ONNX_FILE),
+                     max_batch=EMBED_MAX_BATCH, window_ms=EMBED_WINDOW_MS,
+                     queue_depth=EMBED_QUEUE_DEPTH, workers=EMBED_WORKERS),
+    # backends differ slightly numerically, so they don't share cached vectors
+    EMBED_MODEL if EMBED_BACKEND == "torch" else f"{EMBED_MODEL}@{EMBED_BACKEND}",
+    queries=QueryCache(EMBED_QUERY_CACHE),
+    chunks=DiskCache(EMBED_CACHE_DIR, EMBED_CACHE_MB * 1024 * 1024),
+)
+retriever = Retriever(store, embedder.embed_one, max_entries=RETRIEVAL_CACHE,
+                      hybrid=RETRIEVAL_HYBRID, candidates=RETRIEVAL_CANDIDATES)
+jobs = JobQueue(os.path.join(JOBS_DIR, "jobs.sqlite3"), parse_limits(JOBS_CONCURRENCY))
 
-app = FastAPI(title=API_TITLE)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if EMBED_WARMUP:
+        try:
+            await asyncio.to_thread(warmup, EMBED_MODEL, EMBED_BACKEND, EMBED_ONNX_FILE)
+        except Exception as e:
+            log.warning("embedder warm-up failed: %s", e)
+    # load the model in the background so the first extraction doesn't pay for it
+    preload = asyncio.create_task(get_llm().preload(OLLAMA_MODEL)) if LLM_PRELOAD and OLLAMA_MODEL else None
+    yield
+    if preload is not None:
+        preload.cancel()
+    await jobs.close()
+    await close_client()
+    await close_llm()
+    await embedder.service.close()
+
+app = FastAPI(title=API_TITLE, lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=ALLOWED_ORIGINS,
@@ -34,183 +82,186 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def _id(text: str, meta: Dict[str, Any]):
-    return hashlib.sha256((text + str(meta)).encode("utf-8")).hexdigest()[:16]
-
 @app.get("/")
 def root():
     return {"ok": True}
 
+def _job_response(job: Dict[str, Any], created: bool) -> Dict[str, Any]:
+    return {"job_id": job["id"], "status": job["status"], "deduplicated": not created}
+
+def _spool(src, path: Path) -> None:
+    with open(path, "wb") as out:
+        shutil.copyfileobj(src, out)
+
+def _ingest_job(path: Path, meeting_id: str, title: str, size: Optional[int]):
+    async def work():
+        try:
+            with open(path, "rb") as f:
+                async for ev in ingest(f, meeting_id, title, store, embedder, INGEST_BATCH, size):
+                    yield ev
+        finally:
+            path.unlink(missing_ok=True)
+    return work
+
 @app.post("/upload")
-async def upload(file: UploadFile, meeting_id: str = Form(...), title: str = Form("")):
-    raw = (await file.read()).decode("utf-8", errors="ignore")
-    chunks = to_chunks(raw)
-    save_meeting(meeting_id, title, raw, chunks)
-
-    metas = [{"meeting_id": meeting_id, "title": title, "i": i} for i, _ in enumerate(chunks)]
-    ids = [_id(chunks[i], metas[i]) for i in range(len(chunks))]
-    vecs = embed_texts(chunks, EMBED_MODEL)
-    store.upsert(ids, vecs, metas)
-    store.persist()
-    return {"ok": True, "chunks_indexed": len(chunks)}
+async def upload(file: UploadFile, meeting_id: str = Form(...), title: str = Form(""),
+                 background: bool = False, idempotency_key: Optional[str] = Header(None)):
+    """
+    ?background=1 spools the upload and returns {"job_id"} at once;
+    follow it with GET /jobs/{id} or /jobs/{id}/events.
+    """
+    await file.seek(0)
+    if background:
+        if idempotency_key and (job := jobs.find("ingest", idempotency_key)):
+            return _job_response(job, False)
+        path = Path(JOBS_DIR) / "uploads" / uuid.uuid4().hex
+        path.parent.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(_spool, file.file, path)
+        job, created = jobs.submit("ingest", _ingest_job(path, meeting_id, title, file.size), idempotency_key)
+        return _job_response(job, created)
+
+    n = 0
+    async with jobs.slot("ingest"):
+        async for ev in ingest(file.file, meeting_id, title, store, embedder, INGEST_BATCH):
+            n = ev.get("chunks_indexed", n)
+    return {"ok": True, "chunks_indexed": n}
+
+@app.post("/upload/stream")
+async def upload_stream(request: Request, file: UploadFile, meeting_id: str = Form(...), title: str = Form("")):
+    """
+    Same as /upload, but streams progress as SSE:
+    {"stage": "indexing", "chunks", "bytes", "progress"} per batch -> {"stage": "done", "chunks_indexed"}
+    """
+    await file.seek(0)
+
+    async def gen():
+        try:
+            async with jobs.slot("ingest"):
+                # closed (and rolled back) inside the slot, not whenever it is garbage-collected
+                events = ingest(file.file, meeting_id, title, store, embedder, INGEST_BATCH, file.size)
+                async with aclosing(events):
+                    async for ev in events:
+                        if await request.is_disconnected():
+                            return
+                        yield _sse(ev)
+        except Exception as e:
+            yield _sse({"stage": "error", "message": str(e)})
+
+    return StreamingResponse(
+        gen(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/meetings")
+def meetings():
+    return {"meetings": list_meetings()}
+
+@app.get("/meetings/{meeting_id}")
+def meeting(meeting_id: str, extractions: int = 5):
+    cat = get_catalog()
+    m = cat.meeting(meeting_id)
+    if m is None:
+        raise HTTPException(status_code=404, detail=f"unknown meeting {meeting_id}")
+    return {**m, "extractions": cat.extractions(meeting_id, extractions)}
+
+@app.delete("/meetings/{meeting_id}")
+async def remove_meeting(meeting_id: str):
+    async with jobs.slot("ingest"):
+        removed = await asyncio.to_thread(store.delete_meeting, meeting_id)
+        await asyncio.to_thread(store.persist)
+    if not await asyncio.to_thread(delete_meeting, meeting_id) and not removed:
+        raise HTTPException(status_code=404, detail=f"unknown meeting {meeting_id}")
+    return {"ok": True, "vectors_removed": removed}
 
 @app.get("/search")
-def search(meeting_id: str, q: str, k: int = 5):
-    qvec = embed_texts([q], EMBED_MODEL)[0]
-    res = store.query(qvec, k=k, filters={"meeting_id": meeting_id})
+async def search(meeting_id: str, q: str, k: int = 5):
+    qvec = await embedder.embed_one(q)
+    res = await asyncio.to_thread(store.query, qvec, k=k, filters={"meeting_id": meeting_id})
     return {"results": [{"id": rid, "score": score, "meta": meta} for rid, score, meta in res]}
 
 @app.post("/tasks")
-async def tasks(payload: Dict[str, Any] = Body(...)):
+async def tasks(payload: Dict[str, Any] = Body(...), background: bool = False,
+                idempotency_key: Optional[str] = Header(None)):
     """
     Body: {"meeting_id": "...", "q": "action items", "k": 5}
+    "hybrid": true|false overrides RETRIEVAL_HYBRID (BM25 fused with the vector ranking).
+    "mode": "map_reduce" extracts from every chunk instead of the top-k.
+    "cached" in the response is true when the LLM reply came from the cache.
+    ?background=1 returns {"job_id"}; the job result is this endpoint's response.
     """
+    if background:
+        job, created = jobs.submit("tasks", once(lambda: _extract_tasks(payload)), idempotency_key)
+        return _job_response(job, created)
+    # no jobs slot: cache hits and rules must not queue behind a generation;
+    # Ollama calls are bounded by the LLM client's own limiter
+    return await _extract_tasks(payload)
+
+async def _map_reduce_events(meeting_id: str):
+    """Extraction over every chunk of the meeting: "map" events as windows finish, then "done"."""
+    chunks = await asyncio.to_thread(load_chunks, meeting_id)
+    # task titles go to the model directly: they'd only churn the chunk-embedding cache
+    async with aclosing(extract_map_reduce(chunks, EXTRACT_CONCURRENCY, EXTRACT_WINDOW_CHUNKS,
+                                           embedder.service.embed, EXTRACT_DEDUPE_SIM)) as events:
+        async for ev in events:
+            if ev["stage"] == "done":
+                await asyncio.to_thread(get_catalog().add_extraction, meeting_id, ev["mode"], ev["tasks"])
+            yield ev
+
+async def _extract_tasks(payload: Dict[str, Any]) -> Dict[str, Any]:
     meeting_id = payload["meeting_id"]
     q = payload.get("q", "action items from this meeting")
     k = int(payload.get("k", 5))
 
-    # 1) retrieve top-k snippets
-    qvec = embed_texts([q], EMBED_MODEL)[0]
-    hits = store.query(qvec, k=k, filters={"meeting_id": meeting_id})
-    idxs = [h[2].get("i") for h in hits]
+    if payload.get("mode") == "map_reduce":
+        out: Dict[str, Any] = {}
+        async for ev in _map_reduce_events(meeting_id):
+            out = ev
+        return {"tasks": out["tasks"], "mode": out["mode"], "cached": out["cached"]}
 
-    # 2) load texts (fallback to first k chunks if retrieval is empty)
-    all_chunks: List[Dict[str, Any]] = load_chunks(meeting_id)
-    if not idxs:
-        idxs = [c["i"] for c in all_chunks[:k]]
-    context = [c for c in all_chunks if c["i"] in idxs]
+    # 1) retrieve top-k snippets (first k chunks if retrieval is empty)
+    context: List[Dict[str, Any]] = await retriever.retrieve(meeting_id, q, k, payload.get("hybrid"))
     context_texts = [c["text"] for c in context]
 
     # 3) try Ollama first (free local LLM)
     
     try:
-        tasks_llm = await extract_tasks_ollama(context_texts)
+        tasks_llm, cached = await extract_tasks_ollama_cached(context_texts)
     except Exception as e:
         logging.warning("extract_tasks_ollama raised: %s", e)
-        tasks_llm = []
+        tasks_llm, cached = [], False
 
     if tasks_llm:
-       
-
-        #  normalization 
         # Map/validate source_i so it always points to a *global* chunk index
-        valid = set(idxs)
-        def norm_src(x):
-            try:
-                v = int(x)
-            except Exception:
-                return idxs[0] if idxs else 0
-            # If model already returned a global chunk index and it's valid
-            if v in valid:
-                return v
-            # If model returned a *position in the retrieved list* (0..len(idxs)-1), map it
-            if 0 <= v < len(idxs):
-                return idxs[v]
-            # Fallback to the first retrieved chunk
-            return idxs[0] if idxs else 0
-
-        # ---------- Return mapping (normalize each task object) ----------
-        normalized = []
-        for t in tasks_llm:
-            normalized.append({
-                "title": t.get("title", ""),
-                "body": t.get("body", ""),
-                "labels": t.get("labels") or ["meeting-action"],
-                "assignee_hint": t.get("assignee_hint"),
-                "due_hint": t.get("due_hint"),
-                "source_i": norm_src(t.get("source_i")),
-                "confidence": t.get("confidence", 0.7),
-            })
-        return {"tasks": normalized, "mode": "ollama"}
+        normalized = [normalize_task(t, [c["i"] for c in context]) for t in tasks_llm]
+        await asyncio.to_thread(get_catalog().add_extraction, meeting_id, "ollama", normalized, q, k)
+        return {"tasks": normalized, "mode": "ollama", "cached": cached}
 
     # 4) fallback: rules
     rules = extract_tasks_rules(context)
-    return {"tasks": rules, "mode": "rules"}
+    await asyncio.to_thread(get_catalog().add_extraction, meeting_id, "rules", rules, q, k)
+    return {"tasks": rules, "mode": "rules", "cached": False}
 
 
 @app.post("/issues")
-async def create_issues(payload: Dict[str, Any] = Body(...)):
+async def create_issues(payload: Dict[str, Any] = Body(...), background: bool = False,
+                        idempotency_key: Optional[str] = Header(None)):
+    """?background=1 returns {"job_id"}; the job result is this endpoint's response."""
+    if background:
+        _check_repo(payload)
+        job, created = jobs.submit("issues", lambda: _issue_events(payload), idempotency_key)
+        return _job_response(job, created)
     try:
-        repo: str = payload["repo"]
-        log.info(f"/issues repo={repo}")  
-        # friendly validation (owner/repo)
-        if not re.match(r"^[A-Za-z0-9_.-]+/[A-Za-z0-9_.-]+$", repo):
-            raise HTTPException(status_code=400, detail={
-                "where": "client",
-                "error": f'Invalid repo "{repo}". Use "hs14235/meeting-to-issues"'
-            })
-        meeting_id: Optional[str] = payload.get("meeting_id")
-        tasks = payload["tasks"]
-        assignee_map: Dict[str, str] = payload.get("assignee_map") or {}
-
-        # Optional: cache meeting chunks for source snippets
-        snippet_by_i: Dict[int, str] = {}
-        if meeting_id:
-            for c in load_chunks(meeting_id):
-                snippet_by_i[c["i"]] = c["text"]
-
-        # Ensure labels exist
-        all_labels = sorted({lab for t in tasks for lab in (t.get("labels") or [])})
-        if all_labels:
-            await ensure_labels(repo, all_labels)
-
-        created = []
-        for t in tasks:
-            title = (t.get("title") or "").strip()
-            if not title:
-                created.append({"title": "(empty)", "status": "skipped-empty-title"})
-                continue
-            body  = (t.get("body")  or "").strip()
-            si    = t.get("source_i")  # <-- FIX: define si
-            fp    = task_fingerprint(title, body)
-
-            # hidden fingerprint marker for idempotency
-            body += f"\n\n<!-- mtg:{meeting_id} fp:{fp} -->"
-
-            # add short source snippet
-            if meeting_id is not None and si is not None:
-                snippet = snippet_by_i.get(si, "")
-                if snippet:
-                    if len(snippet) > 400:
-                        snippet = snippet[:400] + "…"
-                    body += f"\n\n_Source: meeting `{meeting_id}`, chunk #{si}_\n```\n{snippet}\n```"
-
-            # skip duplicate if already open
-            existing = await find_issue_by_fp(repo, fp)
-            if existing:
-                created.append({
-                    "number": existing["number"],
-                    "url": existing["html_url"],
-                    "title": title,
-                    "status": "skipped-duplicate",
-                })
-                continue
-
-            # optional assignee mapping
-            gh_user = None
-            hint = t.get("assignee_hint")
-            if isinstance(hint, str):
-                gh_user = assignee_map.get(hint) or assignee_map.get(hint.lower())
-
-            labels = t.get("labels") or ["meeting-action"]
-            if isinstance(labels, str):
-                labels = [labels]
-
-            issue = await create_issue(
-                repo,
-                title,
-                body,
-                labels=labels,
-            )
-            created.append({
-                "number": issue["number"],
-                "url": issue["html_url"],
-                "title": title,
-                "status": "created",
-            })
-
-        return {"created": created}
-
+        async with jobs.slot("issues"):
+            return await _create_issues(payload)
+    except HTTPException:
+        raise
+    except RateLimited as e:
+        raise HTTPException(status_code=429, headers={"Retry-After": str(round(e.retry_after))}, detail={
+            "where": "github",
+            "error": str(e),
+            "reset": e.reset,
+        })
     except httpx.HTTPStatusError as e:
         raise HTTPException(status_code=502, detail={
             "where": "github",
@@ -223,7 +274,81 @@ async def create_issues(payload: Dict[str, Any] = Body(...)):
             "error": str(e),
             "trace_tail": traceback.format_exc().splitlines()[-4:],
         })
-    
+
+def _check_repo(payload: Dict[str, Any]) -> str:
+    repo: str = payload["repo"]
+    log.info(f"/issues repo={repo}")  
+    # friendly validation (owner/repo)
+    if not re.match(r"^[A-Za-z0-9_.-]+/[A-Za-z0-9_.-]+$", repo):
+        raise HTTPException(status_code=400, detail={
+            "where": "client",
+            "error": f'Invalid repo "{repo}". Use "hs14235/meeting-to-issues"'
+        })
+    return repo
+
+async def _create_issues(payload: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    async for ev in _issue_events(payload):
+        out = ev
+    return {"created": out["created"], "failed": out["failed"]}
+
+async def _issue_events(payload: Dict[str, Any]):
+    """Per-task {"stage": "issue", "index", "status", ...} events as issues finish, then {"stage": "done", "created"}."""
+    repo: str = _check_repo(payload)
+    meeting_id: Optional[str] = payload.get("meeting_id")
+    tasks = payload["tasks"]
+    assignee_map: Dict[str, str] = payload.get("assignee_map") or {}
+
+    # Optional: cache meeting chunks for source snippets
+    snippet_by_i: Dict[int, str] = {}
+    if meeting_id:
+        for c in get_chunks(meeting_id, {t.get("source_i") for t in tasks}):
+            snippet_by_i[c["i"]] = c["text"]
+
+    # Ensure labels exist
+    all_labels = sorted({lab for t in tasks for lab in (t.get("labels") or [])})
+    if all_labels:
+        await ensure_labels(repo, all_labels)
+
+    # one paged listing of open issues (conditional on refresh) instead of a search per task
+    open_fps = await fingerprints.get(repo)
+
+    created: List[Optional[Dict[str, Any]]] = [None] * len(tasks)
+    n_done = 0
+    async with aclosing(create_issues_batch(repo, tasks, meeting_id, snippet_by_i, open_fps,
+                                            assignee_map, GITHUB_ISSUE_CONCURRENCY)) as results:
+        async for i, res in results:
+            created[i] = res
+            n_done += 1
+            yield {"stage": "issue", "index": i, "done": n_done, "total": len(tasks), **res}
+
+    yield {"stage": "done", "created": created,
+           "failed": sum(r["status"] == "failed" for r in created)}
+
+@app.post("/issues/stream")
+async def issues_stream(request: Request, payload: Dict[str, Any] = Body(...)):
+    """
+    Same body as /issues; streams one {"stage": "issue", "index", "status", ...}
+    event per task as it finishes, then {"stage": "done", "created", "failed"}.
+    """
+    _check_repo(payload)
+
+    async def gen():
+        try:
+            async with jobs.slot("issues"), aclosing(_issue_events(payload)) as events:
+                async for ev in events:
+                    if await request.is_disconnected():
+                        return
+                    yield _sse(ev)
+        except Exception as e:
+            yield _sse({"stage": "error", "message": str(e)})
+
+    return StreamingResponse(
+        gen(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.post("/issues/preview")
 async def issues_preview(payload: Dict[str, Any] = Body(...)):
     """
@@ -236,7 +361,7 @@ async def issues_preview(payload: Dict[str, Any] = Body(...)):
 
     snippet_by_i = {}
     if meeting_id:
-        for c in load_chunks(meeting_id):
+        for c in get_chunks(meeting_id, {t.get("source_i") for t in tasks}):
             snippet_by_i[c["i"]] = c["text"]
 
     preview = []
@@ -261,15 +386,35 @@ async def issues_preview(payload: Dict[str, Any] = Body(...)):
 def healthz():
     return {"ok": True}
 
+@app.get("/stats")
+def stats():
+    return {"embeddings": embedder.stats(), "chunks": dict(chunk_repo.stats),
+            "retrieval": dict(retriever.stats), "github": get_client().stats,
+            "fingerprints": fingerprints.stats, "labels": label_cache.stats,
+            "llm": get_llm().snapshot(), "llm_cache": llm_cache.stats if llm_cache else None}
+
 
 @app.post("/tasks/stream")
 async def tasks_stream(request: Request, payload: Dict[str, Any] = Body(...)):
     """
     Body: {"meeting_id": "...", "q": "action items", "k": 5}
-    Streams stages: retrieving -> ollama (many) -> parsing -> rules_fallback? -> done
+    Streams stages: retrieving -> ollama (many) / task (many) -> parsing -> rules_fallback? -> done
+    Each "task" event carries one task as soon as the model has finished writing it;
+    "done" has the full, authoritative list (rules if the stream failed part-way).
+    A cached reply skips the ollama stage; "done" then carries "cached": true.
+    With "mode": "map_reduce": map (one per window, with its new tasks) -> done
     """
     async def gen():
         try:
+            if payload.get("mode") == "map_reduce":
+                # closed on disconnect so the remaining windows' generations are cancelled
+                async with aclosing(_map_reduce_events(payload["meeting_id"])) as events:
+                    async for ev in events:
+                        if await request.is_disconnected():
+                            return
+                        yield _sse(ev)
+                return
+
             # 1) retrieve context (reuse logic from /tasks)
             meeting_id = payload["meeting_id"]
             q = payload.get("q", "action items from this meeting")
@@ -278,21 +423,15 @@ async def tasks_stream(request: Request, payload: Dict[str, Any] = Body(...)):
             await asyncio.sleep(0)  # let loop breathe
             yield _sse({"stage": "retrieving"})
 
-            qvec = embed_texts([q], EMBED_MODEL)[0]
-            hits = store.query(qvec, k=k, filters={"meeting_id": meeting_id})
-            idxs = [h[2].get("i") for h in hits]
-
-            all_chunks = load_chunks(meeting_id)
-            if not idxs:
-                idxs = [c["i"] for c in all_chunks[:k]]
-            context = [c for c in all_chunks if c["i"] in idxs]
+            context = await retriever.retrieve(meeting_id, q, k, payload.get("hybrid"))
             context_texts = [c["text"] for c in context]
 
             # 2) stream ollama if configured
             if not OLLAMA_MODEL:
                 yield _sse({"stage": "parsing", "note": "OLLAMA_MODEL not set; using rules"})
                 tasks = extract_tasks_rules(context)
-                yield _sse({"stage": "done", "mode": "rules", "tasks": tasks})
+                await asyncio.to_thread(get_catalog().add_extraction, meeting_id, "rules", tasks, q, k)
+                yield _sse({"stage": "done", "mode": "rules", "tasks": tasks, "cached": False})
                 return
 
             system = (
@@ -317,30 +456,26 @@ async def tasks_stream(request: Request, payload: Dict[str, Any] = Body(...)):
                 
             }
 
-            chunk_text = ""
+            idxs = [c["i"] for c in context]
+            parser = TaskStreamParser()
+            chunk_text = cached_reply(req) or ""
+            cached = bool(chunk_text)
             chunks = 0
             try:
-                async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-                    async with client.stream("POST", f"{OLLAMA_URL}/api/chat", json=req) as resp:
-                        resp.raise_for_status()
-                        async for line in resp.aiter_lines():
+                for t in parser.feed(chunk_text):
+                    yield _sse({"stage": "task", "task": normalize_task(t, idxs)})
+                if not cached:
+                    async with aclosing(get_llm().stream_chat(req)) as pieces:
+                        async for msg in pieces:
                             if await request.is_disconnected():
                                 return
-                            if not line:
-                                continue
-                            try:
-                                obj = json.loads(line)
-                            except Exception:
-                                continue
-                            if obj.get("done"):
-                                break
-                            msg = (obj.get("message") or {}).get("content")
-                            if msg:
-                                chunk_text += msg
-                                chunks += 1
-                                # pseudo-progress: cap at 95 until parse
-                                pct = min(95, 10 + chunks * 3)
-                                yield _sse({"stage": "ollama", "progress": pct, "chunks": chunks})
+                            chunk_text += msg
+                            chunks += 1
+                            # pseudo-progress: cap at 95 until parse
+                            pct = min(95, 10 + chunks * 3)
+                            yield _sse({"stage": "ollama", "progress": pct, "chunks": chunks})
+                            for t in parser.feed(msg):
+                                yield _sse({"stage": "task", "task": normalize_task(t, idxs)})
             except Exception as e:
                 log.warning("ollama stream failed: %s", e)
                 chunk_text = ""  # force fallback
@@ -348,14 +483,18 @@ async def tasks_stream(request: Request, payload: Dict[str, Any] = Body(...)):
             # 3) parse or fallback to rules
             if chunk_text:
                 yield _sse({"stage": "parsing"})
-                tasks = _parse_tasks_json(chunk_text)
+                tasks = [normalize_task(t, idxs) for t in _parse_tasks_json(chunk_text)]
                 if tasks:
-                    yield _sse({"stage": "done", "mode": "ollama", "tasks": tasks})
+                    if not cached:
+                        cache_reply(req, chunk_text)
+                    await asyncio.to_thread(get_catalog().add_extraction, meeting_id, "ollama", tasks, q, k)
+                    yield _sse({"stage": "done", "mode": "ollama", "tasks": tasks, "cached": cached})
                     return
 
             yield _sse({"stage": "rules_fallback"})
             tasks = extract_tasks_rules(context)
-            yield _sse({"stage": "done", "mode": "rules", "tasks": tasks})
+            await asyncio.to_thread(get_catalog().add_extraction, meeting_id, "rules", tasks, q, k)
+            yield _sse({"stage": "done", "mode": "rules", "tasks": tasks, "cached": False})
 
         except Exception as e:
             yield _sse({"stage": "error", "message": str(e)})
@@ -364,4 +503,29 @@ async def tasks_stream(request: Request, payload: Dict[str, Any] = Body(...)):
         gen(),
         media_type="text/event-stream",
         headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
-    )
\ No newline at end of file
+    )
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"unknown job {job_id}")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(request: Request, job_id: str):
+    """SSE: the job's current state, then each progress event until it is done or fails."""
+    if jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"unknown job {job_id}")
+
+    async def gen():
+        async for ev in jobs.events(job_id):
+            if await request.is_disconnected():
+                return
+            yield _sse(ev)
+
+    return StreamingResponse(
+        gen(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,147 @@
+"""
+Re-run task extraction over every stored meeting, e.g. after tuning the rules
+or switching models. Rules run in a process pool; --llm runs map-reduce
+extraction through Ollama with at most --llm-concurrency meetings in flight.
+Each finished meeting is appended to a JSONL results file (and recorded in the
+catalog), so an interrupted run resumes where it stopped.
+
+    python -m app.reextract --workers 8
+    python -m app.reextract --llm --llm-concurrency 2 --out ../data/reextract/llama3.jsonl
+"""
+import argparse, asyncio, json, os, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from . import storage
+from .config import EXTRACT_CONCURRENCY, EXTRACT_WINDOW_CHUNKS
+from .tasks import extract_tasks_rules
+
+# (meeting_id, chunks, tasks, mode)
+Result = Tuple[str, int, List[Dict[str, Any]], str]
+
+
+def _init_worker(data_root: str) -> None:
+    storage.DATA_ROOT = Path(data_root)  # same archive as the parent, whatever the start method
+
+def rules_one(meeting_id: str) -> Result:
+    chunks = storage.load_chunks(meeting_id)
+    return meeting_id, len(chunks), extract_tasks_rules(chunks), "rules"
+
+
+def done_ids(out: Path) -> Set[str]:
+    """Meetings already in a results file; a last line cut short by a crash is dropped."""
+    done: Set[str] = set()
+    if not out.exists():
+        return done
+    with open(out, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+    for line in data[:end].splitlines():
+        try:
+            done.add(json.loads(line)["meeting_id"])
+        except (ValueError, KeyError):
+            continue
+    return done
+
+
+def run_rules(ids: List[str], workers: int) -> Iterator[Result]:
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(str(storage.DATA_ROOT),)) as pool:
+        for fut in as_completed([pool.submit(rules_one, m) for m in ids]):
+            yield fut.result()
+
+
+async def _run_llm(ids: List[str], concurrency: int, window: int, per_meeting: int, emit) -> None:
+    from .extract import extract_map_reduce
+    from .llm import close_llm
+
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(meeting_id: str) -> None:
+        async with sem:
+            chunks = await asyncio.to_thread(storage.load_chunks, meeting_id)
+            ev: Dict[str, Any] = {}
+            async for ev in extract_map_reduce(chunks, per_meeting, window):
+                pass
+            emit((meeting_id, len(chunks), ev.get("tasks", []), ev.get("mode", "rules")))
+
+    try:
+        await asyncio.gather(*(one(m) for m in ids))
+    finally:
+        await close_llm()
+
+
+class Progress:
+    def __init__(self, total: int, every: int):
+        self.total, self.every = total, every
+        self.meetings = self.chunks = self.tasks = 0
+        self.t0 = time.perf_counter()
+
+    def add(self, n_chunks: int, n_tasks: int) -> None:
+        self.meetings += 1
+        self.chunks += n_chunks
+        self.tasks += n_tasks
+        if self.every and self.meetings % self.every == 0:
+            print(self.line(), flush=True)
+
+    def line(self) -> str:
+        s = max(time.perf_counter() - self.t0, 1e-9)
+        return (f"{self.meetings}/{self.total} meetings, {self.chunks} chunks, {self.tasks} tasks in {s:.1f}s "
+                f"({self.meetings / s:.1f} meetings/s, {self.chunks / s:.0f} chunks/s)")
+
+
+def reextract(out: Path, llm: bool = False, workers: Optional[int] = None, llm_concurrency: int = 1,
+              meetings: Optional[List[str]] = None, record: bool = True, restart: bool = False,
+              every: int = 100) -> Progress:
+    """Extract every meeting (or `meetings`) not yet in `out`; returns the run's counters."""
+    out.parent.mkdir(parents=True, exist_ok=True)
+    if restart:
+        out.unlink(missing_ok=True)
+    ids = meetings or [m["meeting_id"] for m in storage.list_meetings()]
+    done = done_ids(out)
+    todo = [m for m in ids if m not in done]
+    if done:
+        print(f"resuming: {len(ids) - len(todo)} of {len(ids)} meetings already in {out}")
+    prog = Progress(len(todo), every)
+    catalog = storage.get_catalog() if record else None
+
+    with open(out, "a", encoding="utf-8") as f:
+        def emit(r: Result) -> None:
+            meeting_id, n_chunks, tasks, mode = r
+            f.write(json.dumps({"meeting_id": meeting_id, "mode": mode, "chunks": n_chunks, "tasks": tasks},
+                               ensure_ascii=False) + "\n")
+            f.flush()
+            if catalog is not None:
+                catalog.add_extraction(meeting_id, mode, tasks)
+            prog.add(n_chunks, len(tasks))
+
+        if llm:
+            asyncio.run(_run_llm(todo, llm_concurrency, EXTRACT_WINDOW_CHUNKS, EXTRACT_CONCURRENCY, emit))
+        elif todo:
+            for r in run_rules(todo, workers or os.cpu_count() or 1):
+                emit(r)
+    return prog
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--llm", action="store_true", help="map-reduce extraction through Ollama instead of the rules")
+    ap.add_argument("--workers", type=int, default=None, help="rule-extraction processes (default: CPU count)")
+    ap.add_argument("--llm-concurrency", type=int, default=1, help="meetings extracted through the LLM at once")
+    ap.add_argument("--meetings", default="", help="comma-separated meeting ids (default: all)")
+    ap.add_argument("--out", default=None, help="results file (default: <data>/reextract/<rules|llm>.jsonl)")
+    ap.add_argument("--restart", action="store_true", help="discard the results file instead of resuming")
+    ap.add_argument("--no-catalog", action="store_true", help="don't record results in the catalog")
+    ap.add_argument("--every", type=int, default=100, help="print progress every N meetings")
+    args = ap.parse_args(argv)
+
+    out = Path(args.out) if args.out else storage.DATA_ROOT / "reextract" / f"{'llm' if args.llm else 'rules'}.jsonl"
+    prog = reextract(out, args.llm, args.workers, args.llm_concurrency,
+                     [m for m in args.meetings.split(",") if m], not args.no_catalog, args.restart, args.every)
+    print(prog.line())
+
+
+if __name__ == "__main__":
+    main()
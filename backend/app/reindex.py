@@ -0,0 +1,70 @@
+"""
+Train/rebuild the FAISS index used for unfiltered queries, optionally
+reporting recall@k and latency of each index type against exact search.
+
+    python -m app.reindex --type hnsw
+    python -m app.reindex --bench --types flat,hnsw,ivfflat,ivfpq --k 10
+"""
+import argparse, time
+import numpy as np
+
+from .config import EMBED_DIM, FAISS_INDEX, FAISS_META, FAISS_SEGMENTS, FAISS_INDEX_TYPE, FAISS_INDEX_PARAMS
+from .vectorstore.faiss_store import FaissStore, INDEX_TYPES, build_index, faiss
+from .vectorstore.base import top_k
+
+
+def bench(X: np.ndarray, types, k: int, n_queries: int, params) -> list:
+    """recall@k and per-query latency of each index type vs exact search over X."""
+    rng = np.random.default_rng(0)
+    picks = rng.choice(len(X), size=min(n_queries, len(X)), replace=False)
+    # perturbed stored vectors stand in for real queries
+    Q = X[picks] + rng.normal(scale=0.05, size=(len(picks), X.shape[1])).astype("float32")
+    Q /= np.linalg.norm(Q, axis=1, keepdims=True)
+    truth = [set(top_k(X @ q, k).tolist()) for q in Q]
+
+    rows = []
+    for kind in types:
+        t0 = time.perf_counter()
+        index = build_index(kind, X.shape[1], [X], params)
+        build_s = time.perf_counter() - t0
+        lat, hit = [], 0
+        for q, gt in zip(Q, truth):
+            t0 = time.perf_counter()
+            _, idx = index.search(q[None, :], k)
+            lat.append(time.perf_counter() - t0)
+            hit += len(gt & set(idx[0].tolist()))
+        lat_ms = np.array(lat) * 1000
+        rows.append({"type": kind, "recall": hit / (k * len(Q)), "build_s": build_s,
+                     "p50_ms": float(np.percentile(lat_ms, 50)), "p95_ms": float(np.percentile(lat_ms, 95))})
+    return rows
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--type", default=FAISS_INDEX_TYPE, choices=INDEX_TYPES, help="index type to build and save")
+    ap.add_argument("--bench", action="store_true", help="report recall@k / latency before saving")
+    ap.add_argument("--types", default=",".join(INDEX_TYPES), help="comma-separated types to benchmark")
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--no-save", action="store_true", help="only benchmark, don't touch the saved index")
+    args = ap.parse_args(argv)
+
+    if faiss is None:
+        raise SystemExit("faiss is not installed")
+    store = FaissStore(EMBED_DIM, FAISS_INDEX, FAISS_META, FAISS_SEGMENTS, args.type, FAISS_INDEX_PARAMS)
+
+    if args.bench:
+        _, X = store.live_vectors()
+        if not len(X):
+            raise SystemExit("index is empty; upload some meetings first")
+        print(f"{len(X)} vectors, dim {X.shape[1]}, k={args.k}, {min(args.queries, len(X))} queries")
+        print(f"{'type':8} {'recall@k':>9} {'build s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+        for r in bench(X, args.types.split(","), args.k, args.queries, FAISS_INDEX_PARAMS):
+            print(f"{r['type']:8} {r['recall']:9.3f} {r['build_s']:8.2f} {r['p50_ms']:8.3f} {r['p95_ms']:8.3f}")
+
+    if not args.no_save:
+        print(store.rebuild(args.type, FAISS_INDEX_PARAMS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import asyncio, heapq, math, re
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .storage import ChunkRepo, chunk_repo
+
+_WORD = re.compile(r"\w+")
+
+def tokens(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+class BM25Index:
+    """Okapi BM25 over one meeting's chunks: an inverted index term -> [(i, tf)]."""
+    def __init__(self, chunks: Sequence[Dict[str, Any]], k1: float = 1.2, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lens: Dict[int, int] = {}
+        for c in chunks:
+            tf = Counter(tokens(c["text"]))
+            self.lens[c["i"]] = sum(tf.values())
+            for t, n in tf.items():
+                self.postings.setdefault(t, []).append((c["i"], n))
+        n = len(self.lens)
+        self.avgdl = (sum(self.lens.values()) / n) if n else 1.0
+        self.idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in self.postings.items()}
+
+    def search(self, q: str, k: int) -> List[int]:
+        """Chunk indexes of the k best-scoring chunks, best first (ties: lower index)."""
+        k1, b, avgdl, lens = self.k1, self.b, self.avgdl, self.lens
+        scores: Dict[int, float] = {}
+        for t in set(tokens(q)):
+            idf = self.idf.get(t)
+            if idf is None:
+                continue
+            for i, tf in self.postings[t]:
+                scores[i] = scores.get(i, 0.0) + idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lens[i] / avgdl))
+        return [i for i, _ in heapq.nlargest(k, scores.items(), key=lambda x: (x[1], -x[0]))]
+
+
+def fuse(rankings: Sequence[Sequence[int]], k: int, c: int = 60) -> List[int]:
+    """Reciprocal-rank fusion: sum of 1/(c + rank) over the rankings; ties keep first-seen order."""
+    score: Dict[int, float] = {}
+    for ranking in rankings:
+        for r, i in enumerate(ranking):
+            score[i] = score.get(i, 0.0) + 1.0 / (c + r + 1)
+    return sorted(score, key=lambda i: -score[i])[:k]
+
+
+class Retriever:
+    """
+    The context for a query: embed it, take the meeting's top-k chunks from the
+    vector store (optionally fused with a BM25 ranking), then load them. Results
+    are cached as chunk indexes keyed by (meeting, normalized query, k, hybrid,
+    chunks.dat version, vector store version), so a re-upload invalidates them
+    even when another worker's chunks.dat lands before its vectors, and a repeat
+    query costs a dict lookup plus the chunk repo's own cache. Queries differing
+    only in case or whitespace share an entry.
+    """
+    def __init__(self, store, embed_one: Callable[[str], Awaitable[List[float]]], repo: ChunkRepo = chunk_repo,
+                 max_entries: int = 1024, hybrid: bool = False, candidates: int = 4, max_lexical: int = 32):
+        self.store, self.embed_one, self.repo = store, embed_one, repo
+        self.max_entries, self.hybrid, self.candidates, self.max_lexical = max_entries, hybrid, candidates, max_lexical
+        self._results: "OrderedDict[tuple, List[int]]" = OrderedDict()
+        self._lexical: "OrderedDict[tuple, BM25Index]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "lexical_builds": 0}
+
+    async def retrieve(self, meeting_id: str, q: str, k: int = 5, hybrid: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """The meeting's best k chunks for `q`, in chunk order ([] if the meeting doesn't exist)."""
+        hybrid = self.hybrid if hybrid is None else bool(hybrid)
+        version = self.repo.version(meeting_id)
+        if version is None:
+            return []
+        key = (meeting_id, version, self.store.version(), " ".join(q.lower().split()), k, hybrid)
+        idxs = self._results.get(key)
+        if idxs is None:
+            self.stats["misses"] += 1
+            idxs = await self._rank(meeting_id, version, q, k, hybrid)
+            self._results[key] = idxs
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        else:
+            self.stats["hits"] += 1
+            self._results.move_to_end(key)
+        return self.repo.get(meeting_id, idxs)
+
+    async def _rank(self, meeting_id: str, version: tuple, q: str, k: int, hybrid: bool) -> List[int]:
+        n = k * max(1, self.candidates) if hybrid else k
+        qvec = await self.embed_one(q)
+        hits = await asyncio.to_thread(self.store.query, qvec, k=n, filters={"meeting_id": meeting_id})
+        top = [i for i in (h[2].get("i") for h in hits) if isinstance(i, int)]
+        if hybrid:
+            lexical = await self._lexical_index(meeting_id, version)
+            top = fuse([top, lexical.search(q, n)], k)
+        if not top:
+            top = list(range(min(k, self.repo.count(meeting_id))))  # nothing indexed: first chunks
+        return sorted(set(top))
+
+    async def _lexical_index(self, meeting_id: str, version: tuple) -> BM25Index:
+        key = (meeting_id, version)
+        index = self._lexical.get(key)
+        if index is None:
+            self.stats["lexical_builds"] += 1
+            index = await asyncio.to_thread(lambda: BM25Index(self.repo.all(meeting_id)))
+            self._lexical[key] = index
+            while len(self._lexical) > self.max_lexical:
+                self._lexical.popitem(last=False)
+        self._lexical.move_to_end(key)
+        return index
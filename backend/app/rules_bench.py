@@ -0,0 +1,171 @@
+"""
+Check the rule engine (tasks.extract_tasks_rules: patterns compiled once,
+plus a keyword prefilter that skips lines no rule can match) against the
+compile-every-call version it replaced, on synthetic transcripts or real
+ones: identical output, and time per MB.
+
+    python -m app.rules_bench --lines 200000
+    python -m app.rules_bench ../data/meetings/*/raw.txt
+"""
+import argparse, random, re, time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .tasks import extract_tasks_rules, iter_tasks_rules
+
+_SPEAKERS = ["Sara", "Bob", "Hamza", "Li", "Priya"]
+_FILLER = [
+    "I think the numbers from last week look fine overall.",
+    "Can everyone see my screen now?",
+    "We discussed the timelines for the launch and the budget.",
+    "That makes sense, thanks for clarifying.",
+    "The dashboard was slow again on Monday morning.",
+    "Status: nothing new on the vendor side.",
+    "Let me pull up the doc real quick.",
+]
+_ACTIONS = [
+    "Action: {who} to wire the FastAPI endpoints by Friday.",
+    "- [ ] update the onboarding doc owner: {who}",
+    "{who} will send the revised estimate before Oct 3.",
+    "We need to follow up on the billing bug by eow.",
+    "Please review the migration plan, assignee: {who}",
+    "TODO- rotate the staging credentials",
+    "follow up on the contract with legal",
+    "* [x] ship the hotfix",
+]
+
+
+def synthetic(n_lines: int, action_rate: float = 0.1, seed: int = 0) -> List[str]:
+    """A meeting-like transcript: speaker turns, mostly chatter, some action items."""
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n_lines):
+        who = rnd.choice(_SPEAKERS)
+        if rnd.random() < action_rate:
+            line = rnd.choice(_ACTIONS).format(who=rnd.choice(_SPEAKERS))
+            out.append(line if rnd.random() < 0.5 else f"{who}: {line}")
+        else:
+            out.append(f"{who}: {rnd.choice(_FILLER)}")
+    return out
+
+
+def as_chunks(lines: List[str], per_chunk: int = 20) -> List[Dict[str, Any]]:
+    return [{"i": n, "text": "\n".join(lines[s:s + per_chunk])}
+            for n, s in enumerate(range(0, len(lines), per_chunk))]
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("files", nargs="*", help="transcript text files (default: a synthetic one)")
+    ap.add_argument("--lines", type=int, default=100_000)
+    ap.add_argument("--action-rate", type=float, default=0.1)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    if args.files:
+        lines = [l for f in args.files for l in Path(f).read_text(encoding="utf-8", errors="ignore").splitlines()]
+    else:
+        lines = synthetic(args.lines, args.action_rate)
+    chunks = as_chunks(lines)
+    mb = sum(len(c["text"].encode("utf-8")) for c in chunks) / 1e6
+
+    old, new = extract_tasks_rules_v0(chunks), extract_tasks_rules(chunks)
+    streamed = [t for c in chunks for t in iter_tasks_rules(iter(c["text"].splitlines()), c["i"])]
+    if old != new or old != streamed:
+        bad = next(n for n, (a, b) in enumerate(zip(old, new)) if a != b) if len(old) == len(new) else None
+        raise SystemExit(f"output differs: {len(old)} vs {len(new)} tasks (first mismatch: {bad})")
+
+    t_old = best_of(lambda: extract_tasks_rules_v0(chunks), args.repeat)
+    t_new = best_of(lambda: extract_tasks_rules(chunks), args.repeat)
+    print(f"{len(lines)} lines, {mb:.1f} MB, {len(new)} tasks, outputs identical")
+    print(f"{'version':<12} {'s':>8} {'MB/s':>8}")
+    print(f"{'v0':<12} {t_old:>8.3f} {mb / t_old:>8.1f}")
+    print(f"{'prefiltered':<12} {t_new:>8.3f} {mb / t_new:>8.1f}  ({t_old / t_new:.1f}x)")
+
+
+# The implementation before precompiled patterns and the prefilter, kept as the reference
+# (verbatim but for two patterns it compiled and never used).
+def extract_tasks_rules_v0(context_chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    tasks: List[Dict[str, Any]] = []
+
+    # Patterns
+    re_action     = re.compile(r'(?i)\b(Action|Todo|Task|AI)[:\-]\s*(.+)')  # "Action: do X"
+    re_checkbox   = re.compile(r'(?i)^\s*[-*•]\s*\[(?: |x)\]\s*(.+)')       # "- [ ] do X"
+    re_person_to  = re.compile(r'(?i)^([A-Z][a-zA-Z]+)\s+(?:to|will|should)\s+(.+?)(?:\.|$)')
+    re_owner_col  = re.compile(r'(?i)\b(?:owner|assignee)\s*[:\-]\s*([A-Z][\w-]+)\b')
+    re_need       = re.compile(r'(?i)\b(?:need(?:s)? to|must|should|please|let\'?s|follow\s*up(?: on)?)\s+(.+?)(?:\.|$)')
+
+    # very forgiving due date hint
+    re_due = re.compile(
+        r'(?i)\b(?:by|due|before)\s+(?:mon|tue|wed|thu|fri|sat|sun|tomorrow|eod|eow|'
+        r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\.?\s+\d{1,2})\b'
+    )
+
+    for ch in context_chunks:
+        text, i = ch.get("text",""), ch.get("i", 0)
+
+        for raw in text.splitlines():
+            line = raw.strip()
+            if not line:
+                continue
+
+            body = None
+            who  = None
+
+            m = re_action.search(line)
+            if m:
+                body = m.group(2).strip()
+            else:
+                m = re_checkbox.search(line)
+                if m:
+                    body = m.group(1).strip()
+                else:
+                    m = re_person_to.search(line)
+                    if m:
+                        who  = m.group(1)
+                        body = m.group(2).strip()
+                    else:
+                        # catch generic "we/please/need to ..."
+                        m = re_need.search(line)
+                        if m:
+                            body = m.group(1).strip()
+
+            if not body:
+                continue
+
+            # owner hint from "owner: Bob"
+            m_owner = re_owner_col.search(line)
+            if m_owner and not who:
+                who = m_owner.group(1)
+
+            # due hint
+            due = None
+            m_due = re_due.search(line)
+            if m_due:
+                due = m_due.group(0)
+
+            body_clean = body.rstrip(".")
+            tasks.append({
+                "title": body_clean[:80],
+                "body":  body_clean + ".",
+                "labels": ["meeting-action"],
+                "assignee_hint": who,
+                "due_hint": due,
+                "source_i": i,
+                "confidence": 0.6
+            })
+
+    return tasks
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,242 @@
 from pathlib import Path
-import os, json
-from typing import List, Dict, Any
+from collections import OrderedDict
+import os, json, mmap, shutil, struct, threading
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from .catalog import Catalog
+from .config import CHUNK_CACHE_MB
 
 DATA_ROOT = Path(os.getenv("DATA_DIR", "../data")).resolve()
 
+# chunks.dat: one JSON chunk per line, then int64 line offsets (n+1), int64 n, magic.
+# A single file so it is replaced atomically; chunk i is data[off[i]:off[i+1]].
+_MAGIC = b"CHK1"
+_TRAILER = struct.Struct("<q4s")
+
 def _meeting_dir(meeting_id: str) -> Path:
     d = (DATA_ROOT / "meetings" / meeting_id)
     d.mkdir(parents=True, exist_ok=True)
     return d
 
+def _replace(tmp: Path, dst: Path) -> None:
+    with open(tmp, "rb+") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, dst)
+
+class MeetingWriter:
+    """
+    Streams a meeting to disk: raw text and chunks are appended as they are
+    produced and only replace the previous raw.txt/chunks.dat on a clean exit.
+    """
+    def __init__(self, meeting_id: str, title: str):
+        self.meeting_id, self.title = meeting_id, title
+        self.n_chunks = 0
+
+    def __enter__(self):
+        self._dir = _meeting_dir(self.meeting_id)
+        self._raw = open(self._dir / "raw.txt.tmp", "w", encoding="utf-8", newline="")
+        self._chunks = open(self._dir / "chunks.dat.tmp", "wb")
+        self._offsets = [0]
+        return self
+
+    def tee_raw(self, lines: Iterable[str]) -> Iterator[str]:
+        """Pass lines through while copying them to raw.txt."""
+        for line in lines:
+            self._raw.write(line)
+            yield line
+
+    def add_chunk(self, text: str) -> int:
+        """Append chunk `n_chunks`."""
+        i = self.n_chunks
+        line = json.dumps({"i": i, "text": text}, ensure_ascii=False).encode("utf-8") + b"\n"
+        self._chunks.write(line)
+        self._offsets.append(self._offsets[-1] + len(line))
+        self.n_chunks += 1
+        return i
+
+    def __exit__(self, exc_type, exc, tb):
+        self._chunks.write(np.asarray(self._offsets, dtype="<i8").tobytes())
+        self._chunks.write(_TRAILER.pack(self.n_chunks, _MAGIC))
+        self._raw.close()
+        self._chunks.close()
+        tmps = [self._dir / "raw.txt.tmp", self._dir / "chunks.dat.tmp", self._dir / "meta.json.tmp"]
+        if exc_type is None:
+            tmps[2].write_text(json.dumps({"meeting_id": self.meeting_id, "title": self.title,
+                                           "chunks": self.n_chunks}, ensure_ascii=False), encoding="utf-8")
+            for t in tmps:
+                _replace(t, t.with_suffix(""))
+            (self._dir / "chunks.json").unlink(missing_ok=True)  # pre-chunks.dat format
+            get_catalog().put_meeting(self.meeting_id, self.title, self.n_chunks,
+                                      (self._dir / "raw.txt").stat().st_size)
+        else:
+            for t in tmps:
+                t.unlink(missing_ok=True)
+        return False
+
 def save_meeting(meeting_id: str, title: str, raw_text: str, chunks: List[str]) -> None:
-    d = _meeting_dir(meeting_id)
-    (d / "raw.txt").write_text(raw_text, encoding="utf-8")
-    payload = {"meeting_id": meeting_id, "title": title,
-               "chunks": [{"i": i, "text": ch} for i, ch in enumerate(chunks)]}
-    (d / "chunks.json").write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    with MeetingWriter(meeting_id, title) as w:
+        for _ in w.tee_raw([raw_text]):
+            pass
+        for ch in chunks:
+            w.add_chunk(ch)
+
+
+class _ChunkFile:
+    """Memory-mapped chunks.dat; `version` identifies the file it was opened from."""
+    def __init__(self, path: Path, version: Tuple[int, int, int]):
+        self.version = version
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        n, magic = _TRAILER.unpack_from(self._mm, len(self._mm) - _TRAILER.size)
+        if magic != _MAGIC:
+            raise ValueError(f"{path}: not a chunk file")
+        start = len(self._mm) - _TRAILER.size - 8 * (n + 1)
+        self.offsets = np.frombuffer(self._mm, dtype="<i8", count=n + 1, offset=start)
+        self.n = n
+
+    def raw(self, i: int) -> bytes:
+        return self._mm[self.offsets[i]:self.offsets[i + 1]]
+
+
+class ChunkRepo:
+    """
+    Read side of the meeting store. Meetings stay memory-mapped (up to
+    `max_files`), a chunk is fetched by index via the offset table without
+    parsing the rest, and parsed chunks are kept in an LRU bounded by
+    `max_bytes`. Entries are keyed by the file's (inode, mtime, size), so a
+    re-upload is picked up on the next read.
+    """
+    def __init__(self, max_bytes: int, max_files: int = 128):
+        self.max_bytes, self.max_files = max_bytes, max_files
+        self._files: "OrderedDict[Path, _ChunkFile]" = OrderedDict()
+        self._parsed: "OrderedDict[tuple, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()  # re-entered when a legacy meeting is migrated on first read
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _file(self, meeting_id: str) -> Optional[_ChunkFile]:
+        d = DATA_ROOT / "meetings" / meeting_id
+        path = d / "chunks.dat"
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            if not (d / "chunks.json").exists():
+                return None
+            _migrate(meeting_id, d)
+            st = path.stat()
+        version = (st.st_ino, st.st_mtime_ns, st.st_size)
+        f = self._files.get(path)
+        if f is None or f.version != version:
+            f = _ChunkFile(path, version)
+            self._files[path] = f
+        self._files.move_to_end(path)
+        while len(self._files) > self.max_files:
+            self._files.popitem(last=False)
+        return f
+
+    def version(self, meeting_id: str) -> Optional[Tuple[int, int, int]]:
+        """Identity of the meeting's current chunks.dat; changes on every re-upload."""
+        with self._lock:
+            f = self._file(meeting_id)
+            return f.version if f else None
+
+    def count(self, meeting_id: str) -> int:
+        with self._lock:
+            f = self._file(meeting_id)
+            return f.n if f else 0
+
+    def get(self, meeting_id: str, idxs: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Chunks `idxs` of a meeting, in the order given; unknown indexes are skipped."""
+        out = []
+        with self._lock:
+            f = self._file(meeting_id)
+            if f is None:
+                return out
+            for i in idxs:
+                if not isinstance(i, int) or not 0 <= i < f.n:
+                    continue
+                key = (meeting_id, f.version, i)
+                hit = self._parsed.get(key)
+                if hit is None:
+                    self.stats["misses"] += 1
+                    raw = f.raw(i)
+                    hit = self._parsed[key] = (json.loads(raw), len(raw))
+                    self._bytes += len(raw)
+                    while self._bytes > self.max_bytes and len(self._parsed) > 1:
+                        _, (_, size) = self._parsed.popitem(last=False)
+                        self._bytes -= size
+                else:
+                    self.stats["hits"] += 1
+                    self._parsed.move_to_end(key)
+                out.append(hit[0])
+        return out
+
+    def all(self, meeting_id: str) -> List[Dict[str, Any]]:
+        return self.get(meeting_id, range(self.count(meeting_id)))
+
+
+def _migrate(meeting_id: str, d: Path) -> None:
+    """Rewrite a pre-chunks.dat meeting (chunks.json) in the indexed format."""
+    obj = json.loads((d / "chunks.json").read_text(encoding="utf-8"))
+    raw = d / "raw.txt"
+    with MeetingWriter(meeting_id, obj.get("title", "")) as w:
+        if raw.exists():
+            with open(raw, encoding="utf-8", newline="") as f:
+                for _ in w.tee_raw(f):
+                    pass
+        for c in sorted(obj.get("chunks", []), key=lambda c: c["i"]):
+            w.add_chunk(c["text"])
+
+
+chunk_repo = ChunkRepo(CHUNK_CACHE_MB * 1024 * 1024)
+
+def get_chunks(meeting_id: str, idxs: Iterable[Any]) -> List[Dict[str, Any]]:
+    return chunk_repo.get(meeting_id, idxs)
+
+def chunk_count(meeting_id: str) -> int:
+    return chunk_repo.count(meeting_id)
 
 def load_chunks(meeting_id: str) -> List[Dict[str, Any]]:
-    f = (DATA_ROOT / "meetings" / meeting_id / "chunks.json")
-    if not f.exists(): return []
-    obj = json.loads(f.read_text(encoding="utf-8"))
-    return obj.get("chunks", [])
+    return chunk_repo.all(meeting_id)
+
+
+_catalogs: Dict[Path, Catalog] = {}
+_catalog_lock = threading.Lock()
+
+def get_catalog() -> Catalog:
+    """The catalog under DATA_ROOT, created (and back-filled from meeting dirs) on first use."""
+    path = DATA_ROOT / "catalog.sqlite3"
+    with _catalog_lock:
+        cat = _catalogs.get(path)
+        fresh = cat is None
+        if fresh:
+            cat = _catalogs[path] = Catalog(str(path))
+    if fresh:
+        _backfill(cat)  # outside the lock: migrating old meetings writes to the catalog too
+    return cat
+
+def _backfill(cat: Catalog) -> None:
+    """Register meetings written before the catalog existed."""
+    root = DATA_ROOT / "meetings"
+    if not root.is_dir():
+        return
+    known = {m["meeting_id"] for m in cat.meetings()}
+    for d in sorted(p for p in root.iterdir() if p.is_dir() and p.name not in known):
+        if chunk_repo.version(d.name) is None:
+            continue
+        meta = d / "meta.json"
+        title = json.loads(meta.read_text(encoding="utf-8")).get("title", "") if meta.exists() else ""
+        raw = d / "raw.txt"
+        cat.put_meeting(d.name, title, chunk_repo.count(d.name), raw.stat().st_size if raw.exists() else 0)
+
+def list_meetings() -> List[Dict[str, Any]]:
+    return get_catalog().meetings()
+
+def delete_meeting(meeting_id: str) -> bool:
+    """Remove a meeting's files and catalog entry (the vector store is the caller's job)."""
+    d = DATA_ROOT / "meetings" / meeting_id
+    existed = d.is_dir()
+    shutil.rmtree(d, ignore_errors=True)
+    return get_catalog().delete_meeting(meeting_id) or existed
@@ -1,17 +1,17 @@
 from __future__ import annotations
 
-from typing import List, Dict, Any, Optional
-import os, re, json, httpx, logging
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+import re, json, logging
+
+from .config import LLM_CACHE_DIR, LLM_CACHE_MB, LLM_CACHE_TTL_S, OLLAMA_MODEL
+from .diskcache import DiskCache, cache_key
+from .llm import OllamaClient, get_llm
 
 
 log = logging.getLogger(__name__)
 
 # ====== Config ======
 DEFAULT_LABEL = "meeting-action"
-OLLAMA_URL    = os.getenv("OLLAMA_URL", "http://127.0.0.1:11434")
-OLLAMA_MODEL  = os.getenv("OLLAMA_MODEL", "")
-# Be generous on read timeout so local models have time to respond.
-TIMEOUT = httpx.Timeout(connect=5.0, read=120.0, write=120.0, pool=5.0)
 
 # ====== Small helpers ======
 def _mk_task(body: str, who: Optional[str], due: Optional[str], i: int) -> Optional[Dict[str, Any]]:
@@ -32,88 +32,112 @@ def _mk_task(body: str, who: Optional[str], due: Optional[str], i: int) -> Optio
         "confidence": 0.7,
     }
 
-def extract_tasks_rules(context_chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    tasks: List[Dict[str, Any]] = []
-
-    # Patterns
-    re_action     = re.compile(r'(?i)\b(Action|Todo|Task|AI)[:\-]\s*(.+)')  # "Action: do X"
-    re_checkbox   = re.compile(r'(?i)^\s*[-*•]\s*\[(?: |x)\]\s*(.+)')       # "- [ ] do X"
-    re_bullet     = re.compile(r'(?i)^\s*[-*•]\s*(.+)')                     # "- do X"
-    re_person_to  = re.compile(r'(?i)^([A-Z][a-zA-Z]+)\s+(?:to|will|should)\s+(.+?)(?:\.|$)')
-    re_owner_col  = re.compile(r'(?i)\b(?:owner|assignee)\s*[:\-]\s*([A-Z][\w-]+)\b')
-    re_need       = re.compile(r'(?i)\b(?:need(?:s)? to|must|should|please|let\'?s|follow\s*up(?: on)?)\s+(.+?)(?:\.|$)')
-    re_blocker    = re.compile(r'(?i)\bblocker[s]?:\s*(.+)')
-
-    # very forgiving due date hint
-    re_due = re.compile(
-        r'(?i)\b(?:by|due|before)\s+(?:mon|tue|wed|thu|fri|sat|sun|tomorrow|eod|eow|'
-        r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\.?\s+\d{1,2})\b'
-    )
+# ====== Rule patterns (compiled once) ======
+_RE_ACTION    = re.compile(r'(?i)\b(Action|Todo|Task|AI)[:\-]\s*(.+)')  # "Action: do X"
+_RE_CHECKBOX  = re.compile(r'(?i)^\s*[-*•]\s*\[(?: |x)\]\s*(.+)')       # "- [ ] do X"
+_RE_PERSON_TO = re.compile(r'(?i)^([A-Z][a-zA-Z]+)\s+(?:to|will|should)\s+(.+?)(?:\.|$)')
+_RE_OWNER_COL = re.compile(r'(?i)\b(?:owner|assignee)\s*[:\-]\s*([A-Z][\w-]+)\b')
+_RE_NEED      = re.compile(r'(?i)\b(?:need(?:s)? to|must|should|please|let\'?s|follow\s*up(?: on)?)\s+(.+?)(?:\.|$)')
 
-    for ch in context_chunks:
-        text, i = ch.get("text",""), ch.get("i", 0)
+# very forgiving due date hint
+_RE_DUE = re.compile(
+    r'(?i)\b(?:by|due|before)\s+(?:mon|tue|wed|thu|fri|sat|sun|tomorrow|eod|eow|'
+    r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\.?\s+\d{1,2})\b'
+)
 
-        for raw in text.splitlines():
-            line = raw.strip()
-            if not line:
-                continue
+# Prefilter, run on every line. Most transcript lines contain none of the
+# patterns' keywords and are dropped after one case-sensitive scan of the
+# lowercased line; the rest go through the patterns in priority order.
+# Non-ASCII lines skip it, since IGNORECASE also folds e.g. "ſ" to "s".
+# Must stay a superset of the patterns above.
+_KEYWORDS = re.compile(r'action[:\-]|todo[:\-]|task[:\-]|ai[:\-]|\[|need|must|should|please|let|follow')
 
-            body = None
-            who  = None
+def iter_tasks_rules(lines: Iterable[str], source_i: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Rule-based tasks from a stream of lines (e.g. an open transcript file), all
+    attributed to chunk `source_i`. Same output as extract_tasks_rules per chunk.
+    """
+    keywords, person_to = _KEYWORDS.search, _RE_PERSON_TO.search
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            continue
+        if line.isascii() and not keywords(line.lower()) and not person_to(line):
+            continue
 
-            m = re_action.search(line)
+        # first matching pattern wins
+        who = None
+        m = _RE_ACTION.search(line)
+        if m:
+            body = m.group(2)
+        else:
+            m = _RE_CHECKBOX.search(line)
             if m:
-                body = m.group(2).strip()
+                body = m.group(1)
             else:
-                m = re_checkbox.search(line)
+                m = person_to(line)
                 if m:
-                    body = m.group(1).strip()
+                    who, body = m.group(1), m.group(2)
                 else:
-                    m = re_person_to.search(line)
-                    if m:
-                        who  = m.group(1)
-                        body = m.group(2).strip()
-                    else:
-                        # catch generic "we/please/need to ..."
-                        m = re_need.search(line)
-                        if m:
-                            body = m.group(1).strip()
-
-            if not body:
-                continue
-
-            # owner hint from "owner: Bob"
-            m_owner = re_owner_col.search(line)
-            if m_owner and not who:
+                    # catch generic "we/please/need to ..."
+                    m = _RE_NEED.search(line)
+                    if not m:
+                        continue
+                    body = m.group(1)
+        body = body.strip()
+        if not body:
+            continue
+
+        # owner hint from "owner: Bob"
+        if not who:
+            m_owner = _RE_OWNER_COL.search(line)
+            if m_owner:
                 who = m_owner.group(1)
 
-            # due hint
-            due = None
-            m_due = re_due.search(line)
-            if m_due:
-                due = m_due.group(0)
-
-            body_clean = body.rstrip(".")
-            tasks.append({
-                "title": body_clean[:80],
-                "body":  body_clean + ".",
-                "labels": ["meeting-action"],
-                "assignee_hint": who,
-                "due_hint": due,
-                "source_i": i,
-                "confidence": 0.6
-            })
+        # due hint
+        m_due = _RE_DUE.search(line)
+
+        body_clean = body.rstrip(".")
+        yield {
+            "title": body_clean[:80],
+            "body":  body_clean + ".",
+            "labels": ["meeting-action"],
+            "assignee_hint": who,
+            "due_hint": m_due.group(0) if m_due else None,
+            "source_i": source_i,
+            "confidence": 0.6
+        }
 
+def extract_tasks_rules(context_chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    tasks: List[Dict[str, Any]] = []
+    for ch in context_chunks:
+        tasks.extend(iter_tasks_rules(ch.get("text", "").splitlines(), ch.get("i", 0)))
     return tasks
 
 
 # ----------------------------
 # Ollama
 # ----------------------------
-OLLAMA_URL   = os.getenv("OLLAMA_URL", "http://127.0.0.1:11434")
-OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "")
+# Requests go through the shared client in app.llm (pool, concurrency limit, keep-alive).
+
+# Raw replies, content-addressed by the request, so repeat extractions skip generation.
+llm_cache: Optional[DiskCache] = (DiskCache(LLM_CACHE_DIR, LLM_CACHE_MB * 1024 * 1024, LLM_CACHE_TTL_S)
+                                  if LLM_CACHE_MB > 0 else None)
+
+def llm_cache_key(req: Dict[str, Any]) -> str:
+    """Key of an /api/chat request: model, messages (system prompt + snippets), format and options."""
+    return cache_key(req["model"], json.dumps(req["messages"], sort_keys=True),
+                     json.dumps(req.get("format")), json.dumps(req.get("options") or {}, sort_keys=True))
+
+def cached_reply(req: Dict[str, Any]) -> Optional[str]:
+    if llm_cache is None:
+        return None
+    data = llm_cache.get(llm_cache_key(req))
+    return data.decode("utf-8") if data is not None else None
 
-TIMEOUT = httpx.Timeout(connect=5.0, read=180.0, write=120.0, pool=5.0)
+def cache_reply(req: Dict[str, Any], text: str) -> None:
+    if llm_cache is not None:
+        llm_cache.put(llm_cache_key(req), text.encode("utf-8"))
 
 def _strip_code_fences(s: str) -> str:
     s = s.strip()
@@ -142,6 +166,33 @@ def _json_lenient(text: str):
     logging.warning("LLM JSON salvage failed")
     return None
 
+def _clean_task(t: Any) -> Optional[Dict[str, Any]]:
+    """One task object from the model, normalized; None if it isn't one or has no text."""
+    if not isinstance(t, dict):
+        return None
+    labels = t.get("labels") or ["meeting-action"]
+    if isinstance(labels, str):
+        labels = [labels]
+    try:
+        si = int(t.get("source_i", 0))
+    except Exception:
+        si = 0
+    try:
+        conf = float(t.get("confidence", 0.7))
+    except Exception:
+        conf = 0.7
+
+    out = {
+        "title": (t.get("title", "") or "").strip(),
+        "body": (t.get("body", "") or "").strip(),
+        "labels": labels,
+        "assignee_hint": t.get("assignee_hint"),
+        "due_hint": t.get("due_hint"),
+        "source_i": si,
+        "confidence": max(0.0, min(1.0, conf)),
+    }
+    return out if out["title"] or out["body"] else None
+
 def _parse_tasks_json(text: str) -> List[Dict[str, Any]]:
     text = _strip_code_fences(text)
     obj = _json_lenient(text)
@@ -149,33 +200,70 @@ def _parse_tasks_json(text: str) -> List[Dict[str, Any]]:
         return []
 
     tasks = obj if isinstance(obj, list) else obj.get("tasks", [])
-    out: List[Dict[str, Any]] = []
-    for t in tasks or []:
-        labels = t.get("labels") or ["meeting-action"]
-        if isinstance(labels, str):
-            labels = [labels]
-        try:
-            si = int(t.get("source_i", 0))
-        except Exception:
-            si = 0
+    return [t for t in map(_clean_task, tasks or []) if t is not None]
+
+
+class TaskStreamParser:
+    """
+    Incremental parser for a streamed reply: feed() the tokens as they arrive
+    and get back each task object as soon as its closing brace is seen. Task
+    objects are the elements of a top-level array, or of an array directly
+    inside the top-level object ({"tasks": [...]}). Text before the first
+    bracket (prose, code fences) is skipped.
+    """
+    def __init__(self):
+        self._buf: List[str] = []   # chars of the task object being read
+        self._stack: List[str] = []  # open containers, "{" / "["
+        self._in_str = self._esc = False
+        self._depth = 0             # stack depth at which the current task object opened; 0 = none
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        out = []
+        for ch in text:
+            if self._depth:
+                self._buf.append(ch)
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == "\\":
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+            elif ch == '"':
+                self._in_str = bool(self._stack)
+            elif ch in "{[":
+                if ch == "{" and not self._depth and self._stack and self._stack[-1] == "[" and len(self._stack) <= 2:
+                    self._depth = len(self._stack) + 1
+                    self._buf = [ch]
+                self._stack.append(ch)
+            elif ch in "}]" and self._stack:
+                self._stack.pop()
+                if self._depth and len(self._stack) < self._depth:
+                    t = self._close()
+                    if t is not None:
+                        out.append(t)
+        return out
+
+    def _close(self) -> Optional[Dict[str, Any]]:
+        raw = "".join(self._buf)
+        self._buf, self._depth = [], 0
         try:
-            conf = float(t.get("confidence", 0.7))
-        except Exception:
-            conf = 0.7
-
-        out.append({
-            "title": (t.get("title", "") or "").strip(),
-            "body": (t.get("body", "") or "").strip(),
-            "labels": labels,
-            "assignee_hint": t.get("assignee_hint"),
-            "due_hint": t.get("due_hint"),
-            "source_i": si,
-            "confidence": max(0.0, min(1.0, conf)),
-        })
-    return [t for t in out if t["title"] or t["body"]]
-async def extract_tasks_ollama(context_texts: List[str]) -> List[Dict[str, Any]]:
+            obj = json.loads(re.sub(r",(\s*[}\]])", r"\1", raw))
+        except ValueError:
+            return None
+        return _clean_task(obj)
+
+
+async def extract_tasks_ollama(context_texts: List[str],
+                               client: Optional[OllamaClient] = None) -> List[Dict[str, Any]]:
+    """`client` defaults to the app's shared Ollama client."""
+    return (await extract_tasks_ollama_cached(context_texts, client))[0]
+
+async def extract_tasks_ollama_cached(context_texts: List[str], client: Optional[OllamaClient] = None
+                                      ) -> Tuple[List[Dict[str, Any]], bool]:
+    """(tasks, cached): replies that parse to tasks are cached on disk and reused for the same request."""
     if not OLLAMA_MODEL:
-        return []
+        return [], False
 
     system = (
         "You extract actionable tasks from meeting snippets.\n"
@@ -193,19 +281,24 @@ async def extract_tasks_ollama(context_texts: List[str]) -> List[Dict[str, Any]]
         "stream": False
     }
 
+    text = cached_reply(payload)
+    if text is not None:
+        return _parse_tasks_json(text), True
+
     try:
-        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-            r = await client.post(f"{OLLAMA_URL}/api/chat", json=payload)
-            r.raise_for_status()
-            text = (r.json().get("message") or {}).get("content", "")
+        reply = await (client or get_llm()).chat(payload)
+        text = (reply.get("message") or {}).get("content", "")
     except Exception as e:
         log.warning("Ollama request failed: %s", e)
-        return []
+        return [], False
 
     try:
-        return _parse_tasks_json(text)
+        tasks = _parse_tasks_json(text)
     except Exception as e:
         log.warning("Ollama parse failed: %s", e)
-        return []
+        return [], False
+    if tasks:
+        cache_reply(payload, text)
+    return tasks, False
 
-__all__ = ["extract_tasks_rules", "extract_tasks_ollama"]
+__all__ = ["extract_tasks_rules", "iter_tasks_rules", "TaskStreamParser", "extract_tasks_ollama", "extract_tasks_ollama_cached"]
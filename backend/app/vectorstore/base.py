@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+import numpy as np
 
 class VectorStore(ABC):
     @abstractmethod
@@ -8,3 +9,28 @@ class VectorStore(ABC):
     def query(self, embedding: List[float], k: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Tuple[str,float,Dict[str,Any]]]: ...
     @abstractmethod
     def persist(self): ...
+    @abstractmethod
+    def delete(self, ids: List[str]) -> int: ...
+    @abstractmethod
+    def delete_meeting(self, meeting_id: str, keep: Iterable[str] = ()) -> int: ...
+    @abstractmethod
+    def compact(self): ...
+    @abstractmethod
+    def version(self) -> Any:
+        """Hashable token that changes whenever a query could return something different."""
+
+
+def matches(meta: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+    """True if every filter key equals the meta value (no filters ⇒ match)."""
+    return not filters or all(meta.get(k) == v for k, v in filters.items())
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first (argpartition, no full sort)."""
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype="int64")
+    if k < n:
+        part = np.argpartition(-scores, k - 1)[:k]
+    else:
+        part = np.arange(n)
+    return part[np.argsort(-scores[part], kind="stable")]
@@ -1,13 +1,14 @@
-import os
+from typing import Dict, Optional
 from .base import VectorStore
 from .memory_store import MemoryStore
-from .faiss_store import FaissStore
+from .faiss_store import FaissStore, faiss
 
-def get_store(dim: int, backend: str, index_path: str, meta_path: str) -> VectorStore:
-    if backend.lower() == "faiss":
+def get_store(dim: int, backend: str, index_path: str, meta_path: str, seg_dir: Optional[str] = None,
+              index_type: str = "flat", index_params: Optional[Dict[str, int]] = None) -> VectorStore:
+    if backend.lower() == "faiss" and faiss is not None:
         try:
-            return FaissStore(dim, index_path, meta_path)
+            return FaissStore(dim, index_path, meta_path, seg_dir, index_type, index_params)
         except Exception:
             # fall back gracefully
-            return MemoryStore()
-    return MemoryStore()
+            return MemoryStore(dim)
+    return MemoryStore(dim)
@@ -3,54 +3,407 @@ try:
 except Exception:
     faiss = None
 
-import os, json, numpy as np
+import os, json, time, bisect, logging, threading, numpy as np
 from typing import List, Dict, Any, Optional, Tuple
-from .base import VectorStore
+from .base import VectorStore, matches, top_k
+from .segments import SegmentLog, Segment, meeting_key, _atomic_write
+
+log = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "hnsw", "ivfflat", "ivfpq")
+DEFAULT_INDEX_PARAMS = {"hnsw_m": 32, "ef_search": 64, "nlist": 1024, "nprobe": 16, "pq_m": 48}
+
+def build_index(kind: str, dim: int, parts: List[np.ndarray], params: Optional[Dict[str, int]] = None):
+    """
+    Inner-product faiss index of `kind` over the row blocks in `parts` (in order,
+    so index positions are row numbers). IVF types are trained on a sample and
+    degrade to a smaller nlist, or to flat, when there are too few rows.
+    """
+    p = {**DEFAULT_INDEX_PARAMS, **(params or {})}
+    n = sum(len(X) for X in parts)
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"unknown index type {kind!r}; expected one of {INDEX_TYPES}")
+    if kind.startswith("ivf"):
+        # faiss wants ~39 training points per centroid (and 256 per PQ codebook)
+        nlist = min(p["nlist"], n // 39)
+        if nlist < 1 or (kind == "ivfpq" and n < 256):
+            log.warning("%d rows are too few to train %s; using a flat index", n, kind)
+            kind = "flat"
+    if kind == "flat":
+        index = faiss.IndexFlatIP(dim)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, p["hnsw_m"], faiss.METRIC_INNER_PRODUCT)
+    else:
+        spec = f"IVF{nlist},Flat" if kind == "ivfflat" else f"IVF{nlist},PQ{p['pq_m']}"
+        index = faiss.index_factory(dim, spec, faiss.METRIC_INNER_PRODUCT)
+        X = np.concatenate([np.asarray(X) for X in parts if len(X)])
+        sample = np.random.default_rng(0).choice(n, size=min(n, 256 * nlist), replace=False)
+        index.train(np.ascontiguousarray(X[np.sort(sample)]))
+    for X in parts:
+        if len(X):
+            index.add(np.ascontiguousarray(X))
+    tune_index(index, p)
+    return index
+
+def tune_index(index, params: Optional[Dict[str, int]] = None):
+    """Apply query-time knobs (HNSW efSearch / IVF nprobe) where they exist."""
+    p = {**DEFAULT_INDEX_PARAMS, **(params or {})}
+    ps = faiss.ParameterSpace()
+    for name, value in (("efSearch", p["ef_search"]), ("nprobe", p["nprobe"])):
+        try:
+            ps.set_index_parameter(index, name, value)
+        except RuntimeError:
+            pass  # knob doesn't apply to this index type
 
 class FaissStore(VectorStore):
-    def __init__(self, dim: int, index_path: str, meta_path: str):
+    """
+    Persisted rows are served straight from memory-mapped SegmentLog files
+    (shared page cache across workers); rows upserted since the last persist()
+    live in a small in-memory tail. Nothing is read until the first call, so
+    constructing the store is O(1).
+
+    Rows are numbered globally: segments in MANIFEST order, then the tail.
+    Unfiltered queries go through an `index_type` faiss index over the
+    persisted rows, saved at `index_path` by rebuild(); meeting-filtered
+    queries always score the meeting's rows exactly.
+
+    When another process (or a background merge) moves the MANIFEST on, the
+    store reopens it on its next call that has no unpersisted writes.
+    """
+    def __init__(self, dim: int, index_path: str, meta_path: str, seg_dir: Optional[str] = None,
+                 index_type: str = "flat", index_params: Optional[Dict[str, int]] = None):
         self.dim, self.index_path, self.meta_path = dim, index_path, meta_path
         os.makedirs(os.path.dirname(index_path), exist_ok=True)
-        self.ids: List[str] = []
-        self.id_to_meta: Dict[str, Any] = {}
-        if faiss and os.path.exists(index_path) and os.path.exists(meta_path):
-            self.index = faiss.read_index(index_path)
-            meta = json.load(open(meta_path, "r", encoding="utf-8"))
-            self.ids = meta["ids"]
-            self.id_to_meta = meta["id_to_meta"]
-        else:
-            self.index = faiss.IndexFlatIP(dim) if faiss else None  # inner product
+        self.seg_dir = seg_dir or os.path.join(os.path.dirname(index_path), "faiss_segments")
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+        self.index_type, self.index_params = index_type, dict(index_params or {})
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._log: Optional[SegmentLog] = None
+        self._writes = 0  # in-process writes, for version()
+        self._reset()
+
+    def _reset(self):
+        self._segs: List[Segment] = []
+        self._starts: List[int] = []          # global row of each segment's first row
+        self._n_base = 0
+        self._alive = np.zeros(0, dtype=bool)  # base + tail rows
+        self._parts: Dict[bytes, np.ndarray] = {}  # meeting key -> base rows (lazy)
+        self._base_pos: Optional[Dict[bytes, int]] = None  # id -> its last base row (lazy)
+        self._tail_X = np.empty((0, self.dim), dtype="float32")
+        self._tail_ids: List[str] = []
+        self._tail_metas: List[Dict[str, Any]] = []
+        self._tail_pos: Dict[str, int] = {}   # live tail id -> global row
+        self._tomb: List[str] = []            # deletions of persisted rows not yet committed
+        self.index = None                     # global index over base rows, built on demand
+
+    # ---------- loading ----------
+    def _ensure(self):
+        if self._loaded:
+            if self._tail_ids or self._tomb or not self._log.changed():
+                return
+            self._reset()  # someone else committed or merged: reopen
+        if not faiss:
+            raise RuntimeError("FAISS not available")
+        if self._log is None:
+            self._log = SegmentLog(self.seg_dir)
+        if self._log.exists():
+            segs, alive = self._log.open()
+            for seg in segs:
+                self._add_segment(seg)
+            self._alive = alive
+        self._loaded = True
+        if not self._log.exists() and os.path.exists(self.index_path) and os.path.exists(self.meta_path) \
+                and not os.path.exists(self._sidecar):
+            self._import_legacy()
+
+    def _import_legacy(self):
+        # one-off migration from the old faiss.index + faiss_meta.json snapshot
+        index = faiss.read_index(self.index_path)
+        meta = json.load(open(self.meta_path, "r", encoding="utf-8"))
+        last = {_id: row for row, _id in enumerate(meta["ids"]) if _id in meta["id_to_meta"]}
+        if last:
+            rows = np.asarray(sorted(last.values()), dtype="int64")
+            ids = [meta["ids"][r] for r in rows]
+            self._append(ids, index.reconstruct_batch(rows), [meta["id_to_meta"][i] for i in ids])
+        self.persist()
+
+    def _add_segment(self, seg: Segment):
+        start = self._n_base
+        self._segs.append(seg)
+        self._starts.append(start)
+        self._n_base += seg.n
+        for key, rows in self._parts.items():
+            self._parts[key] = np.concatenate([rows, np.flatnonzero(seg.mtg == key) + start])
+        if self._base_pos is not None:
+            self._index_ids(seg, start)
+        if self.index is not None and seg.n:
+            self._index_add(seg.X)
 
+    def _index_ids(self, seg: Segment, start: int):
+        # later rows overwrite earlier ones, matching "last occurrence wins"
+        if seg.n:
+            self._base_pos.update(zip(seg.ids.tolist(), range(start, start + seg.n)))
+
+    # ---------- row access ----------
     def _norm(self, X):
         X = np.asarray(X, dtype="float32")
         n = np.linalg.norm(X, axis=1, keepdims=True) + 1e-12
         return (X / n).astype("float32")
 
+    def _seg_of(self, row: int) -> Tuple[Segment, int]:
+        s = bisect.bisect_right(self._starts, row) - 1
+        return self._segs[s], row - self._starts[s]
+
+    def _id(self, row: int) -> str:
+        if row >= self._n_base:
+            return self._tail_ids[row - self._n_base]
+        seg, r = self._seg_of(row)
+        return seg.ids[r].decode("utf-8")
+
+    def _meta(self, row: int) -> Dict[str, Any]:
+        if row >= self._n_base:
+            return self._tail_metas[row - self._n_base]
+        seg, r = self._seg_of(row)
+        return seg.meta(r)
+
+    def _vectors(self, rows: np.ndarray) -> np.ndarray:
+        out = np.empty((len(rows), self.dim), dtype="float32")
+        which = np.searchsorted(np.asarray(self._starts + [self._n_base]), rows, side="right") - 1
+        for s in np.unique(which):
+            sel = which == s
+            if s >= len(self._segs):
+                out[sel] = self._tail_X[rows[sel] - self._n_base]
+            else:
+                out[sel] = self._segs[s].X[rows[sel] - self._starts[s]]
+        return out
+
+    def _meeting_rows(self, meeting_id) -> np.ndarray:
+        key = meeting_key(meeting_id)
+        base = self._parts.get(key)
+        if base is None:
+            base = np.concatenate([np.zeros(0, dtype="int64")] +
+                                  [np.flatnonzero(s.mtg == key) + st for s, st in zip(self._segs, self._starts) if s.n])
+            self._parts[key] = base
+        tail = [self._n_base + t for t, m in enumerate(self._tail_metas) if meeting_key(m.get("meeting_id")) == key]
+        rows = np.concatenate([base, np.asarray(tail, dtype="int64")])
+        return rows[self._alive[rows]]
+
+    # ---------- writes ----------
+    def _kill_rows(self, rows):
+        for row in rows:
+            if not self._alive[row]:
+                continue
+            self._alive[row] = False
+            if row >= self._n_base:
+                self._tail_pos.pop(self._tail_ids[row - self._n_base], None)
+            else:
+                self._tomb.append(self._id(row))
+
+    def _find(self, ids: List[str]) -> List[int]:
+        rows = [self._tail_pos[i] for i in ids if i in self._tail_pos]
+        if self._n_base and ids:
+            if self._base_pos is None:
+                # built once per open, then kept current by _add_segment: O(batch) per upsert
+                self._base_pos = {}
+                for seg, st in zip(self._segs, self._starts):
+                    self._index_ids(seg, st)
+            for i in ids:
+                row = self._base_pos.get(i.encode("utf-8"))
+                if row is not None and self._alive[row]:
+                    rows.append(row)
+        return rows
+
+    def _append(self, ids, X, metas):
+        self._kill_rows(self._find(ids))  # replace, don't duplicate
+        start = self._n_base + len(self._tail_ids)
+        self._tail_X = np.concatenate([self._tail_X, X])
+        self._tail_ids.extend(ids)
+        self._tail_metas.extend(metas)
+        self._alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+        for i, _id in enumerate(ids):
+            if _id in self._tail_pos:  # repeated id inside one batch: last one wins
+                self._alive[self._tail_pos[_id]] = False
+            self._tail_pos[_id] = start + i
+
     def upsert(self, ids, embeddings, metas):
-        if not faiss or self.index is None:
-            raise RuntimeError("FAISS not available")
         X = self._norm(embeddings)
-        self.index.add(X)
-        self.ids.extend(ids)
-        for i, _id in enumerate(ids):
-            self.id_to_meta[_id] = metas[i]
+        with self._lock:
+            self._ensure()
+            self._append(list(ids), X, list(metas))
+            self._writes += 1
+
+    def delete(self, ids):
+        with self._lock:
+            self._ensure()
+            rows = self._find(list(ids))
+            self._kill_rows(rows)
+            self._writes += 1
+            return len(rows)
+
+    def delete_meeting(self, meeting_id, keep=()):
+        with self._lock:
+            self._ensure()
+            rows = self._meeting_rows(meeting_id)
+            if keep:
+                keep = set(keep)
+                rows = [r for r in rows.tolist() if self._id(r) not in keep]
+            self._kill_rows(rows)
+            self._writes += 1
+            return len(rows)
+
+    def version(self):
+        """
+        (MANIFEST on disk, in-process writes): moves on with our own upserts and
+        deletes and as soon as any process commits, before this store reopens.
+        """
+        if self._log is None:
+            with self._lock:
+                if self._log is None:
+                    self._log = SegmentLog(self.seg_dir)
+        return self._log.stamp(), self._writes
+
+    def persist(self):
+        """Commit rows added and deleted since the last persist as one new segment."""
+        with self._lock:
+            self._ensure()
+            keep = np.flatnonzero(self._alive[self._n_base:])
+            seg = self._log.commit(self._tail_X[keep], [self._tail_ids[t] for t in keep],
+                                   [self._tail_metas[t] for t in keep], self._tomb)
+            self._alive = np.concatenate([self._alive[:self._n_base], np.ones(len(keep), dtype=bool)])
+            self._tail_X = np.empty((0, self.dim), dtype="float32")
+            self._tail_ids, self._tail_metas, self._tail_pos, self._tomb = [], [], {}, []
+            if self._log.changed():
+                self._reset()  # not built on what we had open: reopen lazily
+                self._loaded = False
+            elif seg is not None:
+                self._add_segment(seg)
+        self._log.maybe_merge()
+
+    def compact(self):
+        """Persist, merge all segments dropping tombstoned rows, and reopen."""
+        with self._lock:
+            self.persist()
+            self._log.join()
+            self._log.merge()
+            self._reset()
+            self._loaded = False
+
+    # ---------- reads ----------
+    def _query_rows(self, q, rows: np.ndarray, k: int):
+        # exact scoring over the partition only: cost ∝ meeting size, not corpus size
+        if not len(rows):
+            return []
+        scores = self._vectors(rows) @ q
+        return [(self._id(int(rows[j])), float(scores[j]), self._meta(int(rows[j]))) for j in top_k(scores, k)]
+
+    # ---------- global (unfiltered) index ----------
+    @property
+    def _sidecar(self) -> str:
+        return self.index_path + ".json"
+
+    def _read_index(self, mmap: bool):
+        flags = faiss.IO_FLAG_MMAP if mmap else 0
+        index = faiss.read_index(self.index_path, flags)
+        tune_index(index, self.index_params)
+        return index
+
+    def _index_add(self, X):
+        try:
+            self.index.add(np.ascontiguousarray(X))
+        except RuntimeError:
+            # memory-mapped inverted lists are read-only: take a private copy once
+            covered = self.index.ntotal
+            self.index = self._read_index(mmap=False)
+            if self.index.ntotal != covered:
+                raise
+            self.index.add(np.ascontiguousarray(X))
+
+    def _load_index(self):
+        if not (os.path.exists(self.index_path) and os.path.exists(self._sidecar)):
+            return None
+        with open(self._sidecar, "r", encoding="utf-8") as f:
+            side = json.load(f)
+        if side.get("type") != self.index_type:
+            log.warning("%s holds a %s index but FAISS_INDEX_TYPE=%s; run `python -m app.reindex`",
+                        self.index_path, side.get("type"), self.index_type)
+            return None
+        names = [s.name for s in self._segs]
+        covered = side.get("segments", [])
+        if names[:len(covered)] == covered:
+            self.index = self._read_index(mmap=True)
+        else:
+            # segments were merged since the build: keep the trained structure, re-add rows
+            self.index = self._read_index(mmap=False)
+            self.index.reset()
+            covered = []
+        for seg in self._segs[len(covered):]:
+            if seg.n:
+                self._index_add(seg.X)
+        return self.index
+
+    def _global_index(self):
+        if self.index is None:
+            self.index = self._load_index()
+        if self.index is None:
+            if self.index_type != "flat":
+                log.info("building %s index in memory; `python -m app.reindex` saves it", self.index_type)
+            self.index = build_index(self.index_type, self.dim, [s.X for s in self._segs], self.index_params)
+        return self.index
+
+    def rebuild(self, index_type: Optional[str] = None, params: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """(Re)train the global index over all persisted rows and save it to index_path."""
+        with self._lock:
+            self.persist()
+            if index_type:
+                self.index_type = index_type
+            if params:
+                self.index_params.update(params)
+            t0 = time.perf_counter()
+            self.index = build_index(self.index_type, self.dim, [s.X for s in self._segs], self.index_params)
+            built = time.perf_counter() - t0
+            faiss.write_index(self.index, self.index_path + ".tmp")
+            os.replace(self.index_path + ".tmp", self.index_path)
+            side = json.dumps({"type": self.index_type, "params": self.index_params,
+                               "segments": [s.name for s in self._segs]}).encode("utf-8")
+            _atomic_write(self._sidecar, lambda f: f.write(side))
+            return {"type": self.index_type, "rows": int(self.index.ntotal), "build_s": round(built, 3)}
+
+    def live_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, vectors) of every live row; used by the reindex benchmark."""
+        with self._lock:
+            self._ensure()
+            rows = np.flatnonzero(self._alive)
+            return rows, self._vectors(rows)
 
     def query(self, embedding, k=5, filters=None):
-        if not faiss or self.index is None or not self.ids:
+        if not faiss:
             return []
         q = self._norm([embedding])
-        scores, idxs = self.index.search(q, min(k, len(self.ids)))
-        out = []
-        for j, s in zip(idxs[0], scores[0]):
-            _id = self.ids[j]
-            m = self.id_to_meta.get(_id, {})
-            if filters and any(m.get(k) != v for k, v in (filters or {}).items()):
-                continue
-            out.append((_id, float(s), m))
-        return out
+        with self._lock:
+            self._ensure()
+            if not self._alive.any():
+                return []
+            if filters:
+                if "meeting_id" in filters:
+                    rows = self._meeting_rows(filters["meeting_id"])
+                else:
+                    rows = np.flatnonzero(self._alive)
+                if len(filters) > ("meeting_id" in filters):
+                    rows = rows[[matches(self._meta(int(r)), filters) for r in rows]]
+                return self._query_rows(q[0], rows, k)
 
-    def persist(self):
-        if not faiss or self.index is None:
-            return
-        faiss.write_index(self.index, self.index_path)
-        json.dump({"ids": self.ids, "id_to_meta": self.id_to_meta}, open(self.meta_path, "w", encoding="utf-8"))
+            hits: List[Tuple[float, int]] = []
+            if self._n_base:
+                # over-fetch by the dead count so tombstoned rows can't crowd out live ones
+                dead = self._n_base - int(self._alive[:self._n_base].sum())
+                index = self._global_index()
+                scores, idxs = index.search(q, min(k + dead, self._n_base))
+                hits += [(float(s), int(j)) for j, s in zip(idxs[0], scores[0]) if j >= 0 and self._alive[j]][:k]
+            tail = np.flatnonzero(self._alive[self._n_base:]) + self._n_base
+            if len(tail):
+                scores = self._vectors(tail) @ q[0]
+                hits += [(float(scores[j]), int(tail[j])) for j in top_k(scores, k)]
+            hits.sort(key=lambda h: -h[0])
+            return [(self._id(r), s, self._meta(r)) for s, r in hits[:k]]
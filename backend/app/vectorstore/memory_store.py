@@ -1,36 +1,124 @@
-from typing import List, Dict, Any, Optional, Tuple
+import threading
+from typing import List, Dict, Any, Optional
+import numpy as np
 
-from .base import VectorStore
+from .base import VectorStore, matches, top_k
 
 class MemoryStore(VectorStore):
     """
     In-memory fallback: perfect for getting started.
+    Vectors live in one growable float32 matrix; a query is a single
+    matrix-vector product plus argpartition. One lock covers reads and
+    writes: queries run in worker threads while ingest upserts and compacts.
     """
-    def __init__(self):
+    def __init__(self, dim: Optional[int] = None):
+        self._dim = dim
+        self._mat = np.empty((0, dim or 0), dtype="float32")  # capacity rows, first _n used
+        self._n = 0
+        self._alive = np.zeros(0, dtype=bool)
         self._ids: List[str] = []
-        self._vecs: List[List[float]] = []
         self._meta: List[Dict[str, Any]] = []
+        self._pos: Dict[str, int] = {}        # live id -> row
+        self._rows: Dict[Any, List[int]] = {}  # meeting_id -> live rows
+        self._writes = 0
+        self._lock = threading.RLock()
+
+    def _reserve(self, extra: int):
+        need = self._n + extra
+        if need <= self._mat.shape[0]:
+            return
+        cap = max(need, 2 * self._mat.shape[0], 64)
+        mat = np.empty((cap, self._dim), dtype="float32")
+        mat[:self._n] = self._mat[:self._n]
+        alive = np.zeros(cap, dtype=bool)
+        alive[:self._n] = self._alive[:self._n]
+        self._mat, self._alive = mat, alive
+
+    def _unlink(self, row: int):
+        rows = self._rows.get(self._meta[row].get("meeting_id"))
+        if rows is not None:
+            rows.remove(row)
+            if not rows:
+                self._rows.pop(self._meta[row].get("meeting_id"), None)
 
     def upsert(self, ids, embeddings, metas):
-        self._ids.extend(ids)
-        self._vecs.extend(embeddings)
-        self._meta.extend(metas)
+        X = np.asarray(embeddings, dtype="float32").reshape(len(ids), -1)
+        with self._lock:
+            if self._dim is None:
+                self._dim = X.shape[1]
+                self._mat = np.empty((0, self._dim), dtype="float32")
+            self._reserve(len(ids))
+            self._writes += 1
+            for _id, x, meta in zip(ids, X, metas):
+                row = self._pos.get(_id)
+                if row is not None:  # replace in place
+                    self._unlink(row)
+                    self._meta[row] = meta
+                else:
+                    row = self._n
+                    self._n += 1
+                    self._pos[_id] = row
+                    self._ids.append(_id)
+                    self._meta.append(meta)
+                    self._alive[row] = True
+                self._mat[row] = x
+                self._rows.setdefault(meta.get("meeting_id"), []).append(row)
+
+    def delete(self, ids):
+        with self._lock:
+            n = 0
+            for _id in ids:
+                row = self._pos.pop(_id, None)
+                if row is None:
+                    continue
+                self._unlink(row)
+                self._alive[row] = False
+                n += 1
+            self._writes += bool(n)
+            if n and self._n - len(self._pos) > len(self._pos):
+                self.compact()
+            return n
+
+    def delete_meeting(self, meeting_id, keep=()):
+        keep = set(keep)
+        with self._lock:
+            return self.delete([self._ids[r] for r in list(self._rows.get(meeting_id, [])) if self._ids[r] not in keep])
+
+    def compact(self):
+        """Drop tombstoned rows from the matrix."""
+        with self._lock:
+            live = np.flatnonzero(self._alive[:self._n])
+            if len(live) == self._n:
+                return
+            self._mat = np.ascontiguousarray(self._mat[live])
+            self._alive = np.ones(len(live), dtype=bool)
+            self._ids = [self._ids[r] for r in live]
+            self._meta = [self._meta[r] for r in live]
+            self._n = len(live)
+            self._pos = {_id: r for r, _id in enumerate(self._ids)}
+            self._rows = {}
+            for r, m in enumerate(self._meta):
+                self._rows.setdefault(m.get("meeting_id"), []).append(r)
 
     def query(self, embedding, k=5, filters=None):
-        if not self._ids:
-            return []
-        # cosine since vectors are normalized: score = dot(q, v)
-        scores = [sum(a*b for a, b in zip(embedding, vec)) for vec in self._vecs]
-        order = sorted(range(len(self._ids)), key=lambda i: -scores[i])
-        out = []
-        for i in order:
-            m = self._meta[i]
-            if filters and any(m.get(k) != v for k, v in (filters or {}).items()):
-                continue
-            out.append((self._ids[i], float(scores[i]), m))
-            if len(out) >= k:
-                break
-        return out
+        with self._lock:
+            if not self._pos:
+                return []
+            q = np.asarray(embedding, dtype="float32")
+            if filters and "meeting_id" in filters:
+                rows = np.asarray(self._rows.get(filters["meeting_id"], []), dtype="int64")
+            else:
+                rows = np.flatnonzero(self._alive[:self._n])
+            if filters and len(filters) > ("meeting_id" in filters):
+                rows = rows[[matches(self._meta[r], filters) for r in rows]]
+            if not len(rows):
+                return []
+            # cosine since vectors are normalized: score = dot(q, v)
+            scores = self._mat[rows] @ q
+            return [(self._ids[rows[j]], float(scores[j]), self._meta[rows[j]]) for j in top_k(scores, k)]
+
+    def version(self):
+        return self._writes
 
     def persist(self):
         # no-op for MVP
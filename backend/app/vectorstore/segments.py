@@ -0,0 +1,376 @@
+"""
+Append-only on-disk layout for FaissStore.
+
+    <root>/MANIFEST                  commit point, replaced atomically
+    <root>/LOCK, <root>/MERGE        flock()ed by writers and by the (single) merge
+    <root>/seg-<seq>-<gen>-<tag>.npy       float32 vectors of one persist() call
+    <root>/seg-<seq>-<gen>-<tag>.jsonl     {"id", "meta"} per vector row
+    <root>/seg-<seq>-<gen>-<tag>.ids.npy   id column (utf-8 bytes)
+    <root>/seg-<seq>-<gen>-<tag>.mtg.npy   meeting_id column (utf-8 bytes)
+    <root>/seg-<seq>-<gen>-<tag>.off.npy   byte offsets of each .jsonl line (rows + 1)
+    <root>/tomb-<gen>.jsonl          {"id", "seq"} deletions; kills rows of `id` in segments <= seq
+
+A row is live if it is the last occurrence of its id and no tombstone covers
+its segment. Segments are opened memory-mapped, so worker processes share the
+pages and a row's meta is only decoded when it is asked for. Files not
+referenced by MANIFEST (e.g. from a crash mid-commit) are ignored and cleaned
+up by the next merge.
+
+Several SegmentLogs may share a directory (server workers, the reindex CLI):
+commits take LOCK exclusively and build on the MANIFEST as it is on disk, so
+no writer overwrites another's, and segment names carry a random tag so they
+never collide. Readers open under a shared LOCK and changed() tells them when
+someone else committed or merged. Where fcntl is missing (Windows) there is
+no cross-process lock, and only one process may write.
+"""
+import os, json, mmap, threading, logging, uuid
+import numpy as np
+from contextlib import contextmanager
+from typing import List, Dict, Any, Tuple, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: single writer only
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+MANIFEST = "MANIFEST"
+LOCK, MERGE_LOCK = "LOCK", "MERGE"
+_SUFFIXES = (".npy", ".jsonl", ".ids.npy", ".mtg.npy", ".off.npy")
+
+
+def meeting_key(meeting_id: Any) -> bytes:
+    """meeting_id as stored in the .mtg column."""
+    return b"" if meeting_id is None else str(meeting_id).encode("utf-8")
+
+def _fsync_dir(path: str):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:  # e.g. directories can't be opened on Windows
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _atomic_write(path: str, write) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def _stamp(st: os.stat_result) -> Tuple[int, int, int]:
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+def _columns(lines: List[bytes], ids: List[str], metas: List[Dict[str, Any]]):
+    ids_col = np.array([i.encode("utf-8") for i in ids], dtype="S")
+    mtg_col = np.array([meeting_key(m.get("meeting_id")) for m in metas], dtype="S")
+    off = np.zeros(len(lines) + 1, dtype="int64")
+    np.cumsum([len(l) for l in lines], out=off[1:])
+    return ids_col, mtg_col, off
+
+
+class Segment:
+    """Read-only, memory-mapped view of one committed segment."""
+    def __init__(self, root: str, desc: Dict[str, Any]):
+        self.name, self.seq, self.n = desc["name"], desc["seq"], desc["rows"]
+        base = os.path.join(root, self.name)
+        mode = "r" if self.n else None  # empty files can't be mapped
+        self.X = np.load(base + ".npy", mmap_mode=mode)
+        self.ids = np.load(base + ".ids.npy", mmap_mode=mode)
+        self.mtg = np.load(base + ".mtg.npy", mmap_mode=mode)
+        self.off = np.load(base + ".off.npy", mmap_mode="r")
+        # mapped up front so a concurrent merge can unlink the files under us
+        self._mm: Optional[mmap.mmap] = None
+        if self.n:
+            with open(base + ".jsonl", "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def line(self, r: int) -> bytes:
+        return self._mm[int(self.off[r]):int(self.off[r + 1])]
+
+    def meta(self, r: int) -> Dict[str, Any]:
+        return json.loads(self.line(r))["meta"]
+
+
+def live_mask(segs: List[Segment], tomb: Dict[str, int]) -> np.ndarray:
+    """Liveness of every row of `segs` (concatenated in order), vectorized."""
+    n = sum(s.n for s in segs)
+    if not n:
+        return np.zeros(0, dtype=bool)
+    ids = np.concatenate([np.asarray(s.ids) for s in segs if s.n])
+    seq = np.concatenate([np.full(s.n, s.seq, dtype="int64") for s in segs])
+    # last occurrence of each id wins
+    _, first_rev = np.unique(ids[::-1], return_index=True)
+    alive = np.zeros(n, dtype=bool)
+    alive[n - 1 - first_rev] = True
+    if tomb:
+        t_ids = np.array([k.encode("utf-8") for k in tomb], dtype="S")
+        t_seq = np.array(list(tomb.values()), dtype="int64")
+        order = np.argsort(t_ids)
+        t_ids, t_seq = t_ids[order], t_seq[order]
+        j = np.minimum(np.searchsorted(t_ids, ids), len(t_ids) - 1)
+        covered = (t_ids[j] == ids) & (seq <= t_seq[j])
+        alive &= ~covered
+    return alive
+
+
+class SegmentLog:
+    def __init__(self, root: str, merge_segments: int = 8, merge_ratio: float = 0.2):
+        self.root = root
+        self.merge_segments, self.merge_ratio = merge_segments, merge_ratio
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()      # guards MANIFEST read-modify-write within the process
+        self._merging = threading.Lock()   # at most one merge at a time
+        self._merge_thread: Optional[threading.Thread] = None
+        self._man, self._disk = self._read_manifest()
+        self._seen = self._disk  # MANIFEST the last open() (plus our own commits since) reflects
+
+    # ---------- manifest ----------
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    @contextmanager
+    def _flock(self, name: str, shared: bool = False, wait: bool = True):
+        """flock() `name` in root; yields False if `wait` is off and someone else holds it."""
+        if fcntl is None:
+            yield True
+            return
+        with open(self._path(name), "a+b") as f:
+            op = (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | (0 if wait else fcntl.LOCK_NB)
+            try:
+                fcntl.flock(f, op)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _locked(self, shared: bool = False):
+        """Thread lock plus LOCK; the MANIFEST in `_man` is re-read from disk on entry."""
+        with self._lock, self._flock(LOCK, shared):
+            self._man, self._disk = self._read_manifest()
+            yield self._man
+
+    def _read_manifest(self) -> Tuple[Dict[str, Any], Optional[Tuple[int, int, int]]]:
+        try:
+            f = open(self._path(MANIFEST), "r", encoding="utf-8")
+        except FileNotFoundError:
+            return {"version": 1, "gen": 0, "last_seq": 0, "segments": [],
+                    "tomb": None, "tomb_bytes": 0, "tombs": 0}, None
+        with f:
+            return json.load(f), _stamp(os.fstat(f.fileno()))
+
+    def _write_manifest(self, man: Dict[str, Any]):
+        data = json.dumps(man).encode("utf-8")
+        _atomic_write(self._path(MANIFEST), lambda f: f.write(data))
+        _fsync_dir(self.root)
+        self._man, self._disk = man, _stamp(os.stat(self._path(MANIFEST)))
+
+    def exists(self) -> bool:
+        return os.path.exists(self._path(MANIFEST))
+
+    def stamp(self) -> Optional[Tuple[int, int, int]]:
+        """Identity of the MANIFEST on disk right now (None before the first commit)."""
+        try:
+            return _stamp(os.stat(self._path(MANIFEST)))
+        except FileNotFoundError:
+            return None
+
+    def changed(self) -> bool:
+        """Whether MANIFEST moved on (another writer, or a merge) since open()."""
+        return self.stamp() != self._seen
+
+    @property
+    def last_seq(self) -> int:
+        return self._man["last_seq"]
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._man["segments"])
+
+    # ---------- read ----------
+    def _read_tombs(self, man) -> Dict[str, int]:
+        tomb: Dict[str, int] = {}
+        if man["tomb"]:
+            with open(self._path(man["tomb"]), "rb") as f:
+                data = f.read(man["tomb_bytes"])  # uncommitted tail is ignored
+            for l in data.splitlines():
+                if l.strip():
+                    t = json.loads(l)
+                    tomb[t["id"]] = max(tomb.get(t["id"], 0), t["seq"])
+        return tomb
+
+    def open(self) -> Tuple[List[Segment], np.ndarray]:
+        """Memory-mapped segments of the current MANIFEST and their row liveness."""
+        # shared LOCK: a merge can't clean up the files between reading MANIFEST and mapping them
+        with self._locked(shared=True) as man:
+            segs = [Segment(self.root, d) for d in man["segments"]]
+            self._seen = self._disk
+            return segs, live_mask(segs, self._read_tombs(man))
+
+    # ---------- write ----------
+    def _write_segment(self, name: str, X: np.ndarray, lines: List[bytes], ids_col, mtg_col, off):
+        X = np.ascontiguousarray(X, dtype="float32")
+        _atomic_write(self._path(name + ".npy"), lambda f: np.save(f, X))
+        _atomic_write(self._path(name + ".jsonl"), lambda f: f.writelines(lines))
+        for suffix, arr in ((".ids.npy", ids_col), (".mtg.npy", mtg_col), (".off.npy", off)):
+            _atomic_write(self._path(name + suffix), lambda f, a=arr: np.save(f, a))
+
+    def commit(self, X: np.ndarray, ids: List[str], metas: List[Dict[str, Any]],
+               deleted: List[str]) -> Optional[Segment]:
+        """Append one segment plus tombstones; cost ∝ the new rows only."""
+        if not ids and not deleted:
+            return None
+        with self._locked() as man:
+            man = dict(man)
+            in_sync = self._disk == self._seen
+            # tombstones cover everything already committed, never the rows added here
+            tomb_seq = man["last_seq"]
+            desc = None
+            if ids:
+                seq = man["last_seq"] + 1
+                desc = {"name": f"seg-{seq:08d}-{man['gen']}-{uuid.uuid4().hex[:8]}", "seq": seq, "rows": len(ids)}
+                lines = [(json.dumps({"id": i, "meta": m}, ensure_ascii=False) + "\n").encode("utf-8")
+                         for i, m in zip(ids, metas)]
+                self._write_segment(desc["name"], X, lines, *_columns(lines, ids, metas))
+                man["segments"] = man["segments"] + [desc]
+                man["last_seq"] = seq
+            if deleted:
+                if not man["tomb"]:
+                    man["tomb"] = f"tomb-{man['gen']}.jsonl"
+                data = "".join(json.dumps({"id": i, "seq": tomb_seq}) + "\n" for i in deleted).encode("utf-8")
+                with open(self._path(man["tomb"]), "r+b" if os.path.exists(self._path(man["tomb"])) else "wb") as f:
+                    f.seek(man["tomb_bytes"])  # overwrite any uncommitted tail
+                    f.write(data)
+                    f.truncate()
+                    f.flush()
+                    os.fsync(f.fileno())
+                man["tomb_bytes"] = man["tomb_bytes"] + len(data)
+                man["tombs"] = man["tombs"] + len(deleted)
+            self._write_manifest(man)
+            if in_sync:
+                self._seen = self._disk
+        return Segment(self.root, desc) if desc else None
+
+    # ---------- merge ----------
+    def needs_merge(self) -> bool:
+        man = self._man
+        rows = sum(s["rows"] for s in man["segments"])
+        return len(man["segments"]) > self.merge_segments or man["tombs"] > self.merge_ratio * max(1, rows)
+
+    def maybe_merge(self, background: bool = True):
+        if not self.needs_merge() or self._merging.locked():
+            return
+        if background:
+            self._merge_thread = threading.Thread(target=self.merge, args=(False,),
+                                                  name="faiss-segment-merge", daemon=True)
+            self._merge_thread.start()
+        else:
+            self.merge()
+
+    def join(self):
+        """Wait for a background merge started by maybe_merge()."""
+        t = self._merge_thread
+        if t is not None:
+            t.join()
+
+    def merge(self, wait: bool = True):
+        """Rewrite all committed segments into one, dropping dead rows."""
+        if not self._merging.acquire(blocking=wait):
+            return
+        try:
+            with self._flock(MERGE_LOCK, wait=wait) as got:  # one merge across processes, too
+                if got:
+                    self._merge()
+        except Exception as e:
+            log.warning("segment merge failed: %s", e)
+        finally:
+            self._merging.release()
+
+    def _merge(self):
+        with self._locked(shared=True) as snap:
+            if len(snap["segments"]) < 2 and not snap["tombs"]:
+                return
+            snap_mtime = self._disk[1]
+            # mapped under the lock, so no other merge's cleanup can unlink them first
+            segs = [Segment(self.root, d) for d in snap["segments"]]
+            alive = live_mask(segs, self._read_tombs(snap))
+        Xs, lines, ids_cols, mtg_cols, start = [], [], [], [], 0
+        for s in segs:
+            keep = np.flatnonzero(alive[start:start + s.n])
+            start += s.n
+            if len(keep):
+                Xs.append(s.X[keep])
+                ids_cols.append(s.ids[keep])
+                mtg_cols.append(s.mtg[keep])
+                lines.extend(s.line(r) for r in keep)
+        gen = snap["gen"] + 1
+        seq = snap["last_seq"]
+        name = f"seg-{seq:08d}-{gen}-{uuid.uuid4().hex[:8]}"
+        if lines:
+            off = np.zeros(len(lines) + 1, dtype="int64")
+            np.cumsum([len(l) for l in lines], out=off[1:])
+            self._write_segment(name, np.concatenate(Xs), lines,
+                                np.concatenate(ids_cols), np.concatenate(mtg_cols), off)
+        with self._locked() as man:
+            if man["gen"] != snap["gen"]:
+                # merged by another process meanwhile (only possible without fcntl)
+                self._remove([name + suffix for suffix in _SUFFIXES])
+                return
+            man = dict(man)
+            # tombstones committed after the snapshot still apply (to the merged segment too)
+            tail = b""
+            if man["tomb"]:
+                with open(self._path(man["tomb"]), "rb") as f:
+                    f.seek(snap["tomb_bytes"] if snap["tomb"] == man["tomb"] else 0)
+                    tail = f.read(man["tomb_bytes"] - f.tell())
+            tomb = f"tomb-{gen}.jsonl"
+            _atomic_write(self._path(tomb), lambda f: f.write(tail))
+            newer = [s for s in man["segments"] if s["seq"] > seq]
+            merged = [{"name": name, "seq": seq, "rows": len(lines)}] if lines else []
+            man.update(gen=gen, segments=merged + newer, tomb=tomb, tomb_bytes=len(tail),
+                       tombs=man["tombs"] - snap["tombs"])
+            self._write_manifest(man)
+            self._cleanup(snap, snap_mtime, man)
+        log.info("merged %d segments into %s (%d live rows)", len(snap["segments"]), name, len(lines))
+
+    @staticmethod
+    def _files(man) -> set:
+        names = {man["tomb"]} if man["tomb"] else set()
+        for s in man["segments"]:
+            names.update(s["name"] + suffix for suffix in _SUFFIXES)
+        return names
+
+    def _cleanup(self, old, old_mtime: int, man):
+        """
+        Remove what `man` replaced of `old`, plus unreferenced leftovers older
+        than `old` (crashed commits); anything newer may belong to a writer
+        that hasn't committed yet.
+        """
+        keep = self._files(man)
+        doomed = self._files(old) - keep
+        for fn in os.listdir(self.root):
+            if fn in keep or fn in doomed or not (fn.startswith(("seg-", "tomb-")) or fn.endswith(".tmp")):
+                continue
+            try:
+                if os.stat(self._path(fn)).st_mtime_ns < old_mtime:
+                    doomed.add(fn)
+            except OSError:
+                pass
+        self._remove(doomed)
+
+    def _remove(self, names):
+        for fn in names:
+            try:
+                os.remove(self._path(fn))
+            except OSError:  # gone already, or still mapped (Windows); retried on the next merge
+                pass
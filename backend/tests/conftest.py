@@ -0,0 +1,50 @@
+import asyncio, json, re
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+
+@pytest.fixture
+def stub_ollama():
+    """
+    Factory for a fake Ollama app: stub_ollama(delay=0.02) -> (app, state).
+    /api/chat answers {"tasks": [...]} with one task per "[i] ... Action: ..."
+    line of the last message (streamed in pieces when asked to); `state` has
+    the request bodies, the first message of each non-streaming call in
+    arrival order, and how many of those are in flight (current and peak).
+    """
+    def make(delay: float = 0.02):
+        app = FastAPI()
+        state = {"calls": 0, "bodies": [], "order": [], "inflight": 0, "peak": 0}
+
+        @app.post("/api/chat")
+        async def chat(request: Request):
+            body = await request.json()
+            state["calls"] += 1
+            state["bodies"].append(body)
+            user = body["messages"][-1]["content"] if body["messages"] else ""
+            found = [{"title": m.group(2).strip(), "body": "", "source_i": int(m.group(1))}
+                     for m in re.finditer(r"\[(\d+)\][^\n]*?Action: ([^\n]+)", user)]
+            reply = json.dumps({"tasks": found})
+            if body["stream"]:
+                async def pieces():
+                    for p in (reply[:9], reply[9:-1], reply[-1:]):
+                        yield json.dumps({"message": {"content": p}}) + "\n"
+                    yield json.dumps({"done": True}) + "\n"
+                return StreamingResponse(pieces())
+            state["order"].append(body["messages"][0]["content"])
+            state["inflight"] += 1
+            state["peak"] = max(state["peak"], state["inflight"])
+            await asyncio.sleep(delay)
+            state["inflight"] -= 1
+            return {"message": {"content": reply}, "done": True}
+
+        @app.post("/api/generate")
+        async def generate(request: Request):
+            state["bodies"].append(await request.json())
+            return {"done": True}
+
+        return app, state
+
+    return make
@@ -0,0 +1,22 @@
+from app.chunking import estimate_tokens, iter_chunks, iter_word_chunks
+
+
+def test_chunks_respect_budget_and_overlap():
+    lines = [f"Speaker{i % 3}: We reviewed item {i}. Action: owner {i} to ship it by Friday." for i in range(60)]
+    chunks = list(iter_chunks(iter(lines), max_tokens=64, overlap=16, count=estimate_tokens))
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(c) <= 64 for c in chunks)
+    # every sentence survives intact in some chunk, and consecutive chunks share a tail
+    for i in range(60):
+        assert any(f"Action: owner {i} to ship it by Friday." in c for c in chunks)
+    assert all(a.rsplit(". ", 1)[-1] in b for a, b in zip(chunks, chunks[1:]))
+
+
+def test_long_sentence_is_split_and_no_overlap_mode():
+    text = ["Sara: " + " ".join(f"w{i}" for i in range(500))]
+    chunks = list(iter_chunks(text, max_tokens=50, overlap=0, count=estimate_tokens))
+    assert all(estimate_tokens(c) <= 50 for c in chunks)
+    assert " ".join(chunks).split() == text[0].split()
+    assert list(iter_chunks(["", "  "], count=estimate_tokens)) == []
+    assert list(iter_word_chunks(["a b", "c"], approx_words=2)) == ["a b", "c"]
@@ -0,0 +1,41 @@
+import asyncio
+
+from app.diskcache import DiskCache
+from app.embed_cache import CachedEmbedder, QueryCache
+from app.embed_service import EmbeddingService
+
+
+def test_repeat_queries_and_chunks_skip_the_model(tmp_path):
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return [[float(len(t)), 0.5] for t in texts]
+
+    async def run():
+        emb = CachedEmbedder(EmbeddingService(encode, window_ms=0), "m",
+                             queries=QueryCache(2), chunks=DiskCache(str(tmp_path), 1 << 20))
+        a = await emb.embed_one("action items")
+        b = await emb.embed_one("action items")
+        first = await emb.embed(["one", "three"])
+        again = await emb.embed(["three", "one", "seven"])
+        await emb.service.close()
+        return emb, a, b, first, again
+
+    emb, a, b, first, again = asyncio.run(run())
+    assert a == b == [12.0, 0.5]
+    assert again == [[5.0, 0.5], [3.0, 0.5], [5.0, 0.5]] and first == again[1::-1]
+    assert calls == [["action items"], ["one", "three"], ["seven"]]
+    st = emb.stats()
+    assert st["query_cache"] == {"hits": 1, "misses": 1}
+    assert st["chunk_cache"]["hits"] == 2 and st["chunk_cache"]["misses"] == 3
+
+
+def test_disk_cache_evicts_oldest_past_size_bound(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1000)
+    for i in range(20):
+        cache.put(f"{i:064x}", b"x" * 100)
+    assert cache.stats["evictions"] > 0
+    assert cache._scan_size() <= 1000
+    assert cache.get(f"{19:064x}") == b"x" * 100
+    assert cache.get(f"{0:064x}") is None
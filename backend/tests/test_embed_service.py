@@ -0,0 +1,45 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.embed_service import EmbeddingService
+
+
+def _fake_encoder(calls):
+    def encode(texts):
+        calls.append((threading.current_thread().name, list(texts)))
+        return [[float(len(t))] for t in texts]
+    return encode
+
+
+def test_concurrent_queries_are_coalesced_into_one_batch():
+    calls = []
+
+    async def run():
+        svc = EmbeddingService(_fake_encoder(calls), max_batch=64, window_ms=50)
+        out = await asyncio.gather(*(svc.embed_one("x" * n) for n in range(1, 11)))
+        await svc.close()
+        return out
+
+    out = asyncio.run(run())
+    assert out == [[float(n)] for n in range(1, 11)]
+    assert len(calls) == 1 and len(calls[0][1]) == 10
+    assert calls[0][0].startswith("embed")  # off the event loop thread
+
+
+def test_large_requests_are_split_and_errors_propagate():
+    calls = []
+
+    async def run():
+        svc = EmbeddingService(_fake_encoder(calls), max_batch=4, window_ms=0)
+        vecs = await svc.embed(["a"] * 10)
+        await svc.close()
+        bad = EmbeddingService(lambda texts: 1 / 0, window_ms=0)
+        with pytest.raises(ZeroDivisionError):
+            await bad.embed_one("boom")
+        await bad.close()
+        return vecs
+
+    assert len(asyncio.run(run())) == 10
+    assert [len(c[1]) for c in calls] == [4, 4, 2]
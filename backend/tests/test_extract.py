@@ -0,0 +1,99 @@
+import asyncio
+
+import httpx
+
+from app import tasks as llm
+from app.diskcache import DiskCache
+from app.extract import TaskMerger, extract_map_reduce
+from app.llm import OllamaClient
+
+
+def test_map_reduce_fans_out_streams_and_dedupes(monkeypatch, stub_ollama):
+    monkeypatch.setattr(llm, "OLLAMA_MODEL", "stub")
+    monkeypatch.setattr(llm, "llm_cache", None)
+    app, state = stub_ollama()
+    chunks = [{"i": i, "text": f"Sara: chatter {i}. Action: {'Ship the release' if i % 3 == 0 else f'task {i}'}"}
+              for i in range(9)]
+    chunks.append({"i": 9, "text": "Bob: ACTION: ship the release!"})
+
+    async def fake_embed(texts):  # "task 4" and "task 4 again" are near-duplicates
+        return [[1.0, 0.0] if "4" in t else [0.0, 1.0] if "release" in t.lower() else [0.6, 0.8] for t in texts]
+
+    async def run():
+        events = []
+        client = OllamaClient("http://ollama", concurrency=8, transport=httpx.ASGITransport(app=app))
+        async for ev in extract_map_reduce(chunks, concurrency=3, window=2, client=client):
+            events.append(ev)
+        await client.aclose()
+        merger = TaskMerger(fake_embed, sim=0.95)
+        await merger.add([{"title": "task 4", "body": ""}, {"title": "task 4 again", "body": "", "due_hint": "fri"}])
+        return events, merger.tasks
+
+    events, merged = asyncio.run(run())
+    maps, done = events[:-1], events[-1]
+    assert [e["done"] for e in maps] == [1, 2, 3, 4, 5] and state["calls"] == 5
+    assert state["peak"] == 3
+    assert done["mode"] == "map_reduce"
+    titles = [t["title"] for t in done["tasks"]]
+    assert sorted(titles) == sorted(["Ship the release", "task 1", "task 2", "task 4", "task 5", "task 7", "task 8"])
+    assert sum(len(e["tasks"]) for e in maps) == len(titles)  # partial results are exactly the new tasks
+    by_title = {t["title"]: t for t in done["tasks"]}
+    assert by_title["task 5"]["source_i"] == 5  # window-local position mapped to the global chunk index
+    assert [t["title"] for t in merged] == ["task 4"] and merged[0]["due_hint"] == "fri"
+
+
+def test_repeat_extraction_is_served_from_the_llm_cache(monkeypatch, tmp_path, stub_ollama):
+    monkeypatch.setattr(llm, "OLLAMA_MODEL", "stub")
+    monkeypatch.setattr(llm, "llm_cache", DiskCache(str(tmp_path), 1 << 20))
+    app, state = stub_ollama(delay=0)
+    chunks = [{"i": i, "text": f"Action: task {i}"} for i in range(4)]
+
+    async def run(cs):
+        client = OllamaClient("http://ollama", transport=httpx.ASGITransport(app=app))
+        evs = [ev async for ev in extract_map_reduce(cs, concurrency=2, client=client)]
+        await client.aclose()
+        return evs
+
+    first = asyncio.run(run(chunks))
+    assert state["calls"] == 4 and first[-1]["cached"] is False
+    again = asyncio.run(run(chunks))
+    assert state["calls"] == 4  # nothing regenerated
+    assert again[-1]["cached"] is True and all(e["cached"] for e in again)
+    by_i = lambda ev: sorted(ev["tasks"], key=lambda t: t["source_i"])
+    assert by_i(again[-1]) == by_i(first[-1])
+
+    changed = chunks[:3] + [{"i": 3, "text": "Action: something else"}]
+    mixed = asyncio.run(run(changed))
+    assert state["calls"] == 5 and mixed[-1]["cached"] is False
+    assert sum(e["cached"] for e in mixed[:-1]) == 3
+    assert llm.llm_cache.stats["hits"] == 7
+
+
+def test_map_reduce_falls_back_to_rules_without_a_model(monkeypatch):
+    monkeypatch.setattr(llm, "OLLAMA_MODEL", "")
+    chunks = [{"i": 0, "text": "Action: write docs"}, {"i": 1, "text": "Action: write docs"}]
+
+    async def run():
+        return [ev async for ev in extract_map_reduce(chunks)]
+
+    (ev,) = asyncio.run(run())
+    assert ev["mode"] == "rules" and [t["title"] for t in ev["tasks"]] == ["write docs"]
+
+
+def test_closing_map_reduce_cancels_the_remaining_windows(monkeypatch, stub_ollama):
+    monkeypatch.setattr(llm, "OLLAMA_MODEL", "stub")
+    monkeypatch.setattr(llm, "llm_cache", None)
+    app, state = stub_ollama()
+    chunks = [{"i": i, "text": f"Action: task {i}"} for i in range(6)]
+
+    async def run():
+        client = OllamaClient("http://ollama", transport=httpx.ASGITransport(app=app))
+        events = extract_map_reduce(chunks, concurrency=1, client=client)
+        first = await events.__anext__()
+        await events.aclose()  # what a disconnected /tasks/stream does
+        await asyncio.sleep(0.1)
+        await client.aclose()
+        return first
+
+    assert asyncio.run(run())["done"] == 1
+    assert state["calls"] <= 2  # the other windows never reached Ollama
@@ -0,0 +1,230 @@
+import asyncio, json, time
+
+import httpx
+from fastapi import FastAPI, Request, Response
+
+from app import github
+from app.github import GitHubClient, RateLimited, TokenBucket, task_fingerprint
+from app.issues import create_issues_batch
+
+
+def fake_github():
+    """Just enough of the GitHub REST API for app.github, with a flaky search endpoint."""
+    app = FastAPI()
+    state = {"labels": [{"name": "bug"}], "issues": [], "search_calls": 0}
+
+    @app.get("/repos/{owner}/{repo}/labels")
+    def labels(request: Request, page: int = 1):
+        state["label_gets"] = state.get("label_gets", 0) + 1
+        items = state["labels"][(page - 1) * 3: page * 3]  # 3 per page
+        etag = f'"L{page}-{len(state["labels"])}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304)
+        headers = {"ETag": etag}
+        if page * 3 < len(state["labels"]):
+            headers["Link"] = f'<http://gh/repos/o/r/labels?per_page=100&page={page + 1}>; rel="next"'
+        return Response(json.dumps(items), media_type="application/json", headers=headers)
+
+    @app.post("/repos/{owner}/{repo}/labels", status_code=201)
+    async def add_label(request: Request):
+        body = await request.json()
+        state["labels"].append({"name": body["name"]})
+        return body
+
+    @app.post("/repos/{owner}/{repo}/issues", status_code=201)
+    async def add_issue(request: Request):
+        body = await request.json()
+        state["inflight"] = state.get("inflight", 0) + 1
+        state["peak"] = max(state.get("peak", 0), state["inflight"])
+        await asyncio.sleep(0.02)
+        state["inflight"] -= 1
+        if body["title"] == "boom":
+            return Response('{"message": "Validation Failed"}', status_code=422)
+        n = len(state["issues"]) + 1
+        state["issues"].append({**body, "number": n, "html_url": f"https://gh/issues/{n}"})
+        return state["issues"][-1]
+
+    @app.get("/repos/{owner}/{repo}/issues")
+    def list_issues(request: Request, page: int = 1, per_page: int = 30):
+        state["list_calls"] = state.get("list_calls", 0) + 1
+        items = state["issues"][(page - 1) * 2: page * 2]  # 2 per page, ignoring per_page
+        etag = f'"{page}-{len(state["issues"])}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304)
+        headers = {"ETag": etag}
+        if page * 2 < len(state["issues"]):
+            headers["Link"] = f'<http://gh/repos/o/r/issues?state=open&page={page + 1}>; rel="next"'
+        return Response(json.dumps(items), media_type="application/json", headers=headers)
+
+    @app.get("/search/issues")
+    def search(q: str, response: Response):
+        state["search_calls"] += 1
+        if state["search_calls"] == 1:  # secondary rate limit on the first call
+            return Response(status_code=429, headers={"Retry-After": "0.05"})
+        response.headers.update({"X-RateLimit-Resource": "search", "X-RateLimit-Remaining": "0",
+                                 "X-RateLimit-Reset": str(time.time() + 0.2)})
+        fp = q.split('"fp:')[1].rstrip('"')
+        return {"items": [i for i in state["issues"] if f"fp:{fp}" in i["body"]]}
+
+    return app, state
+
+
+def test_client_is_shared_rate_limited_and_retries(monkeypatch):
+    monkeypatch.setenv("GITHUB_TOKEN", "t")
+    app, state = fake_github()
+
+    async def run():
+        gh = GitHubClient("http://gh", transport=httpx.ASGITransport(app=app))
+        monkeypatch.setattr(github, "_client", gh)
+        monkeypatch.setattr(github, "label_cache", github.LabelCache())
+        await github.ensure_labels("o/r", ["bug", "meeting-action"])
+        issue = await github.create_issue("o/r", "Ship it", "body fp:abc", labels=["meeting-action"])
+        first = await github.find_issue_by_fp("o/r", "abc")   # 429 -> retried
+        t0 = time.perf_counter()
+        second = await github.find_issue_by_fp("o/r", "zzz")  # server said 0 remaining -> waits for reset
+        waited = time.perf_counter() - t0
+        pool = gh.client
+        await github.close_client()
+        return gh, issue, first, second, waited, pool
+
+    gh, issue, first, second, waited, pool = asyncio.run(run())
+    assert [l["name"] for l in state["labels"]] == ["bug", "meeting-action"]
+    assert first["number"] == issue["number"] == 1 and second is None
+    assert state["search_calls"] == 3 and gh.stats["retries"] == 1
+    assert gh.stats["requests"] == {"core": 3, "search": 3}
+    assert gh.stats["status"][429] == 1 and waited >= 0.1
+    assert pool.is_closed
+
+
+def test_token_bucket_paces_requests():
+    async def run():
+        b = TokenBucket(rate=20, burst=2)
+        t0 = time.perf_counter()
+        waits = [await b.acquire() for _ in range(4)]
+        return time.perf_counter() - t0, waits
+
+    elapsed, waits = asyncio.run(run())
+    assert waits[:2] == [0.0, 0.0]
+    assert elapsed >= 0.09 and sum(waits) >= 0.09
+
+
+def test_token_bucket_refuses_to_wait_past_max_wait():
+    async def run():
+        b = TokenBucket(rate=20, burst=2, max_wait=0.5)
+        b.sync(0, time.time() + 0.05)
+        waited = await b.acquire()  # short block: sleeps it out
+        b.sync(0, time.time() + 3600)
+        t0 = time.perf_counter()
+        try:
+            await b.acquire()
+        except RateLimited as e:
+            return waited, time.perf_counter() - t0, e
+        return waited, time.perf_counter() - t0, None
+
+    waited, elapsed, err = asyncio.run(run())
+    assert waited >= 0.04
+    assert err is not None and 3500 < err.retry_after <= 3600 and elapsed < 0.1
+
+
+def test_fingerprint_index_pages_caches_and_revalidates(monkeypatch):
+    monkeypatch.setenv("GITHUB_TOKEN", "t")
+    app, state = fake_github()
+    state["issues"] = [{"number": n, "html_url": f"u{n}", "body": f"x\n\n<!-- mtg:m fp:{n:012x} -->"}
+                       for n in range(1, 6)]
+    state["issues"].append({"number": 6, "html_url": "u6", "body": "no marker"})
+
+    async def run():
+        gh = GitHubClient("http://gh", transport=httpx.ASGITransport(app=app))
+        monkeypatch.setattr(github, "_client", gh)
+        idx = github.FingerprintIndex(ttl=0.05)
+        fps = await idx.get("o/r")
+        calls = state["list_calls"]
+        assert await idx.get("o/r") is fps and state["list_calls"] == calls  # within ttl: no requests
+        idx.add("o/r", "beef", {"number": 7, "html_url": "u7"})
+        await asyncio.sleep(0.06)
+        again = await idx.get("o/r")  # unchanged pages come back 304
+        await gh.aclose()
+        return fps, again, idx, gh
+
+    fps, again, idx, gh = asyncio.run(run())
+    assert sorted(v["number"] for v in fps.values()) == [1, 2, 3, 4, 5, 7]
+    assert idx.lookup(again, f"{3:012x}")["html_url"] == "u3" and idx.lookup(again, "beef") is None
+    assert idx.stats["pages"] == 6 and idx.stats["not_modified"] == 3
+    assert gh.stats["requests"]["search"] == 0
+
+
+def test_issue_batch_is_concurrent_ordered_and_reports_failures(monkeypatch):
+    monkeypatch.setenv("GITHUB_TOKEN", "t")
+    app, state = fake_github()
+    state["issues"] = [{"number": 1, "html_url": "u1", "body": "<!-- mtg:m fp:%s -->" % task_fingerprint("Old", "")}]
+    tasks = [{"title": f"Task {n}"} for n in range(6)]
+    tasks[1] = {"title": "Old"}           # already open
+    tasks[2] = {"title": "boom"}          # GitHub rejects it
+    tasks[3] = {"title": ""}
+    tasks.append({"title": "Task 0"})     # same fingerprint as tasks[0]
+
+    async def run():
+        gh = GitHubClient("http://gh", transport=httpx.ASGITransport(app=app))
+        monkeypatch.setattr(github, "_client", gh)
+        fps = await github.fingerprints.get("o/r")
+        out = [None] * len(tasks)
+        order = []
+        async for i, res in create_issues_batch("o/r", tasks, "m", {}, fps, {}, concurrency=2):
+            out[i] = res
+            order.append(i)
+        await gh.aclose()
+        return out, order
+
+    out, order = asyncio.run(run())
+    assert [r["status"] for r in out] == ["created", "skipped-duplicate", "failed", "skipped-empty-title",
+                                          "created", "created", "skipped-duplicate"]
+    assert out[1]["number"] == 1 and out[6]["number"] == out[0]["number"]
+    assert out[2]["status_code"] == 422 and "422" in out[2]["error"]
+    assert state["peak"] == 2 and len(state["issues"]) == 4
+    assert sorted(order) == list(range(7))
+
+
+def test_closing_an_issue_batch_stops_creating_issues(monkeypatch):
+    monkeypatch.setenv("GITHUB_TOKEN", "t")
+    app, state = fake_github()
+    tasks = [{"title": f"Task {n}"} for n in range(6)]
+
+    async def run():
+        gh = GitHubClient("http://gh", transport=httpx.ASGITransport(app=app))
+        monkeypatch.setattr(github, "_client", gh)
+        fps = await github.fingerprints.get("o/r")
+        results = create_issues_batch("o/r", tasks, "m", {}, fps, {}, concurrency=1)
+        first = await results.__anext__()
+        await results.aclose()  # what a disconnected /issues/stream does
+        await asyncio.sleep(0.1)
+        await gh.aclose()
+        return first
+
+    assert asyncio.run(run())[1]["status"] == "created"
+    assert len(state["issues"]) <= 2  # at most the one already in flight finishes
+
+def test_label_cache_pages_creates_concurrently_and_goes_quiet(monkeypatch):
+    monkeypatch.setenv("GITHUB_TOKEN", "t")
+    app, state = fake_github()
+    state["labels"] = [{"name": f"L{n}"} for n in range(7)]
+
+    async def run():
+        gh = GitHubClient("http://gh", transport=httpx.ASGITransport(app=app))
+        monkeypatch.setattr(github, "_client", gh)
+        cache = github.LabelCache(ttl=0.05)
+        await cache.ensure("o/r", ["l6", "new-a", "New-B"])  # L6 is on page 3: no spurious create
+        posts = gh.stats["requests"]["core"] - state["label_gets"]
+        before = gh.stats["requests"]["core"]
+        await cache.ensure("o/r", ["L0", "new-a"])  # steady state: zero requests
+        quiet = gh.stats["requests"]["core"] - before
+        await asyncio.sleep(0.06)
+        await cache.ensure("o/r", ["L1"])  # after ttl: refetched (our creates changed the pages)
+        await asyncio.sleep(0.06)
+        await cache.ensure("o/r", ["L1"])  # and now revalidated: all 304
+        await gh.aclose()
+        return cache, posts, quiet
+
+    cache, posts, quiet = asyncio.run(run())
+    assert sorted(l["name"] for l in state["labels"])[-2:] == ["New-B", "new-a"]
+    assert posts == 2 and quiet == 0 and cache.stats["created"] == 2
+    assert state["label_gets"] == 3 + 3 + 3 and cache.stats["not_modified"] == 3
@@ -0,0 +1,78 @@
+import asyncio, io
+
+from app import storage
+from app.chunking import iter_chunks
+from app.ingest import ingest
+from app.vectorstore.memory_store import MemoryStore
+
+
+class FakeEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    async def embed(self, texts):
+        self.calls.append(len(texts))
+        return [[1.0, float(len(t))] for t in texts]
+
+
+def _run(gen):
+    async def go():
+        return [ev async for ev in gen]
+    return asyncio.run(go())
+
+
+def test_ingest_streams_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_ROOT", tmp_path)
+    raw = "".join(f"Speaker {i}: " + "word " * 50 + "\n" for i in range(80))
+    store, emb = MemoryStore(2), FakeEmbedder()
+    n = len(list(iter_chunks(raw.splitlines(keepends=True))))
+    assert n > 4
+
+    events = _run(ingest(io.BytesIO(raw.encode()), "m1", "T", store, emb, batch=2, size=len(raw)))
+
+    assert events[-1] == {"stage": "done", "chunks_indexed": n}
+    assert [e["chunks"] for e in events[:-1]] == [min(i, n) for i in range(2, n + 2, 2)]
+    assert max(emb.calls) == 2
+    assert all(0 <= e["progress"] <= 99 for e in events[:-1])
+    d = tmp_path / "meetings" / "m1"
+    assert (d / "raw.txt").read_text(encoding="utf-8") == raw
+    chunks = storage.load_chunks("m1")
+    assert [c["i"] for c in chunks] == list(range(n))
+    assert len(store.query([1.0, 0.0], k=n + 5, filters={"meeting_id": "m1"})) == n
+
+    old = {h[0] for h in store.query([1.0, 0.0], k=n + 5, filters={"meeting_id": "m1"})}
+
+    # a re-upload failing after some batches were indexed leaves the old version whole
+    class Boom(FakeEmbedder):
+        async def embed(self, texts):
+            if self.calls:
+                raise RuntimeError("model down")
+            return await super().embed(texts)
+    try:
+        _run(ingest(io.BytesIO(raw.upper().encode()), "m1", "T", store, Boom(), batch=2))
+    except RuntimeError:
+        pass
+    assert (d / "raw.txt").read_text(encoding="utf-8") == raw
+    assert not list(d.glob("*.tmp"))
+    assert {h[0] for h in store.query([1.0, 0.0], k=n + 5, filters={"meeting_id": "m1"})} == old
+
+    # a successful one replaces it: same text, new ids, nothing old left
+    _run(ingest(io.BytesIO(raw.encode()), "m1", "T", store, FakeEmbedder(), batch=2))
+    hits = {h[0] for h in store.query([1.0, 0.0], k=2 * n + 5, filters={"meeting_id": "m1"})}
+    assert len(hits) == n and not hits & old
+
+
+def test_closing_ingest_early_rolls_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_ROOT", tmp_path)
+    raw = "".join(f"Speaker {i}: " + "word " * 50 + "\n" for i in range(40))
+    store = MemoryStore(2)
+
+    async def go():
+        events = ingest(io.BytesIO(raw.encode()), "m2", "T", store, FakeEmbedder(), batch=2)
+        first = await events.__anext__()
+        assert len(store.query([1.0, 0.0], k=50, filters={"meeting_id": "m2"})) == first["chunks"]
+        await events.aclose()  # a disconnected /upload/stream
+
+    asyncio.run(go())
+    assert store.query([1.0, 0.0], k=50, filters={"meeting_id": "m2"}) == []
+    assert not list((tmp_path / "meetings" / "m2").glob("*.tmp"))
@@ -0,0 +1,85 @@
+import asyncio
+
+from app.jobs import JobQueue, once, parse_limits
+
+
+def test_jobs_run_bounded_and_dedupe_by_key(tmp_path):
+    db = str(tmp_path / "jobs.sqlite3")
+    running, peak = [0], [0]
+
+    def work(n):
+        async def gen():
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            for i in range(3):
+                await asyncio.sleep(0.01)
+                yield {"stage": "step", "i": i}
+            running[0] -= 1
+            yield {"stage": "done", "n": n}
+        return gen
+
+    async def run():
+        q = JobQueue(db, parse_limits("ingest=2"))
+        ids = []
+        for n in range(5):
+            job, created = q.submit("ingest", work(n), key=f"k{n}")
+            assert created and job["status"] == "queued"
+            ids.append(job["id"])
+        again, created = q.submit("ingest", work(0), key="k0")
+        assert not created and again["id"] == ids[0]
+        events = [ev async for ev in q.events(ids[0])]
+        await asyncio.gather(*q._tasks.values())
+        failed, _ = q.submit("tasks", once(_boom))
+        await asyncio.sleep(0.05)
+        out = [q.get(i) for i in ids], q.get(failed["id"]), events
+        await q.close()
+        return out
+
+    async def _boom():
+        raise RuntimeError("ollama down")
+
+    jobs, failed, events = asyncio.run(run())
+    assert peak[0] == 2
+    assert [j["result"] for j in jobs] == [{"stage": "done", "n": n} for n in range(5)]
+    assert [e["stage"] for e in events][-4:] == ["step", "step", "step", "done"]
+    assert events[-1]["status"] == "done"
+    assert failed["status"] == "error" and failed["error"] == "ollama down"
+
+    # a restart marks unfinished jobs of a gone process as interrupted and keeps finished ones
+    async def reopen():
+        q = JobQueue(db)
+        stuck, _ = q.submit("ingest", work(9))
+        q._tasks.pop(stuck["id"]).cancel()
+        q._exec("UPDATE jobs SET owner='previous-boot:1' WHERE id=?", (stuck["id"],))
+        q2 = JobQueue(db)
+        out = q2.get(stuck["id"]), q2.get(jobs[0]["id"])
+        await q2.close()
+        return out
+
+    stuck, done = asyncio.run(reopen())
+    assert stuck["status"] == "error" and "interrupted" in stuck["error"]
+    assert done["status"] == "done"
+
+
+def test_jobs_of_a_live_worker_survive_and_are_followed(tmp_path):
+    db = str(tmp_path / "jobs.sqlite3")
+
+    async def work():
+        for i in range(3):
+            await asyncio.sleep(0.02)
+            yield {"stage": "step", "i": i}
+        yield {"stage": "done", "n": 1}
+
+    async def run():
+        owner = JobQueue(db)
+        job, _ = owner.submit("tasks", work)
+        other = JobQueue(db, poll=0.005)  # e.g. a second worker starting up
+        assert other.get(job["id"])["status"] in ("queued", "running")
+        events = [ev async for ev in other.events(job["id"])]
+        await owner.close()
+        await other.close()
+        return events
+
+    events = asyncio.run(run())
+    assert events[-1] == {"status": "done", "stage": "done", "n": 1}
+    assert any(ev.get("stage") == "step" for ev in events)
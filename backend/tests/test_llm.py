@@ -0,0 +1,51 @@
+import asyncio, json
+
+import httpx
+
+from app.llm import FairLimiter, OllamaClient
+
+
+def test_shared_client_limits_queues_fifo_and_keeps_model_loaded(stub_ollama):
+    app, state = stub_ollama()
+
+    async def run():
+        llm = OllamaClient("http://ollama", concurrency=2, keep_alive="1h", transport=httpx.ASGITransport(app=app))
+        assert await llm.preload("m")
+        reqs = [{"model": "m", "messages": [{"role": "user", "content": str(n)}]} for n in range(6)]
+        tasks = []
+        for r in reqs:  # arrive in order
+            tasks.append(asyncio.create_task(llm.chat(r)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        pieces = []
+        async for p in llm.stream_chat({"model": "m", "messages": []}):
+            pieces.append(p)
+        snap = llm.snapshot()
+        await llm.aclose()
+        return pieces, snap
+
+    pieces, snap = asyncio.run(run())
+    assert state["peak"] == 2
+    assert state["order"] == [str(n) for n in range(6)]
+    assert len(pieces) > 1 and json.loads("".join(pieces)) == {"tasks": []}
+    assert state["bodies"][0] == {"model": "m", "keep_alive": "1h"}
+    assert all(b["keep_alive"] == "1h" for b in state["bodies"])
+    assert [b["stream"] for b in state["bodies"][1:]] == [False] * 6 + [True]
+    assert snap["requests"] == 7 and snap["errors"] == 0 and snap["in_flight"] == 0
+    assert snap["peak_queued"] == 4 and snap["queue_wait_max_s"] > 0.02 and snap["gen_s"] > 0.1
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def run():
+        lim = FairLimiter(1)
+        await lim.acquire()
+        a = asyncio.create_task(lim.acquire())
+        b = asyncio.create_task(lim.acquire())
+        await asyncio.sleep(0)
+        a.cancel()
+        await asyncio.sleep(0)
+        lim.release()
+        await b
+        return lim.active, lim.queued
+
+    assert asyncio.run(run()) == (1, 0)
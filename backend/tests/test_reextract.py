@@ -0,0 +1,34 @@
+import json
+
+from app import storage
+from app.reextract import reextract
+from app.storage import save_meeting
+from app.tasks import extract_tasks_rules
+
+
+def test_bulk_reextract_resumes_and_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_ROOT", tmp_path)
+    for n in range(5):
+        save_meeting(f"m{n}", "T", "raw", [f"Action: item {n}.{j}" for j in range(n + 1)] + ["chatter"])
+    out = tmp_path / "reextract" / "rules.jsonl"
+
+    first = reextract(out, workers=2, meetings=["m1", "m3"], every=0)
+    assert (first.meetings, first.chunks, first.tasks) == (2, 8, 6)
+    with open(out, "a", encoding="utf-8") as f:
+        f.write('{"meeting_id": "m4", "ta')  # crashed mid-write
+
+    rest = reextract(out, workers=2, every=0)
+    assert rest.meetings == 3  # m0, m2 and the half-written m4
+    rows = {}
+    for line in out.read_text(encoding="utf-8").splitlines():
+        try:
+            r = json.loads(line)
+        except ValueError:
+            continue
+        rows[r["meeting_id"]] = r
+    assert sorted(rows) == [f"m{n}" for n in range(5)]
+    assert rows["m4"]["tasks"] == extract_tasks_rules(storage.load_chunks("m4"))
+    assert rows["m2"]["chunks"] == 4 and rows["m2"]["mode"] == "rules"
+
+    assert reextract(out, every=0).meetings == 0
+    assert [e["mode"] for e in storage.get_catalog().extractions("m3")] == ["rules"]
@@ -0,0 +1,87 @@
+import asyncio
+
+import numpy as np
+
+from app import storage
+from app.retrieval import BM25Index, Retriever, fuse
+from app.storage import ChunkRepo, save_meeting
+from app.vectorstore.memory_store import MemoryStore
+
+TOPICS = ["budget", "launch", "hiring", "security", "roadmap", "design"]
+
+
+def embed(text):
+    """One dimension per topic word; ignores everything else (like a weak model would)."""
+    v = np.array([text.lower().count(t) for t in TOPICS] + [0.1], dtype="float32")
+    return (v / np.linalg.norm(v)).tolist()
+
+
+def index(store, meeting_id, texts):
+    save_meeting(meeting_id, "T", "raw", texts)
+    store.delete_meeting(meeting_id)
+    store.upsert([f"{meeting_id}-{i}" for i in range(len(texts))], [embed(t) for t in texts],
+                 [{"meeting_id": meeting_id, "i": i} for i in range(len(texts))])
+
+
+def test_retrieve_caches_invalidates_and_fuses_bm25(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_ROOT", tmp_path)
+    store, calls = MemoryStore(len(TOPICS) + 1), []
+
+    async def embed_one(q):
+        calls.append(q)
+        return embed(q)
+
+    texts = [f"we talked about the {t} plan" for t in TOPICS] + ["ticket JIRA-512 is still open on the budget and hiring"]
+    index(store, "m", texts)
+    r = Retriever(store, embed_one, repo=ChunkRepo(1 << 20), max_entries=8)
+
+    async def run():
+        first = await r.retrieve("m", "Budget follow ups", 2)
+        embedded = len(calls)
+        again = await r.retrieve("m", "  budget   FOLLOW ups ", 2)
+        assert r.stats["hits"] == 1 and len(calls) == embedded  # served without embedding or searching
+        hybrid = await r.retrieve("m", "security status of JIRA-512", 2, hybrid=True)
+        dense = await r.retrieve("m", "security status of JIRA-512", 2)
+        index(store, "m", ["budget only now"] + texts)  # re-upload shifts every chunk
+        after = await r.retrieve("m", "budget follow ups", 2)
+        gone = await r.retrieve("nope", "budget", 2)
+        return first, again, hybrid, dense, after, gone
+
+    first, again, hybrid, dense, after, gone = asyncio.run(run())
+    assert [c["i"] for c in first] == [0, 6] and again == first
+    assert [c["i"] for c in hybrid] == [3, 6]  # only the lexical side can see "JIRA-512"
+    assert 3 in [c["i"] for c in dense] and 6 not in [c["i"] for c in dense]
+    assert [c["i"] for c in after] == [0, 1] and gone == []
+    assert calls == ["Budget follow ups", "security status of JIRA-512", "security status of JIRA-512", "budget follow ups"]
+    assert r.stats == {"hits": 1, "misses": 4, "lexical_builds": 1}
+
+
+def test_vectors_landing_after_chunks_are_not_served_stale(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_ROOT", tmp_path)
+    store = MemoryStore(len(TOPICS) + 1)
+
+    async def embed_one(q):
+        return embed(q)
+
+    index(store, "m", ["budget", "launch", "hiring"])
+    r = Retriever(store, embed_one, repo=ChunkRepo(1 << 20))
+
+    async def run():
+        save_meeting("m", "T", "raw", ["hiring", "launch", "budget"])  # chunks.dat first...
+        early = await r.retrieve("m", "budget", 1)
+        texts = ["hiring", "launch", "budget"]                         # ...then its vectors
+        store.delete_meeting("m")
+        store.upsert([f"v2-{i}" for i in range(3)], [embed(t) for t in texts],
+                     [{"meeting_id": "m", "i": i} for i in range(3)])
+        return early, await r.retrieve("m", "budget", 1)
+
+    early, late = asyncio.run(run())
+    assert [c["i"] for c in early] == [0] and [c["text"] for c in late] == ["budget"]
+    assert r.stats["misses"] == 2
+
+def test_bm25_and_fusion():
+    idx = BM25Index([{"i": 0, "text": "deploy the deploy script"}, {"i": 1, "text": "deploy"},
+                     {"i": 2, "text": "write docs for the script"}])
+    assert idx.search("deploy script", 3) == [0, 1, 2]
+    assert idx.search("unknown", 3) == []
+    assert fuse([[3, 1, 2], [1, 4]], 3) == [1, 3, 4]
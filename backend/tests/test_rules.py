@@ -8,3 +8,24 @@ def test_rules_finds_actions():
     tasks = extract_tasks_rules(context)
     titles = [t["title"].lower() for t in tasks]
     assert any("wire fastapi" in t for t in titles)
+
+
+def test_prefiltered_rules_match_the_reference(tmp_path):
+    from app.rules_bench import as_chunks, extract_tasks_rules_v0, synthetic
+    from app.tasks import iter_tasks_rules
+
+    lines = synthetic(3000, action_rate=0.3, seed=7) + [
+        "Action:   ", "Bob\twill\tfix the build", "Taſk: non-ascii fold", "• [ ] bullet box",
+        "Owner: Li - please rotate keys by tue 3", "LET'S  ship it", "followup on invoices.",
+        "Sara should", "AI- retrain model before Jan 5", "the tasks: are many",
+    ]
+    chunks = as_chunks(lines, per_chunk=7)
+    expected = extract_tasks_rules_v0(chunks)
+    assert len(expected) > 500
+    assert extract_tasks_rules(chunks) == expected
+
+    f = tmp_path / "raw.txt"
+    f.write_text("\n".join(lines), encoding="utf-8")
+    with open(f, encoding="utf-8") as fh:
+        streamed = list(iter_tasks_rules(fh))
+    assert streamed == extract_tasks_rules_v0([{"i": 0, "text": "\n".join(lines)}])
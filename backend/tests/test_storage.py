@@ -0,0 +1,61 @@
+import json, os
+
+from app import storage
+from app.storage import ChunkRepo, save_meeting
+
+
+def test_chunk_repo_lookup_invalidation_and_bound(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_ROOT", tmp_path)
+    save_meeting("m1", "T", "raw", [f"chunk {i} é" for i in range(50)])
+    repo = ChunkRepo(max_bytes=200)
+
+    assert repo.count("m1") == 50
+    assert [c["text"] for c in repo.get("m1", [7, 3, 99, None, "x", 7])] == ["chunk 7 é", "chunk 3 é", "chunk 7 é"]
+    assert repo.stats == {"hits": 1, "misses": 2}
+    assert [c["i"] for c in repo.all("m1")] == list(range(50))
+    assert repo._bytes <= 200
+    assert repo.get("nope", [0]) == [] and repo.count("nope") == 0
+
+    # a re-upload is seen on the next read
+    save_meeting("m1", "T", "raw", ["new"])
+    assert repo.count("m1") == 1 and repo.get("m1", [0, 7]) == [{"i": 0, "text": "new"}]
+
+
+def test_legacy_chunks_json_is_migrated(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_ROOT", tmp_path)
+    d = tmp_path / "meetings" / "old"
+    d.mkdir(parents=True)
+    (d / "raw.txt").write_text("a\nb\n", encoding="utf-8")
+    (d / "chunks.json").write_text(json.dumps({"meeting_id": "old", "title": "T", "chunks": [
+        {"i": 1, "text": "b"}, {"i": 0, "text": "a"}]}, indent=2), encoding="utf-8")
+
+    assert ChunkRepo(1 << 20).get("old", [1]) == [{"i": 1, "text": "b"}]
+    assert sorted(os.listdir(d)) == ["chunks.dat", "meta.json", "raw.txt"]
+    assert (d / "raw.txt").read_text(encoding="utf-8") == "a\nb\n"
+
+
+def test_catalog_tracks_meetings_chunks_and_extractions(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_ROOT", tmp_path)
+    # a meeting written before the catalog existed is back-filled on first use
+    save_meeting("early", "Old", "raw", ["x"])
+    (tmp_path / "catalog.sqlite3").unlink()
+    storage._catalogs.clear()
+
+    with storage.MeetingWriter("m1", "Standup") as w:
+        for _ in w.tee_raw(["a\n", "b\n"]):
+            pass
+        w.add_chunk("a")
+        w.add_chunk("b")
+    cat = storage.get_catalog()
+
+    assert {m["meeting_id"] for m in storage.list_meetings()} == {"early", "m1"}
+    assert cat.meeting("m1")["n_chunks"] == 2 and cat.meeting("m1")["raw_bytes"] == 4
+    assert cat.meeting("early")["title"] == "Old" and cat.meeting("early")["n_chunks"] == 1
+
+    cat.add_extraction("m1", "rules", [{"title": "t"}], "q", 5)
+    assert cat.extractions("m1")[0]["tasks"] == [{"title": "t"}]
+    assert cat.add_extraction("ghost", "rules", []) is None
+
+    assert storage.delete_meeting("m1")
+    assert cat.meeting("m1") is None and cat.extractions("m1") == []
+    assert not (tmp_path / "meetings" / "m1").exists()
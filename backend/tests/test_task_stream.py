@@ -0,0 +1,26 @@
+from app.tasks import TaskStreamParser, _parse_tasks_json
+
+REPLY = ('```json\n{"tasks": [{"title": "Fix \\"login\\" } bug", "body": "x", "labels": "bug", "source_i": 1},'
+         ' {"title": "Ship", "meta": {"deps": [1, {"a": "]"}]}, "confidence": 3,},'
+         ' {"title": ""}, {"title": "Docs", "source_i": 0}]}\n```')
+
+
+def test_tasks_are_emitted_as_soon_as_their_object_closes():
+    p = TaskStreamParser()
+    seen = []  # (chars fed, task title)
+    for n, ch in enumerate(REPLY, 1):
+        seen += [(n, t["title"]) for t in p.feed(ch)]
+    assert [title for _, title in seen] == [t["title"] for t in _parse_tasks_json(REPLY)]
+    assert [title for _, title in seen] == ['Fix "login" } bug', "Ship", "Docs"]
+    first_end = REPLY.index('"source_i": 1}') + len('"source_i": 1}')
+    assert seen[0][0] == first_end  # not a character later
+
+    whole = TaskStreamParser().feed(REPLY)
+    assert whole == _parse_tasks_json(REPLY)
+    assert whole[1]["confidence"] == 1.0 and whole[0]["labels"] == ["bug"]
+
+
+def test_bare_arrays_and_leading_prose():
+    p = TaskStreamParser()
+    out = p.feed('Sure, here it is [see below]: "ok" [{"title": "a"}, ') + p.feed('{"title": "b"}]')
+    assert [t["title"] for t in out] == ["a", "b"]
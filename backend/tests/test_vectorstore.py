@@ -0,0 +1,231 @@
+import threading
+
+import numpy as np
+import pytest
+
+from app.vectorstore.faiss_store import FaissStore, faiss
+from app.vectorstore.memory_store import MemoryStore
+
+DIM = 16
+
+
+def _fill(store, meetings=50, per_meeting=8, seed=0):
+    rng = np.random.default_rng(seed)
+    for m in range(meetings):
+        vecs = rng.normal(size=(per_meeting, DIM)).astype("float32")
+        metas = [{"meeting_id": f"mtg-{m}", "title": "", "i": i} for i in range(per_meeting)]
+        ids = [f"{m}-{i}" for i in range(per_meeting)]
+        store.upsert(ids, vecs.tolist(), metas)
+    return rng
+
+
+@pytest.mark.skipif(faiss is None, reason="faiss not installed")
+def test_faiss_filtered_query_returns_k_hits_from_meeting(tmp_path):
+    store = FaissStore(DIM, str(tmp_path / "faiss.index"), str(tmp_path / "meta.json"))
+    rng = _fill(store)
+    q = rng.normal(size=DIM).tolist()
+
+    hits = store.query(q, k=5, filters={"meeting_id": "mtg-7"})
+    assert len(hits) == 5
+    assert all(m["meeting_id"] == "mtg-7" for _, _, m in hits)
+    scores = [s for _, s, _ in hits]
+    assert scores == sorted(scores, reverse=True)
+
+    # k larger than the meeting returns the whole meeting
+    assert len(store.query(q, k=50, filters={"meeting_id": "mtg-7"})) == 8
+    assert store.query(q, k=5, filters={"meeting_id": "nope"}) == []
+
+
+@pytest.mark.skipif(faiss is None, reason="faiss not installed")
+def test_faiss_upsert_replaces_and_delete_compacts(tmp_path):
+    index, meta = str(tmp_path / "faiss.index"), str(tmp_path / "meta.json")
+    store = FaissStore(DIM, index, meta)
+    rng = _fill(store, meetings=3)
+    q = rng.normal(size=DIM).tolist()
+
+    # re-upserting the same ids does not grow the live set or duplicate hits
+    _fill(store, meetings=3, seed=1)
+    hits = store.query(q, k=30)
+    assert len(hits) == 24 and len({h[0] for h in hits}) == 24
+
+    assert store.delete_meeting("mtg-1") == 8
+    assert store.query(q, k=5, filters={"meeting_id": "mtg-1"}) == []
+    assert store.delete(["0-0", "missing"]) == 1
+
+    store.persist()
+    store.compact()
+    assert len(store.query(q, k=30)) == 15
+    assert store._log.segment_count == 1 and store._log._man["tombs"] == 0
+
+    reloaded = FaissStore(DIM, index, meta)
+    assert len(reloaded.query(q, k=30)) == 15
+    assert len(reloaded.query(q, k=30, filters={"meeting_id": "mtg-2"})) == 8
+    assert reloaded.delete_meeting("mtg-2", keep=["2-0"]) == 7
+    assert [h[0] for h in reloaded.query(q, k=30, filters={"meeting_id": "mtg-2"})] == ["2-0"]
+
+
+@pytest.mark.skipif(faiss is None, reason="faiss not installed")
+def test_faiss_replaces_persisted_rows_across_segments(tmp_path):
+    store = FaissStore(DIM, str(tmp_path / "faiss.index"), str(tmp_path / "meta.json"))
+    rng = _fill(store, meetings=2)
+    store.persist()
+    for seed in (1, 2):  # the id map built on the first replace must follow later commits
+        _fill(store, meetings=2, seed=seed)
+        store.persist()
+    q = rng.normal(size=DIM).tolist()
+    assert len(store.query(q, k=30)) == 16
+    assert store.delete(["0-0"]) == 1 and store.delete(["0-0"]) == 0
+    store.persist()
+    assert len(store.query(q, k=30)) == 15
+
+
+def test_memory_upsert_replaces_and_delete_meeting():
+    store = MemoryStore()
+    rng = _fill(store, meetings=3)
+    _fill(store, meetings=3, seed=1)
+    q = rng.normal(size=DIM).tolist()
+    assert len(store.query(q, k=30)) == 24
+    assert store.delete_meeting("mtg-0") == 8
+    hits = store.query(q, k=30)
+    assert len(hits) == 16 and all(m["meeting_id"] != "mtg-0" for _, _, m in hits)
+
+
+def test_memory_queries_during_upsert_and_compaction():
+    store = MemoryStore(DIM)
+    rng = _fill(store, meetings=4)
+    q = rng.normal(size=DIM).tolist()
+    errors = []
+
+    def reader():
+        try:
+            for _ in range(300):
+                for _id, _, meta in store.query(q, k=8, filters={"meeting_id": "mtg-1"}):
+                    assert meta["meeting_id"] == "mtg-1" and _id.startswith("1-")
+        except Exception as e:  # pragma: no cover - the failure being tested for
+            errors.append(e)
+
+    t = threading.Thread(target=reader)
+    t.start()
+    for seed in range(30):  # each delete_meeting empties half the rows and compacts
+        store.delete_meeting("mtg-0")
+        store.delete_meeting("mtg-2")
+        _fill(store, meetings=4, seed=seed)
+    t.join()
+    assert errors == []
+
+def test_memory_query_matches_brute_force():
+    store = MemoryStore(DIM)
+    rng = _fill(store, meetings=20)
+    q = rng.normal(size=DIM).astype("float32")
+    hits = store.query(q.tolist(), k=4, filters={"meeting_id": "mtg-3"})
+    rows = [r for r, m in enumerate(store._meta) if m["meeting_id"] == "mtg-3"]
+    expected = sorted(rows, key=lambda r: -float(store._mat[r] @ q))[:4]
+    assert [h[0] for h in hits] == [store._ids[r] for r in expected]
+    assert len(store.query(q.tolist(), k=4, filters={"meeting_id": "mtg-3", "i": 2})) == 1
+
+
+@pytest.mark.skipif(faiss is None, reason="faiss not installed")
+def test_faiss_segments_append_merge_and_ignore_uncommitted(tmp_path):
+    index, meta, segs = str(tmp_path / "faiss.index"), str(tmp_path / "meta.json"), tmp_path / "segs"
+    store = FaissStore(DIM, index, meta, str(segs))
+    rng = _fill(store, meetings=2)
+    store.persist()
+    _fill(store, meetings=1, seed=2)  # re-upload mtg-0 with new vectors
+    store.persist()
+    store.delete_meeting("mtg-1")
+    store.persist()
+    store._log.merge()  # normally runs in the background
+    assert store._log.segment_count == 1
+    assert not store._log.needs_merge()
+
+    # leftovers of a crashed commit are not referenced by MANIFEST
+    (segs / "seg-99999999-0.npy.tmp").write_bytes(b"garbage")
+    q = rng.normal(size=DIM).tolist()
+    reloaded = FaissStore(DIM, index, meta, str(segs))
+    assert sorted(h[0] for h in reloaded.query(q, k=100)) == sorted(h[0] for h in store.query(q, k=100))
+    assert [h[0] for h in reloaded.query(q, k=8)] == [h[0] for h in store.query(q, k=8)]
+    assert reloaded.query(q, k=5, filters={"meeting_id": "mtg-1"}) == []
+
+
+@pytest.mark.skipif(faiss is None, reason="faiss not installed")
+def test_faiss_opens_lazily_and_memory_maps_segments(tmp_path):
+    index, meta, segs = str(tmp_path / "faiss.index"), str(tmp_path / "meta.json"), str(tmp_path / "segs")
+    store = FaissStore(DIM, index, meta, segs)
+    rng = _fill(store, meetings=4)
+    store.persist()
+
+    reloaded = FaissStore(DIM, index, meta, segs)
+    assert reloaded._log is None  # nothing read until first use
+    q = rng.normal(size=DIM).tolist()
+    hits = reloaded.query(q, k=3, filters={"meeting_id": "mtg-2"})
+    assert [h[0] for h in hits] == [h[0] for h in store.query(q, k=3, filters={"meeting_id": "mtg-2"})]
+    assert isinstance(reloaded._segs[0].X, np.memmap)
+
+
+@pytest.mark.skipif(faiss is None, reason="faiss not installed")
+def test_faiss_hnsw_index_is_saved_and_extended(tmp_path):
+    index, meta, segs = str(tmp_path / "faiss.index"), str(tmp_path / "meta.json"), str(tmp_path / "segs")
+    store = FaissStore(DIM, index, meta, segs, index_type="hnsw", index_params={"hnsw_m": 8})
+    rng = _fill(store, meetings=10)
+    assert store.rebuild()["rows"] == 80
+
+    reloaded = FaissStore(DIM, index, meta, segs, index_type="hnsw")
+    _fill(reloaded, meetings=12, seed=3)  # 2 new meetings on top of the saved index
+    reloaded.persist()
+    q = rng.normal(size=DIM).tolist()
+    assert len(reloaded.query(q, k=5)) == 5
+    assert reloaded.index.ntotal == 176
+
+
+@pytest.mark.skipif(faiss is None, reason="faiss not installed")
+def test_faiss_two_stores_share_a_segment_dir(tmp_path):
+    index, meta, segs = str(tmp_path / "faiss.index"), str(tmp_path / "meta.json"), str(tmp_path / "segs")
+    a = FaissStore(DIM, index, meta, segs)
+    b = FaissStore(DIM, index, meta, segs)
+    rng = np.random.default_rng(0)
+
+    def put(store, m):
+        store.upsert([f"{m}-{i}" for i in range(4)], rng.normal(size=(4, DIM)).tolist(),
+                     [{"meeting_id": f"mtg-{m}", "i": i} for i in range(4)])
+        store.persist()
+
+    # interleaved writers: both start from the same (empty) MANIFEST
+    a._ensure(), b._ensure()
+    put(a, 0)
+    put(b, 1)
+    names = [s["name"] for s in a._log._read_manifest()[0]["segments"]]
+    assert len(names) == 2 and len(set(names)) == 2
+
+    # a merge in one store must keep the other's rows and files; readers reopen
+    for m in range(2, 12):
+        put(a if m % 2 else b, m)
+    a._log.merge()
+    put(b, 12)
+    b.delete_meeting("mtg-3")
+    b.persist()
+    b._log.merge()
+    q = rng.normal(size=DIM).tolist()
+    for store in (a, b, FaissStore(DIM, index, meta, segs)):
+        assert len(store.query(q, k=100)) == 48
+        assert store.query(q, k=5, filters={"meeting_id": "mtg-3"}) == []
+        assert len(store.query(q, k=5, filters={"meeting_id": "mtg-12"})) == 4
+
+
+def test_segment_log_commits_from_threads_with_separate_logs(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    from app.vectorstore.segments import SegmentLog
+
+    root = str(tmp_path / "segs")
+
+    def write(w):
+        log_ = SegmentLog(root, merge_segments=4)
+        for j in range(5):
+            X = np.ones((2, DIM), dtype="float32")
+            log_.commit(X, [f"{w}-{j}-0", f"{w}-{j}-1"], [{"meeting_id": w}] * 2, [])
+            log_.merge(wait=False)
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(write, range(4)))
+    log_ = SegmentLog(root)
+    segs_, alive = log_.open()
+    assert int(alive.sum()) == 40